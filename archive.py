@@ -0,0 +1,116 @@
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from config import connect, load_secrets
+from documents import copy_document, object_path
+from repository import PROCESSED_STATUSES
+
+# -----------------------------------------------------------------------------
+# Retention and Archiving
+# -----------------------------------------------------------------------------
+# Moves approved/rejected requests older than the retention age from
+# leave_requests into the partitioned leave_requests_archive (see
+# leave_archive.sql), one batch per transaction, then copies their documents
+# to the cold bucket, repoints the archived rows at the copies and deletes the
+# hot objects no remaining request, live or archived, uses (uploads are
+# shared by content hash).
+# Run from cron; settings come from [retention] in secrets.toml:
+#
+#   python archive.py                           # archive everything past the retention age
+#   python archive.py --older-than-days 730 --dry-run
+
+DEFAULT_RETENTION_DAYS = 365
+URL_CHUNK = 50  # URLs per in_() filter, to keep request lines short
+
+
+def chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def relocate_documents(client, rows, hot_bucket, cold_bucket):
+    """Move the documents of archived rows to the cold bucket.
+
+    Returns (copied, removed) object counts. A document that fails to copy
+    stays where it is and its archived rows keep pointing at it.
+    """
+    ids_by_url = {}
+    for row in rows:
+        for column in ('file_url', 'preview_url'):
+            if object_path(row.get(column), hot_bucket):
+                ids_by_url.setdefault((column, row[column]), []).append(row['id'])
+
+    copied = set()
+    for (column, url), ids in ids_by_url.items():
+        try:
+            cold_url = copy_document(client, url, hot_bucket, cold_bucket)
+            (client.table('leave_requests_archive')
+                .update({column: cold_url})
+                .in_('id', ids)
+                .eq(column, url)
+                .execute())
+        except Exception as e:
+            print(f"Could not move {url} to {cold_bucket}: {e}")
+            continue
+        copied.add(url)
+
+    # Checked after copying, right before deleting, to keep the window for a
+    # new upload of the same bytes small. Archived rows from earlier batches
+    # whose copy failed still point at the hot objects too.
+    still_used = set()
+    for table in ('leave_requests', 'leave_requests_archive'):
+        for column in ('file_url', 'preview_url'):
+            for urls in chunks(copied, URL_CHUNK):
+                hot = client.table(table).select(column).in_(column, urls).execute().data
+                still_used.update(row[column] for row in hot)
+    removable = [object_path(url, hot_bucket) for url in copied - still_used]
+    for paths in chunks(removable, URL_CHUNK):
+        client.storage.from_(hot_bucket).remove(paths)
+    return len(copied), len(removable)
+
+
+def archive(client, older_than_days, batch_size, hot_bucket, cold_bucket):
+    """Archive batches until none are left. Returns (requests, copied, removed)."""
+    totals = [0, 0, 0]
+    while True:
+        rows = client.rpc('archive_leave_requests', {
+            'p_older_than': f"{older_than_days} days", 'p_limit': batch_size,
+        }).execute().data or []
+        copied, removed = relocate_documents(client, rows, hot_bucket, cold_bucket)
+        for i, n in enumerate((len(rows), copied, removed)):
+            totals[i] += n
+        if len(rows) < batch_size:
+            return tuple(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old closed leave requests and their documents to the archive.")
+    parser.add_argument("--secrets", help="Path to secrets.toml (default: .streamlit/secrets.toml)")
+    parser.add_argument("--older-than-days", type=int, help=f"Retention age (default: retention.older_than_days "
+                                                             f"or {DEFAULT_RETENTION_DAYS})")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Count what would be archived")
+    args = parser.parse_args()
+
+    secrets = load_secrets(args.secrets)
+    cfg = secrets.get("retention", {})
+    older_than_days = args.older_than_days or cfg.get("older_than_days", DEFAULT_RETENTION_DAYS)
+    client = connect(secrets)
+
+    if args.dry_run:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+        res = (client.table('leave_requests').select('id', count='exact')
+               .in_('status', PROCESSED_STATUSES).lt('date_requested', cutoff.isoformat())
+               .limit(1).execute())
+        print(f"{res.count} closed request(s) older than {older_than_days} days would be archived.")
+        return
+
+    requests, copied, removed = archive(client, older_than_days, args.batch_size,
+                                        cfg.get("bucket", "documents"), cfg.get("cold_bucket", "documents-archive"))
+    print(f"Archived {requests} request(s); moved {copied} document(s) to cold storage, "
+          f"deleted {removed} hot copies.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------------------------------------------------------
+# Password Hashing
+# -----------------------------------------------------------------------------
+# scrypt is memory-hard (128 * n * r bytes per hash, 16 MB at the defaults).
+# Hashes are encoded as scrypt$n$r$p$salt$hash so the cost can be raised later
+# without invalidating existing passwords.
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * n * r * p + 1024 * 1024, dklen=32)
+
+
+def hash_password(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    salt = secrets.token_bytes(16)
+    digest = _scrypt(password, salt, n, r, p)
+    return "$".join(["scrypt", str(n), str(r), str(p),
+                     base64.b64encode(salt).decode(), base64.b64encode(digest).decode()])
+
+
+def verify_password(password, encoded):
+    try:
+        scheme, n, r, p, salt, digest = encoded.split("$")
+        if scheme != "scrypt":
+            return False
+        candidate = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(candidate, base64.b64decode(digest))
+    except (ValueError, TypeError):
+        return False
+
+
+def needs_rehash(encoded, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    return not encoded or encoded.split("$")[1:4] != [str(n), str(r), str(p)]
+
+
+class PasswordVerifier:
+    """Runs hash checks on a small worker pool.
+
+    Keeps the memory-hard work off the script thread and caps how many hashes
+    (and how much memory) a login burst can consume at once.
+    """
+
+    def __init__(self, workers=4, timeout=10):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+
+    def verify(self, password, encoded):
+        return self._pool.submit(verify_password, password, encoded).result(self.timeout)
+
+    def hash(self, password):
+        return self._pool.submit(hash_password, password).result(self.timeout)
+
+
+# -----------------------------------------------------------------------------
+# Session Tokens
+# -----------------------------------------------------------------------------
+class SessionTokens:
+    """HMAC-signed session tokens.
+
+    A token is base64(json payload).signature. Decoded claims are cached per
+    token so repeat page loads skip the signature check, but the account is
+    looked up on every verify, so role changes and deleted users take effect
+    at the next reload. Revoked token ids are remembered until the token would
+    have expired.
+    """
+
+    def __init__(self, secret, ttl=2 * 3600, cache_size=1024, max_revoked=10000):
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.max_revoked = max_revoked
+        self._cache = OrderedDict()  # token -> claims
+        self._revoked = OrderedDict()  # token id -> expires_at
+        self._lock = threading.Lock()
+
+    def _sign(self, payload):
+        return base64.urlsafe_b64encode(hmac.new(self.secret, payload, hashlib.sha256).digest()).decode().rstrip("=")
+
+    def issue(self, user):
+        claims = {'username': user['username'], 'exp': int(time.time()) + self.ttl, 'nonce': secrets.token_hex(8)}
+        payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+        token = f"{payload}.{self._sign(payload.encode())}"
+        self._remember(token, claims)
+        return token
+
+    def claims(self, token):
+        """The token's claims if it is correctly signed and unexpired, else None."""
+        if not token:
+            return None
+        with self._lock:
+            claims = self._cache.get(token)
+            if claims:
+                self._cache.move_to_end(token)
+        if claims is None:
+            try:
+                payload, signature = token.split(".")
+                if not hmac.compare_digest(signature, self._sign(payload.encode())):
+                    return None
+                claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            except (ValueError, TypeError):
+                return None
+            self._remember(token, claims)
+        return claims if claims.get('exp', 0) >= time.time() else None
+
+    def verify(self, token, load_user, is_revoked=None):
+        """Return the session's user, or None.
+
+        load_user(username) confirms the account still exists and supplies its
+        current role/section; is_revoked(token_id) checks revocations made by
+        other processes (see revoked_sessions.sql).
+        """
+        claims = self.claims(token)
+        if claims is None:
+            return None
+        token_id = claims.get('nonce')
+        with self._lock:
+            if token_id in self._revoked:
+                return None
+        if is_revoked and is_revoked(token_id):
+            self._forget(token_id, claims['exp'])
+            return None
+        return load_user(claims['username'])
+
+    def revoke(self, token):
+        """Revoke in this process. Returns (token_id, expires_at) for recording
+        the revocation durably, or None if the token is invalid or expired."""
+        claims = self.claims(token)
+        with self._lock:
+            self._cache.pop(token, None)
+        if claims is None:
+            return None
+        self._forget(claims.get('nonce'), claims['exp'])
+        return claims.get('nonce'), claims['exp']
+
+    def _forget(self, token_id, expires_at):
+        now = time.time()
+        with self._lock:
+            self._revoked[token_id] = expires_at
+            for stale in [t for t, exp in self._revoked.items() if exp < now]:
+                del self._revoked[stale]
+            while len(self._revoked) > self.max_revoked:
+                self._revoked.popitem(last=False)
+
+    def _remember(self, token, claims):
+        with self._lock:
+            self._cache[token] = claims
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+# -----------------------------------------------------------------------------
+# Rate Limiting
+# -----------------------------------------------------------------------------
+class RateLimiter:
+    """Token buckets keyed by username or client IP."""
+
+    def __init__(self, capacity=5, refill_per_second=1 / 30, max_keys=10000):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Take one token for `key`; False if its bucket is empty."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed
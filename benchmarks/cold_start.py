@@ -0,0 +1,162 @@
+"""Measure main.py cold start and warm reruns per page.
+
+Each sample is a fresh Python process (as after a container scale-out) that
+loads Streamlit, runs main.py once for a page and then reruns it; the parent
+records the time from spawning the process to the first page being rendered.
+Uses the same in-memory Supabase and SMTP sink as load_test.py. Run from the
+repo root:
+
+    python -m benchmarks.cold_start --samples 5 --report cold.json
+    python -m benchmarks.cold_start --baseline cold.json   # compare against an earlier report
+
+Columns: `spawn` is process start to first render, `first` is the first
+script run alone (the app's own imports and cache_resource setup), `warm` is
+the median of the reruns that follow. `pandas` shows whether the page pulled
+pandas in.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+PAGES = {
+    'login': None,
+    'student': 'student_a_1',
+    'staff': 'staff_a',
+    'hod': 'hod',
+    'principal': 'principal',
+    'admin': 'admin',
+}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(page, reruns, db_latency_ms):
+    """Runs in the spawned process; prints one JSON line with its timings."""
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks.fake_supabase import FakeSupabase
+    from benchmarks.load_test import MAIN, install
+    from benchmarks.smtp_sink import SMTPSink
+
+    fake = FakeSupabase(latency=db_latency_ms / 1000).seed()
+    install(fake, SMTPSink().start(), argparse.Namespace(digest_window=None))
+
+    at = AppTest.from_file(MAIN, default_timeout=60)
+    username = PAGES[page]
+    if username:
+        user = fake.tables['users'][username]
+        state = at.session_state
+        state['logged_in'] = True
+        state['user_role'] = user['role']
+        state['username'] = username
+        state['name'] = user['name']
+        state['section'] = user['section']
+
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    rendered_at = time.time()
+    pandas_loaded = 'pandas' in sys.modules
+
+    warm = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        warm.append(time.perf_counter() - start)
+
+    errors = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+    print(json.dumps({'first': first, 'warm': warm, 'rendered_at': rendered_at, 'pandas': pandas_loaded,
+                      'errors': errors}))
+
+
+def sample(page, reruns, db_latency_ms):
+    spawned_at = time.time()
+    out = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.cold_start', '--child', page, '--reruns', str(reruns),
+         '--db-latency-ms', str(db_latency_ms)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result['spawn'] = result['rendered_at'] - spawned_at
+    return result
+
+
+def summarize(samples):
+    ms = lambda seconds: round(seconds * 1000, 1)
+    return {
+        'samples': len(samples),
+        'spawn_ms': ms(statistics.median(s['spawn'] for s in samples)),
+        'first_run_ms': ms(statistics.median(s['first'] for s in samples)),
+        'warm_rerun_ms': ms(statistics.median(t for s in samples for t in s['warm'])),
+        'pandas_loaded': any(s['pandas'] for s in samples),
+        'errors': sorted({e.splitlines()[0][:200] for s in samples for e in s['errors']}),
+    }
+
+
+def print_report(report):
+    print(f"{'page':<10} {'spawn ms':>9} {'first ms':>9} {'warm ms':>8} {'pandas':>7}")
+    for page, r in report['pages'].items():
+        print(f"{page:<10} {r['spawn_ms']:>9.1f} {r['first_run_ms']:>9.1f} {r['warm_rerun_ms']:>8.1f} "
+              f"{'yes' if r['pandas_loaded'] else 'no':>7}")
+        for error in r['errors']:
+            print(f"    error: {error}")
+
+
+def compare(report, baseline):
+    print(f"\nvs baseline {baseline.get('commit')} ({baseline.get('generated_at', '')[:19]})")
+    print(f"{'page':<10} {'spawn ms':>16} {'first ms':>16} {'warm ms':>16}")
+    for page, now in report['pages'].items():
+        then = baseline.get('pages', {}).get(page)
+        if not then:
+            continue
+        cells = []
+        for key in ('spawn_ms', 'first_run_ms', 'warm_rerun_ms'):
+            change = (now[key] - then[key]) / then[key] * 100 if then[key] else 0.0
+            cells.append(f"{now[key]:>7.1f} ({change:+5.0f}%)")
+        print(f"{page:<10} " + " ".join(f"{c:>16}" for c in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", default=",".join(PAGES), help="Comma-separated pages to measure")
+    parser.add_argument("--samples", type=int, default=3, help="Fresh processes per page")
+    parser.add_argument("--reruns", type=int, default=5, help="Warm reruns per process")
+    parser.add_argument("--db-latency-ms", type=float, default=0, help="Simulated round trip per Supabase call")
+    parser.add_argument("--report", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--child", choices=PAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.reruns, args.db_latency_ms)
+        return
+
+    from benchmarks.load_test import git_commit
+
+    pages = [p.strip() for p in args.pages.split(",") if p.strip()]
+    unknown = set(pages) - set(PAGES)
+    if unknown:
+        parser.error(f"Unknown page(s): {', '.join(sorted(unknown))}")
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'config': {k: getattr(args, k) for k in ('samples', 'reruns', 'db_latency_ms')},
+        'pages': {page: summarize([sample(page, args.reruns, args.db_latency_ms) for _ in range(args.samples)])
+                  for page in pages},
+    }
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
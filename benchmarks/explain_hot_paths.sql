@@ -0,0 +1,46 @@
+-- Benchmark: Dashboard Query Plans Before/After hot_path_indexes.sql
+-- For a local, throwaway Postgres only: seeds synthetic leave requests and
+-- prints EXPLAIN ANALYZE for each dashboard query without and with indexes.
+-- Run from the repo root after setup.sql and the migrations:
+--
+--   psql -v rows=300000 -f benchmarks/explain_hot_paths.sql > explain_report.txt
+
+\set ON_ERROR_STOP on
+\if :{?rows}
+\else
+  \set rows 300000
+\endif
+
+-- 1. Seed synthetic requests (triggers off: no outbox rows or counter updates)
+set session_replication_role = replica;
+insert into leave_requests (student_username, student_name, student_section, leave_type,
+                            leave_dates, reason, status, date_requested)
+select u.username, u.name, u.section,
+       (array['Medical', 'OD', 'Casual'])[1 + (g % 3)],
+       'Synthetic',
+       'synthetic benchmark row',
+       (array['Pending Staff', 'Pending HOD', 'Pending Principal', 'Approved', 'Approved',
+              'Approved', 'Rejected by Staff', 'Rejected by HOD', 'Rejected by Principal'])[1 + (g % 9)],
+       now() - (g % 1460) * interval '1 day' - (g % 86400) * interval '1 second'
+  from generate_series(1, :rows) g
+  join lateral (
+    select username, name, section from users
+     where role = 'student'
+     order by username
+     offset (g % (select count(*) from users where role = 'student'))
+     limit 1
+  ) u on true;
+set session_replication_role = origin;
+
+-- 2. Query plans
+\echo '=================== BEFORE (no hot path indexes) ==================='
+\i rollback_hot_path_indexes.sql
+analyze leave_requests;
+\ir explain_queries.sql
+
+\echo '=================== AFTER (hot_path_indexes.sql) ==================='
+\i hot_path_indexes.sql
+\ir explain_queries.sql
+
+-- 3. Cleanup (uncomment to remove the synthetic rows)
+-- delete from leave_requests where reason = 'synthetic benchmark row';
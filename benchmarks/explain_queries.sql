@@ -0,0 +1,39 @@
+-- The dashboard queries issued by repository.py, for explain_hot_paths.sql.
+
+\echo '--- Staff pending queue'
+explain (analyze, buffers, costs off)
+select * from leave_requests where status = 'Pending Staff' and student_section = 'A';
+
+\echo '--- HOD pending queue'
+explain (analyze, buffers, costs off)
+select * from leave_requests where status = 'Pending HOD';
+
+\echo '--- Student history (first page)'
+explain (analyze, buffers, costs off)
+select date_requested, leave_dates, leave_type, status, staff_comment, hod_comment, principal_comment, id
+  from leave_requests where student_username = 'student_a_1'
+ order by date_requested desc, id desc limit 26;
+
+\echo '--- Staff history (first page)'
+explain (analyze, buffers, costs off)
+select date_requested, leave_dates, student_name, leave_type, status, staff_comment, id
+  from leave_requests where student_section = 'A' and status <> 'Pending Staff'
+ order by date_requested desc, id desc limit 26;
+
+\echo '--- HOD history (first page)'
+explain (analyze, buffers, costs off)
+select date_requested, leave_dates, student_name, student_section, leave_type, status, staff_comment, hod_comment, id
+  from leave_requests where status in ('Pending Principal', 'Approved', 'Rejected by HOD', 'Rejected by Principal')
+ order by date_requested desc, id desc limit 26;
+
+\echo '--- Admin overview page (section + last 90 days)'
+explain (analyze, buffers, costs off)
+select date_requested, leave_dates, student_name, student_section, leave_type, status, reason, id
+  from leave_requests
+ where status in ('Approved', 'Rejected by Staff', 'Rejected by HOD', 'Rejected by Principal')
+   and student_section = 'B' and date_requested >= now() - interval '90 days'
+ order by date_requested desc, id desc limit 51;
+
+\echo '--- Staff lookup for notification fan-out'
+explain (analyze, buffers, costs off)
+select email from users where role = 'staff' and section = 'A';
@@ -0,0 +1,502 @@
+"""In-memory stand-in for the parts of supabase-py the portal uses.
+
+Used by the load test to run main.py without a database. Tables live in
+dicts; the RPCs and the outbox trigger mirror the SQL migrations closely
+enough that the workflow (submit -> staff -> HOD -> principal, with
+notifications) behaves like the real stack. Every call sleeps `latency`
+seconds to stand in for the network round trip and is counted, both in total
+and per simulated session.
+"""
+import itertools
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timezone
+
+from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+
+# Session state key the load test sets so calls can be attributed to a session
+SESSION_KEY = 'bench_session'
+
+TRANSITIONS = {
+    ('staff', 'Pending Staff'): {'Pending HOD', 'Rejected by Staff'},
+    ('hod', 'Pending HOD'): {'Approved', 'Pending Principal', 'Rejected by HOD'},
+    ('principal', 'Pending Principal'): {'Approved', 'Rejected by Principal'},
+}
+COMMENT_COLUMN = {'staff': 'staff_comment', 'hod': 'hod_comment', 'principal': 'principal_comment'}
+PENDING_COMMENT = {'Pending Staff': 'staff_comment', 'Pending HOD': 'hod_comment', 'Pending Principal': 'principal_comment'}
+LEAVE_QUOTAS = {'Medical': 10, 'OD': 15, 'Casual': 6}  # leave_balances.sql defaults
+
+
+class Response:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _search_text(row):
+    return " ".join(str(row.get(c) or '') for c in ('student_name', 'student_username', 'leave_type', 'status',
+                                                    'reason')).lower().split()
+
+
+def _session():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return None  # background thread (outbox drainer, etc.)
+    try:
+        return ctx.session_state[SESSION_KEY]
+    except KeyError:
+        return None
+
+
+def _literal(value):
+    value = value.strip('"')
+    return int(value) if re.fullmatch(r'-?\d+', value) else value
+
+
+def _compare(left, op, right):
+    if left is None:
+        return False
+    if isinstance(right, str) and not isinstance(left, str):
+        left = str(left)
+    return {'eq': left == right, 'neq': left != right, 'lt': left < right,
+            'lte': left <= right, 'gt': left > right, 'gte': left >= right}[op]
+
+
+def _split(expr):
+    """Split a PostgREST logic expression on top-level commas."""
+    parts, depth, quoted, current = [], 0, False, ''
+    for ch in expr:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == '(':
+            depth += 1
+        elif not quoted and ch == ')':
+            depth -= 1
+        if ch == ',' and depth == 0 and not quoted:
+            parts.append(current)
+            current = ''
+        else:
+            current += ch
+    return parts + [current]
+
+
+def _logic(expr, conjunction=any):
+    """Build a row predicate from an or_()/and() filter string."""
+    tests = []
+    for part in _split(expr):
+        if part.startswith('and('):
+            tests.append(_logic(part[4:-1], all))
+        elif part.startswith('or('):
+            tests.append(_logic(part[3:-1], any))
+        else:
+            column, op, value = part.split('.', 2)
+            tests.append(lambda row, c=column, o=op, v=_literal(value): _compare(row.get(c), o, v))
+    return lambda row: conjunction(test(row) for test in tests)
+
+
+class Query:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.ordering = []
+        self.row_limit = None
+        self.columns = None
+        self.action = 'select'
+        self.payload = None
+        self.count = None
+
+    def select(self, columns='*', count=None):
+        self.columns = None if columns.strip() == '*' else [c.strip() for c in columns.split(',')]
+        self.count = count
+        return self
+
+    def insert(self, payload):
+        self.action, self.payload = 'insert', payload
+        return self
+
+    def upsert(self, payload, on_conflict=None, **kwargs):
+        self.action, self.payload = 'upsert', (payload, on_conflict)
+        return self
+
+    def update(self, payload):
+        self.action, self.payload = 'update', payload
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def _filter(self, column, op, value):
+        self.filters.append(lambda row: _compare(row.get(column), op, value))
+        return self
+
+    def eq(self, column, value): return self._filter(column, 'eq', value)
+    def neq(self, column, value): return self._filter(column, 'neq', value)
+    def lt(self, column, value): return self._filter(column, 'lt', value)
+    def lte(self, column, value): return self._filter(column, 'lte', value)
+    def gt(self, column, value): return self._filter(column, 'gt', value)
+    def gte(self, column, value): return self._filter(column, 'gte', value)
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(lambda row: (row.get(column) is None) == (value in (None, 'null')))
+        return self
+
+    def filter(self, column, operator, criteria):
+        if column == 'search' and operator.startswith('wfts'):
+            # leave_requests_archive's generated tsvector, approximated by word matching
+            words = criteria.lower().split()
+            self.filters.append(lambda row: all(w in _search_text(row) for w in words))
+            return self
+        return self._filter(column, operator, criteria)
+
+    def or_(self, expr):
+        self.filters.append(_logic(expr))
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self.row_limit = n
+        return self
+
+    def execute(self):
+        return self.db._execute(self)
+
+
+class RPC:
+    def __init__(self, db, name, params):
+        self.db = db
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        return self.db._call(self.name, self.params)
+
+
+class Bucket:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def exists(self, path):
+        self.db._count(f'storage.{self.name}.exists')
+        return (self.name, path) in self.db.objects
+
+    def upload(self, path, data, file_options=None):
+        self.db._count(f'storage.{self.name}.upload')
+        self.db.objects[(self.name, path)] = data.read() if hasattr(data, 'read') else bytes(data)
+
+    def download(self, path):
+        self.db._count(f'storage.{self.name}.download')
+        return self.db.objects[(self.name, path)]
+
+    def remove(self, paths):
+        self.db._count(f'storage.{self.name}.remove')
+        return [{'name': path} for path in paths if self.db.objects.pop((self.name, path), None) is not None]
+
+    def get_public_url(self, path):
+        return f"{self.db.supabase_url}/storage/v1/object/public/{self.name}/{path}"
+
+
+class Storage:
+    def __init__(self, db):
+        self.db = db
+
+    def from_(self, bucket):
+        return Bucket(self.db, bucket)
+
+
+class FakeSupabase:
+    def __init__(self, latency=0.0):
+        self.supabase_url = 'http://fake-supabase.local'
+        self.supabase_key = 'fake-key'
+        self.latency = latency
+        self.tables = {'sections': {}, 'users': {}, 'leave_requests': {}, 'notifications_outbox': {},
+                       'leave_requests_archive': {}, 'revoked_sessions': {}}
+        self.objects = {}
+        self.storage = Storage(self)
+        self.calls = Counter()           # "table.action" / "rpc.name" -> count
+        self.session_calls = Counter()   # session -> count
+        self._ids = {name: itertools.count(1) for name in self.tables}
+        self._lock = threading.RLock()
+
+    # -------------------------------------------------------------------------
+    # Client API
+    # -------------------------------------------------------------------------
+    def table(self, name):
+        return Query(self, name)
+
+    def rpc(self, name, params=None):
+        return RPC(self, name, params or {})
+
+    # -------------------------------------------------------------------------
+    # Seeding (mirrors setup.sql)
+    # -------------------------------------------------------------------------
+    def seed(self, students_per_section=46):
+        users = [
+            ('staff_a', 'staff', 'Staff Member (Section A)', 'A', 'staff_a@college.edu'),
+            ('staff_b', 'staff', 'Staff Member (Section B)', 'B', 'staff_b@college.edu'),
+            ('hod', 'hod', 'Head of Department', None, 'hod@college.edu'),
+            ('principal', 'principal', 'Principal', None, 'principal@college.edu'),
+            ('admin', 'admin', 'Administrator', None, 'admin@college.edu'),
+        ]
+        for section in ('A', 'B'):
+            self.tables['sections'][section] = {'code': section, 'name': f'Section {section}'}
+            for i in range(1, students_per_section + 1):
+                users.append((f'student_{section.lower()}_{i}', 'student', f'Student {section}-{i}', section,
+                              f'student_{section.lower()}_{i}@student.college.edu'))
+        for username, role, name, section, email in users:
+            self.tables['users'][username] = {
+                'username': username, 'role': role, 'name': name, 'section': section, 'email': email,
+                'password': None, 'password_hash': None,
+            }
+        return self
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+    def _count(self, what):
+        with self._lock:
+            self.calls[what] += 1
+            session = _session()
+            if session is not None:
+                self.session_calls[session] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _insert(self, table, row):
+        row = dict(row)
+        if table == 'users':
+            key = row['username']
+        elif table == 'sections':
+            key = row['code']
+        else:
+            key = row.setdefault('id', next(self._ids[table]))
+        if table == 'leave_requests':
+            row.setdefault('status', 'Pending Staff')
+            row.setdefault('date_requested', _now())
+            for column in ('staff_comment', 'hod_comment', 'principal_comment', 'file_url', 'preview_url'):
+                row.setdefault(column, None)
+        self.tables[table][key] = row
+        if table == 'leave_requests':
+            self._notify(None, row)
+        return row
+
+    def _execute(self, query):
+        self._count(f'{query.table}.{query.action}')
+        with self._lock:
+            rows = self.tables[query.table]
+            if query.action == 'insert':
+                payload = query.payload if isinstance(query.payload, list) else [query.payload]
+                return Response([dict(self._insert(query.table, row)) for row in payload])
+            if query.action == 'upsert':
+                payload, _ = query.payload
+                payload = payload if isinstance(payload, list) else [payload]
+                out = []
+                for row in payload:
+                    key = {'users': 'username', 'sections': 'code'}.get(query.table, 'id')
+                    key = row.get(key)
+                    if key in rows:
+                        rows[key].update(row)
+                        out.append(dict(rows[key]))
+                    else:
+                        out.append(dict(self._insert(query.table, row)))
+                return Response(out)
+
+            matched = [row for row in rows.values() if all(f(row) for f in query.filters)]
+            if query.action == 'update':
+                for row in matched:
+                    old = dict(row)
+                    row.update(query.payload)
+                    if query.table == 'leave_requests':
+                        self._notify(old, row)
+                return Response([dict(row) for row in matched])
+            if query.action == 'delete':
+                for row in matched:
+                    del rows[row['id'] if 'id' in row else row['username']]
+                return Response([dict(row) for row in matched])
+
+            count = len(matched) if query.count else None
+            for column, desc in reversed(query.ordering):
+                matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            if query.row_limit is not None:
+                matched = matched[:query.row_limit]
+            if query.columns:
+                return Response([{c: row.get(c) for c in query.columns} for row in matched], count)
+            return Response([dict(row) for row in matched], count)
+
+    def _call(self, name, params):
+        self._count(f'rpc.{name}')
+        with self._lock:
+            return Response(getattr(self, f'_rpc_{name}')(**params))
+
+    # -------------------------------------------------------------------------
+    # Outbox trigger (notifications_outbox.sql)
+    # -------------------------------------------------------------------------
+    def _enqueue(self, row, template, recipients, comment):
+        context = {k: row.get(k) for k in ('student_name', 'student_section', 'leave_type', 'leave_dates',
+                                           'reason', 'status', 'date_requested')}
+        context['comment'] = comment
+        outbox = self.tables['notifications_outbox']
+        for email in recipients:
+            if not email or '@' not in email:
+                continue
+            key = (row['id'], row['status'], template, email)
+            if any((o['request_id'], o['status'], o['template'], o['recipient']) == key for o in outbox.values()):
+                continue
+            self._insert('notifications_outbox', {
+                'request_id': row['id'], 'status': row['status'], 'template': template, 'recipient': email,
+                'context': context, 'state': 'pending', 'attempts': 0, 'claimed_by': None,
+                'claimed_at': None, 'next_attempt_at': None, 'created_at': _now(),
+            })
+
+    def _notify(self, old, new):
+        users = self.tables['users'].values()
+        if old is None:
+            self._enqueue(new, 'new_request', [u['email'] for u in users
+                                               if u['role'] == 'staff' and u['section'] == new['student_section']], None)
+            return
+        if old['status'] == new['status']:
+            return
+        comment = new.get(PENDING_COMMENT.get(old['status'], ''))
+        student = self.tables['users'].get(new['student_username'])
+        self._enqueue(new, 'status_update', [student['email']] if student else [], comment)
+        if new['status'] in ('Pending HOD', 'Pending Principal'):
+            role = 'hod' if new['status'] == 'Pending HOD' else 'principal'
+            template = 'forwarded_hod' if role == 'hod' else 'forwarded_principal'
+            self._enqueue(new, template, [u['email'] for u in users if u['role'] == role], comment)
+
+    # -------------------------------------------------------------------------
+    # RPCs
+    # -------------------------------------------------------------------------
+    def _move(self, row, p_new_status, p_comment, p_role):
+        old = dict(row)
+        row['status'] = p_new_status
+        row[COMMENT_COLUMN[p_role]] = p_comment
+        self._notify(old, row)
+        return old['status']
+
+    def _rpc_transition_leave_request(self, p_id, p_new_status, p_comment, p_role):
+        row = self.tables['leave_requests'].get(p_id)
+        if row is None:
+            raise ValueError(f"Leave request {p_id} not found")
+        if p_new_status not in TRANSITIONS.get((p_role, row['status']), ()):
+            raise ValueError(f"{p_role} cannot move request {p_id} from {row['status']} to {p_new_status}")
+        old_status = self._move(row, p_new_status, p_comment, p_role)
+        recipients = [o['recipient'] for o in self.tables['notifications_outbox'].values()
+                      if o['request_id'] == p_id and o['status'] == p_new_status]
+        return dict(row, old_status=old_status, recipients=recipients)
+
+    def _rpc_transition_leave_requests(self, p_ids, p_new_status, p_comment, p_role):
+        out = []
+        for req_id in p_ids:
+            row = self.tables['leave_requests'].get(req_id)
+            if row is None or p_new_status not in TRANSITIONS.get((p_role, row['status']), ()):
+                continue
+            old_status = self._move(row, p_new_status, p_comment, p_role)
+            out.append({'id': req_id, 'old_status': old_status, 'status': p_new_status,
+                        'student_section': row['student_section'], 'student_username': row['student_username']})
+        return out
+
+    def _claimable(self, lease=300):
+        now = time.time()
+        return [o for o in self.tables['notifications_outbox'].values()
+                if o['state'] == 'pending' or (o['state'] == 'sending' and o['claimed_at'] < now - lease)]
+
+    def _claim(self, rows, p_worker):
+        for row in rows:
+            row.update(state='sending', claimed_by=p_worker, claimed_at=time.time(), attempts=row['attempts'] + 1)
+        return [dict(row) for row in rows]
+
+    def _rpc_claim_notifications(self, p_worker, p_limit=50, p_lease=None):
+        return self._claim(self._claimable()[:p_limit], p_worker)
+
+    def _rpc_claim_notification_digests(self, p_worker, p_window, p_limit=50, p_lease=None):
+        window = float(str(p_window).split()[0])
+        oldest = {}
+        for row in self._claimable():
+            created = datetime.fromisoformat(row['created_at']).timestamp()
+            oldest[row['recipient']] = min(oldest.get(row['recipient'], created), created)
+        due = sorted((t, r) for r, t in oldest.items() if t <= time.time() - window)[:p_limit]
+        due = {r for _, r in due}
+        return self._claim([row for row in self._claimable() if row['recipient'] in due], p_worker)
+
+    def _rpc_complete_notifications(self, p_worker, p_ids):
+        for i in p_ids:
+            row = self.tables['notifications_outbox'][i]
+            if row['claimed_by'] == p_worker and row['state'] == 'sending':
+                row.update(state='sent', sent_at=_now(), last_error=None)
+
+    def _rpc_release_notifications(self, p_worker, p_ids, p_error, p_max_attempts=5):
+        for i in p_ids:
+            row = self.tables['notifications_outbox'][i]
+            if row['claimed_by'] == p_worker and row['state'] == 'sending':
+                row.update(state='failed' if row['attempts'] >= p_max_attempts else 'pending', last_error=p_error)
+
+    def _rpc_leave_request_summary(self, p_statuses, p_section=None, p_start=None, p_end=None):
+        counts = Counter()
+        for row in self.tables['leave_requests'].values():
+            day = row['date_requested'][:10]
+            if row['status'] not in p_statuses or (p_section and row['student_section'] != p_section):
+                continue
+            if (p_start and day < p_start) or (p_end and day > p_end):
+                continue
+            counts['approved' if row['status'] == 'Approved' else 'rejected'] += 1
+        return [{'approved': counts['approved'], 'rejected': counts['rejected']}]
+
+    def _rpc_leaves_on_day(self, p_day, p_section=None, p_statuses=('Approved',)):
+        return [dict(row) for row in self.tables['leave_requests'].values()
+                if row['status'] in p_statuses and (not p_section or row['student_section'] == p_section)
+                and row.get('leave_start') and row['leave_start'] <= p_day <= (row.get('leave_end') or row['leave_start'])]
+
+    def _rpc_overlapping_leaves(self, p_username, p_start, p_end):
+        return [dict(row) for row in self.tables['leave_requests'].values()
+                if row['student_username'] == p_username and row.get('leave_start')
+                and not row['status'].startswith('Rejected')
+                and row['leave_start'] <= p_end and p_start <= (row.get('leave_end') or row['leave_start'])]
+
+    def _rpc_leave_balances_for(self, p_ids):
+        # Recomputed from the requests rather than kept as counters; terms are calendar years
+        def days(row):
+            start = date.fromisoformat(row['leave_start'])
+            return (date.fromisoformat(row.get('leave_end') or row['leave_start']) - start).days + 1
+
+        out = []
+        for req_id in p_ids:
+            req = self.tables['leave_requests'].get(req_id)
+            if req is None or not req.get('leave_start'):
+                continue
+            term = req['leave_start'][:4]
+            used = sum(days(row) for row in self.tables['leave_requests'].values()
+                       if row['status'] == 'Approved' and row.get('leave_start')
+                       and row['student_username'] == req['student_username']
+                       and row['leave_type'] == req['leave_type'] and row['leave_start'][:4] == term)
+            out.append({'id': req_id, 'leave_type': req['leave_type'], 'term': term, 'used_days': used,
+                        'quota': LEAVE_QUOTAS.get(req['leave_type']), 'requested_days': days(req)})
+        return out
+
+    def _rpc_archive_leave_requests(self, p_older_than, p_limit=500):
+        days = float(p_older_than.split()[0])
+        cutoff = datetime.fromtimestamp(time.time() - days * 86400, timezone.utc).isoformat()
+        rows = sorted((row for row in self.tables['leave_requests'].values()
+                       if not row['status'].startswith('Pending') and row['date_requested'] < cutoff),
+                      key=lambda row: row['id'])[:p_limit]
+        for row in rows:
+            del self.tables['leave_requests'][row['id']]
+            self.tables['leave_requests_archive'][row['id']] = dict(row, archived_at=_now())
+        return [{'id': row['id'], 'file_url': row.get('file_url'), 'preview_url': row.get('preview_url')}
+                for row in rows]
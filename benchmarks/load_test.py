@@ -0,0 +1,339 @@
+"""Drive main.py headlessly with many simulated sessions and report latency.
+
+Runs the real app under Streamlit's AppTest against an in-memory Supabase
+(benchmarks/fake_supabase.py) and a local SMTP sink (benchmarks/smtp_sink.py),
+so no services are needed. Students submit leave requests while staff, HOD and
+principal sessions work their queues; each round every session takes one
+action, `--concurrency` at a time. Run from the repo root:
+
+    python -m benchmarks.load_test --sessions 200 --rounds 3 --report load.json
+    python -m benchmarks.load_test --baseline load.json   # compare against an earlier report
+
+Sessions start logged in (the login form and password hashing are not
+exercised). Every script run is timed and the Supabase calls it makes are
+counted; after the last round the outbox drainer is given time to send, and
+emails reaching the sink are reported per action.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import streamlit as st
+import supabase
+from streamlit import config
+from streamlit.runtime.runtime import Runtime
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.fake_supabase import SESSION_KEY, FakeSupabase
+from benchmarks.smtp_sink import SMTPSink
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+# Buttons each reviewer role can press on a pending card, with relative weights
+REVIEW_BUTTONS = {
+    'staff': [('f_', 8), ('r_', 2)],
+    'hod': [('ha_', 5), ('hp_', 4), ('hr_', 1)],
+    'principal': [('pa_', 9), ('pr_', 1)],
+}
+LEAVE_DAYS = itertools.count()  # spreads submissions out so overlap checks never clash
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100)."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class Session:
+    def __init__(self, number, role, user, timeout, rng, recorder):
+        self.number = number
+        self.role = role
+        self.rng = rng
+        self.recorder = recorder
+        self.at = AppTest.from_file(MAIN, default_timeout=timeout)
+        state = self.at.session_state
+        state[SESSION_KEY] = number
+        state['logged_in'] = True
+        state['user_role'] = role
+        state['username'] = user['username']
+        state['name'] = user['name']
+        state['section'] = user.get('section')
+        self.loaded = False
+
+    def _run(self, label, action):
+        before = self.recorder.fake.session_calls[self.number]
+        start = time.perf_counter()
+        action()
+        elapsed = time.perf_counter() - start
+        calls = self.recorder.fake.session_calls[self.number] - before
+        errors = [str(e.value) for e in self.at.exception] + [str(e.value) for e in self.at.error]
+        self.recorder.record(label, elapsed, calls, errors)
+
+    def step(self):
+        if not self.loaded:
+            self._run(f"{self.role}.load", self.at.run)
+            self.loaded = True
+        if self.role == 'student':
+            self._submit()
+        else:
+            self._review()
+
+    def _submit(self):
+        start = date.today() + timedelta(days=365 + 3 * next(LEAVE_DAYS))
+        self.at.date_input[0].set_value((start, start + timedelta(days=self.rng.randint(0, 2))))
+        self.at.text_area[0].input(f"Load test request from session {self.number}")
+        self._run('student.submit', self.at.button[0].click().run)
+        self.recorder.count_action('submit')
+
+    def _review(self):
+        self._run(f"{self.role}.refresh", self.at.run)
+        prefixes, weights = zip(*REVIEW_BUTTONS[self.role])
+        prefix = self.rng.choices(prefixes, weights)[0]
+        buttons = [b for b in self.at.button if b.key and b.key.startswith(prefix)]
+        if not buttons:
+            self.recorder.count_action('idle')
+            return
+        self._run(f"{self.role}.review", self.rng.choice(buttons).click().run)
+        self.recorder.count_action('review')
+
+
+class Recorder:
+    def __init__(self, fake):
+        self.fake = fake
+        self.timings = defaultdict(list)
+        self.db_calls = defaultdict(list)
+        self.errors = Counter()
+        self.error_messages = Counter()
+        self.actions = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, label, elapsed, calls, errors):
+        with self._lock:
+            self.timings[label].append(elapsed)
+            self.db_calls[label].append(calls)
+            self.errors[label] += len(errors)
+            self.error_messages.update(message.splitlines()[0][:200] for message in errors)
+
+    def count_action(self, action):
+        with self._lock:
+            self.actions[action] += 1
+
+    def summary(self, label, timings, calls):
+        return {
+            'runs': len(timings),
+            'mean_ms': round(sum(timings) / len(timings) * 1000, 2),
+            'p50_ms': round(percentile(timings, 50) * 1000, 2),
+            'p95_ms': round(percentile(timings, 95) * 1000, 2),
+            'p99_ms': round(percentile(timings, 99) * 1000, 2),
+            'db_calls_per_run': round(sum(calls) / len(calls), 2),
+            'errors': self.errors[label],
+        }
+
+
+def install(fake, sink, args):
+    """Point main.py at the fake client and the SMTP sink."""
+    supabase.create_client = lambda url, key: fake
+    secrets = Secrets()
+    secrets._secrets = {
+        'supabase': {'url': fake.supabase_url, 'key': fake.supabase_key},
+        'realtime': {'enabled': False},
+        'auth': {'session_secret': 'load-test'},
+        'email': {
+            'sender_email': 'portal@college.edu', 'password': '', 'smtp_server': sink.host,
+            'smtp_port': sink.port, 'starttls': False,
+        },
+        'outbox': {'digest_window_seconds': args.digest_window} if args.digest_window else {},
+    }
+    # Set once for the whole process instead of per AppTest, which would swap
+    # the global secrets back and forth under concurrent runs
+    st.secrets = secrets
+
+
+def allow_concurrent_runs():
+    """Let AppTests run concurrently.
+
+    Each AppTest run installs a mock Runtime and the global.appTest option,
+    then clears both when done, pulling them out from under runs still in
+    flight on other threads. Turn the option on for the whole process and
+    keep answering with the last mock runtime. Each run also recompiles the
+    script, and ast.parse isn't thread-safe on every Python; compile once
+    and share the bytecode, as a real server's script cache does.
+    """
+    config.set_option("global.appTest", True)
+
+    compiled = {}
+    compile_lock = threading.Lock()
+    get_bytecode = ScriptCache.get_bytecode
+
+    def shared_bytecode(self, script_path):
+        with compile_lock:
+            if script_path not in compiled:
+                compiled[script_path] = get_bytecode(self, script_path)
+            return compiled[script_path]
+
+    ScriptCache.get_bytecode = shared_bytecode
+
+    last = [None]
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[0] = cls._instance
+        if last[0] is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return cls._instance or last[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or last[0] is not None)
+
+
+def build_sessions(fake, args, recorder):
+    rng = random.Random(args.seed)
+    weights = dict(item.split('=') for item in args.mix.split(','))
+    roles = rng.choices(list(weights), [float(w) for w in weights.values()], k=args.sessions)
+    users = fake.tables['users'].values()
+    pools = {
+        'student': [u for u in users if u['role'] == 'student'],
+        'staff': [u for u in users if u['role'] == 'staff'],
+        'hod': [u for u in users if u['role'] == 'hod'],
+        'principal': [u for u in users if u['role'] == 'principal'],
+    }
+    cursors = {role: itertools.cycle(pool) for role, pool in pools.items()}
+    return [Session(n, role, next(cursors[role]), args.timeout, random.Random(rng.random()), recorder)
+            for n, role in enumerate(roles, 1)]
+
+
+def wait_for_outbox(fake, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with fake._lock:
+            if not any(o['state'] in ('pending', 'sending') for o in fake.tables['notifications_outbox'].values()):
+                return True
+        time.sleep(0.5)
+    return False
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(MAIN)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def build_report(args, fake, sink, recorder, elapsed, drained):
+    runs = {label: recorder.summary(label, recorder.timings[label], recorder.db_calls[label])
+            for label in sorted(recorder.timings)}
+    all_timings = [t for ts in recorder.timings.values() for t in ts]
+    all_calls = [c for cs in recorder.db_calls.values() for c in cs]
+    runs['all'] = recorder.summary('all', all_timings, all_calls)
+    runs['all']['errors'] = sum(recorder.errors.values())
+
+    session_calls = sum(fake.session_calls.values())
+    acted = recorder.actions['submit'] + recorder.actions['review']
+    templates = Counter(o['template'] for o in fake.tables['notifications_outbox'].values())
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'config': {k: getattr(args, k) for k in ('sessions', 'rounds', 'concurrency', 'mix', 'db_latency_ms',
+                                                'digest_window', 'seed')},
+        'wall_seconds': round(elapsed, 2),
+        'actions': dict(recorder.actions),
+        'runs': runs,
+        'top_errors': dict(recorder.error_messages.most_common(10)),
+        'db_calls': {
+            'total': sum(fake.calls.values()),
+            'sessions': session_calls,
+            'background': sum(fake.calls.values()) - session_calls,
+            'by_call': dict(fake.calls.most_common()),
+        },
+        'emails': {
+            'sent': sink.messages,
+            'per_action': round(sink.messages / acted, 2) if acted else None,
+            'notifications_by_template': dict(templates),
+            'outbox_drained': drained,
+        },
+    }
+
+
+def compare(report, baseline):
+    print(f"\nvs baseline {baseline.get('commit')} ({baseline.get('generated_at', '')[:19]})")
+    print(f"{'run':<20} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16} {'db/run':>14}")
+    for label, now in report['runs'].items():
+        then = baseline.get('runs', {}).get(label)
+        if not then:
+            continue
+        cells = []
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'db_calls_per_run'):
+            change = (now[key] - then[key]) / then[key] * 100 if then[key] else 0.0
+            cells.append(f"{now[key]:>7.1f} ({change:+5.0f}%)")
+        print(f"{label:<20} " + " ".join(f"{c:>16}" for c in cells))
+
+
+def print_report(report):
+    print(f"{'run':<20} {'runs':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db/run':>7} {'errors':>7}")
+    for label, r in report['runs'].items():
+        print(f"{label:<20} {r['runs']:>6} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+              f"{r['db_calls_per_run']:>7.1f} {r['errors']:>7}")
+    emails = report['emails']
+    print(f"\nactions: {report['actions']}  emails sent: {emails['sent']} ({emails['per_action']} per action)"
+          f"  db calls: {report['db_calls']['total']} ({report['db_calls']['background']} background)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200, help="Simulated browser sessions")
+    parser.add_argument("--rounds", type=int, default=3, help="Actions per session")
+    parser.add_argument("--concurrency", type=int, default=16, help="Sessions running a script at once")
+    parser.add_argument("--mix", default="student=70,staff=15,hod=10,principal=5", help="Role weights")
+    parser.add_argument("--db-latency-ms", type=float, default=5, help="Simulated round trip per Supabase call")
+    parser.add_argument("--digest-window", type=float, default=None, help="Run the drainer in digest mode")
+    parser.add_argument("--timeout", type=float, default=60, help="Per script run timeout (seconds)")
+    parser.add_argument("--drain-timeout", type=float, default=60, help="Seconds to wait for the outbox to empty")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--report", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    fake = FakeSupabase(latency=args.db_latency_ms / 1000).seed()
+    sink = SMTPSink().start()
+    install(fake, sink, args)
+    allow_concurrent_runs()
+    recorder = Recorder(fake)
+    sessions = build_sessions(fake, args, recorder)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in range(args.rounds):
+            # Reviewers go after students so there is something in their queues
+            for group in ([s for s in sessions if s.role == 'student'], [s for s in sessions if s.role != 'student']):
+                list(pool.map(lambda s: s.step(), group))
+    elapsed = time.perf_counter() - start
+
+    wait = args.drain_timeout + (args.digest_window or 0)
+    drained = wait_for_outbox(fake, wait)
+    report = build_report(args, fake, sink, recorder, elapsed, drained)
+    sink.stop()
+
+    print_report(report)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
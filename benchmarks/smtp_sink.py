@@ -0,0 +1,81 @@
+"""A local SMTP server that accepts and counts every message.
+
+Speaks just enough SMTP for smtplib (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP,
+QUIT) without TLS or AUTH, so point the mailer at it with starttls = false and
+an empty password.
+"""
+import socketserver
+import threading
+from collections import Counter
+from email import message_from_bytes
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        sink = self.server.sink
+        recipients = []
+        self.reply("220 smtp-sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode(errors="replace").strip().split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-smtp-sink")
+                self.reply("250 8BITMIME")
+            elif verb in ("HELO", "NOOP"):
+                self.reply("250 OK")
+            elif verb in ("MAIL", "RSET"):
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(line.decode().split(":", 1)[1].strip().strip("<>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for raw in self.rfile:
+                    if raw in (b".\r\n", b".\n"):
+                        break
+                    data.append(raw[1:] if raw.startswith(b"..") else raw)
+                sink.record(recipients, message_from_bytes(b"".join(data)))
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    def __init__(self, host="127.0.0.1", port=0):
+        self._server = _Server((host, port), _Handler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+        self.messages = 0
+        self.by_recipient = Counter()
+        self.subjects = []
+        self._lock = threading.Lock()
+
+    def record(self, recipients, message):
+        with self._lock:
+            self.messages += 1
+            self.by_recipient.update(recipients)
+            self.subjects.append(message["Subject"])
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="smtp-sink", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
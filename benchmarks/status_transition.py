@@ -0,0 +1,91 @@
+"""Compare the old and RPC status-transition paths against a local stack.
+
+Point .streamlit/secrets.toml (or PORTAL_SECRETS) at a local Supabase
+(`supabase start`) with setup.sql, notifications_outbox.sql and
+transition_leave_request.sql applied, then run from the repo root:
+
+    python -m benchmarks.status_transition --iterations 50
+"""
+import argparse
+import statistics
+import time
+
+from config import connect, load_secrets
+
+
+class RoundTrips:
+    def __init__(self):
+        self.count = 0
+
+    def execute(self, builder):
+        self.count += 1
+        return builder.execute()
+
+
+def old_path(client, trips, req_id):
+    """The pre-RPC update_request_status: select, update, then user lookups."""
+    req = trips.execute(client.table('leave_requests').select('student_username, student_name, date_requested').eq('id', req_id)).data[0]
+    trips.execute(client.table('leave_requests').update({'status': 'Pending HOD', 'staff_comment': 'bench'}).eq('id', req_id))
+    trips.execute(client.table('users').select('email').eq('username', req['student_username']))
+    trips.execute(client.table('users').select('email').eq('role', 'hod'))
+
+
+def new_path(client, trips, req_id):
+    trips.execute(client.rpc('transition_leave_request', {
+        'p_id': req_id, 'p_new_status': 'Pending HOD', 'p_comment': 'bench', 'p_role': 'staff',
+    }))
+
+
+def create_request(client, student):
+    row = client.table('leave_requests').insert({
+        'student_username': student['username'],
+        'student_name': student['name'],
+        'student_section': student['section'],
+        'leave_type': 'OD',
+        'leave_dates': 'Benchmark',
+        'reason': 'status_transition benchmark',
+        'status': 'Pending Staff',
+    }).execute().data[0]
+    return row['id']
+
+
+def cleanup(client, ids):
+    client.table('notifications_outbox').delete().in_('request_id', ids).execute()
+    client.table('leave_requests').delete().in_('id', ids).execute()
+
+
+def run(client, path, student, iterations):
+    timings = []
+    trips = RoundTrips()
+    ids = []
+    try:
+        for _ in range(iterations):
+            req_id = create_request(client, student)
+            ids.append(req_id)
+            start = time.perf_counter()
+            path(client, trips, req_id)
+            timings.append(time.perf_counter() - start)
+    finally:
+        if ids:
+            cleanup(client, ids)
+    return trips.count / iterations, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--secrets")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    client = connect(load_secrets(args.secrets))
+    student = client.table('users').select('username, name, section').eq('role', 'student').limit(1).execute().data[0]
+
+    print(f"{'path':<6} {'trips':>6} {'mean ms':>9} {'p50 ms':>8} {'max ms':>8}")
+    for name, path in (('old', old_path), ('rpc', new_path)):
+        trips, timings = run(client, path, student, args.iterations)
+        print(f"{name:<6} {trips:>6.1f} {statistics.mean(timings) * 1000:>9.1f} "
+              f"{statistics.median(timings) * 1000:>8.1f} {max(timings) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+-- Migration: Bulk Status Transitions
+-- Set-based counterpart of transition_leave_request for the staff/HOD batch
+-- actions: one statement moves every eligible request, and the outbox trigger
+-- queues all of their notifications in the same transaction.
+-- Requires transition_leave_request.sql.
+
+create or replace function transition_leave_requests(p_ids bigint[], p_new_status text, p_comment text, p_role text)
+returns table (id bigint, old_status text, status text, student_section text, student_username text)
+language plpgsql as $$
+#variable_conflict use_column
+begin
+  -- Requests not in a state this role may move (already handled by someone
+  -- else, wrong queue) are skipped rather than failing the whole batch
+  return query
+  with eligible as (
+    select r.id, r.status::text as old_status
+      from leave_requests r
+      join leave_status_transitions t
+        on t.role = p_role and t.from_status = r.status::text and t.to_status = p_new_status
+     where r.id = any(p_ids)
+     order by r.id
+       for update of r
+  )
+  update leave_requests r
+     set status = p_new_status,
+         staff_comment = case when p_role = 'staff' then p_comment else r.staff_comment end,
+         hod_comment = case when p_role = 'hod' then p_comment else r.hod_comment end,
+         principal_comment = case when p_role = 'principal' then p_comment else r.principal_comment end
+    from eligible e
+   where r.id = e.id
+  returning r.id, e.old_status, r.status::text, r.student_section, r.student_username;
+end;
+$$;
@@ -0,0 +1,23 @@
+import os
+import tomllib
+
+from supabase import create_client
+
+# -----------------------------------------------------------------------------
+# Configuration for scripts that run outside Streamlit
+# -----------------------------------------------------------------------------
+# Streamlit reads .streamlit/secrets.toml into st.secrets; background jobs
+# (outbox drainer, reports, imports) read the same file directly.
+
+SECRETS_PATH = os.environ.get("PORTAL_SECRETS", os.path.join(".streamlit", "secrets.toml"))
+
+
+def load_secrets(path=None):
+    """Load the portal secrets file as a dict."""
+    with open(path or SECRETS_PATH, "rb") as f:
+        return tomllib.load(f)
+
+
+def connect(secrets):
+    """Create a Supabase client from loaded secrets."""
+    return create_client(secrets["supabase"]["url"], secrets["supabase"]["key"])
@@ -0,0 +1,71 @@
+import threading
+import time
+
+# -----------------------------------------------------------------------------
+# User Directory
+# -----------------------------------------------------------------------------
+# The users table is small and rarely changes, so each process loads it in one
+# query (plus the sections table) and answers username and section lookups
+# from memory. The snapshot is reloaded when it is older than `ttl`, when
+# invalidate() is called (the realtime feed does this on user_directory_version
+# changes, see user_directory.sql), or on a lookup miss so new accounts show up
+# without waiting out the TTL.
+
+DIRECTORY_COLUMNS = 'username, role, name, section, email'
+
+
+class UserDirectory:
+    def __init__(self, client, ttl=300, miss_refresh=30):
+        self.client = client
+        self.ttl = ttl
+        self.miss_refresh = miss_refresh
+        self._by_username = {}
+        self._sections = []
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        rows = self.client.table('users').select(DIRECTORY_COLUMNS).execute().data
+        by_username = {row['username']: row for row in rows}
+        sections = [s['code'] for s in self.client.table('sections').select('code').order('code').execute().data]
+        with self._lock:
+            self._by_username, self._sections = by_username, sections
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _age(self):
+        """Seconds since the last load; None once invalidated (or never loaded).
+
+        Read under the lock: invalidate() may reset _loaded_at concurrently.
+        """
+        with self._lock:
+            loaded_at = self._loaded_at
+        return None if loaded_at is None else time.monotonic() - loaded_at
+
+    def _current(self):
+        age = self._age()
+        if age is None or age > self.ttl:
+            self.refresh()
+
+    def get(self, username):
+        """The user's directory row, or None."""
+        self._current()
+        user = self._by_username.get(username)
+        if user is None:
+            age = self._age()
+            if age is None or age > self.miss_refresh:
+                self.refresh()
+                user = self._by_username.get(username)
+        return user
+
+    def section_of(self, username):
+        user = self.get(username)
+        return user.get('section') if user else None
+
+    def sections(self):
+        """Section codes from the sections table, sorted."""
+        self._current()
+        return list(self._sections)
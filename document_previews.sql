@@ -0,0 +1,5 @@
+-- Migration: Document Previews
+-- Reviewers see a small JPEG preview of image uploads instead of pulling the
+-- original for every "View Doc".
+
+alter table leave_requests add column if not exists preview_url text;
@@ -0,0 +1,161 @@
+import base64
+import hashlib
+import io
+import mimetypes
+
+import httpx
+
+# -----------------------------------------------------------------------------
+# Leave Document Storage
+# -----------------------------------------------------------------------------
+# Uploads are read in chunks: hashed incrementally (SHA-256), capped at a hard
+# size limit and stored under their content hash, so a student resubmitting
+# the same certificate reuses the stored object. Large files go through
+# Supabase's resumable (TUS) endpoint chunk by chunk; images also get a small
+# JPEG preview for reviewers. archive.py later moves archived requests'
+# documents to a cold bucket with copy_document().
+
+HASH_CHUNK_SIZE = 1024 * 1024
+TUS_CHUNK_SIZE = 6 * 1024 * 1024  # Supabase requires 6 MB chunks for resumable uploads
+PREVIEW_SIZE = (480, 480)
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def hash_file(file, max_bytes):
+    """SHA-256 and size of a seekable file, read chunk by chunk."""
+    file.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = file.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"File is larger than the {max_bytes / (1024 * 1024):g} MB limit")
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest(), size
+
+
+def store_document(client, file, content_type, max_bytes, bucket='documents', previews=True):
+    """Store an upload under its content hash.
+
+    Returns (file_url, preview_url); preview_url is None for non-images or
+    when Pillow is unavailable.
+    """
+    digest, size = hash_file(file, max_bytes)
+    file_name = f"{digest}{mimetypes.guess_extension(content_type) or '.pdf'}"
+    store = client.storage.from_(bucket)
+
+    if not store.exists(file_name):
+        try:
+            if size <= TUS_CHUNK_SIZE:
+                upload_stream(store, file_name, file, content_type)
+            else:
+                resumable_upload(client.supabase_url, client.supabase_key, bucket, file_name,
+                                 file, size, content_type)
+        except Exception:
+            # Someone uploaded the same bytes between our check and upload
+            if not store.exists(file_name):
+                raise
+
+    preview_url = None
+    if previews and content_type.startswith('image/'):
+        preview_url = store_preview(store, file, digest)
+    return store.get_public_url(file_name), preview_url
+
+
+def upload_stream(store, name, file, content_type):
+    """Upload a seekable file object without reading it into a second buffer.
+
+    storage3 only streams BufferedReader/FileIO bodies (anything else is taken
+    for a path), so the upload is wrapped, then detached to leave it open.
+    """
+    file.seek(0)
+    reader = io.BufferedReader(file)
+    try:
+        store.upload(name, reader, {"content-type": content_type})
+    finally:
+        reader.detach()
+
+
+def store_preview(store, file, digest):
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    preview_name = f"previews/{digest}.jpg"
+    if not store.exists(preview_name):
+        try:
+            file.seek(0)
+            with Image.open(file) as img:
+                img.thumbnail(PREVIEW_SIZE)
+                out = io.BytesIO()
+                img.convert("RGB").save(out, "JPEG", quality=70, optimize=True)
+            store.upload(preview_name, out.getvalue(), {"content-type": "image/jpeg"})
+        except Exception as e:
+            print(f"Preview generation failed for {digest}: {e}")
+            return None
+    return store.get_public_url(preview_name)
+
+
+def object_path(url, bucket):
+    """Path inside `bucket` of a public URL from get_public_url(), or None if
+    the URL points elsewhere."""
+    marker = f"/object/public/{bucket}/"
+    if not url or marker not in url:
+        return None
+    return url.split(marker, 1)[1].split("?", 1)[0]
+
+
+def copy_document(client, url, src_bucket, dst_bucket):
+    """Copy a stored document (or preview) to another bucket under the same
+    path. Returns its public URL there; the source object is left in place."""
+    path = object_path(url, src_bucket)
+    dst = client.storage.from_(dst_bucket)
+    if not dst.exists(path):
+        data = client.storage.from_(src_bucket).download(path)
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        dst.upload(path, data, {"content-type": content_type})
+    return dst.get_public_url(path)
+
+
+def resumable_upload(supabase_url, api_key, bucket, file_name, file, size, content_type, max_retries=3):
+    """Upload through the TUS endpoint, resuming from the server's offset on errors."""
+    endpoint = f"{supabase_url.rstrip('/')}/storage/v1/upload/resumable"
+    headers = {"authorization": f"Bearer {api_key}", "apikey": api_key, "tus-resumable": "1.0.0"}
+    metadata = ",".join(
+        f"{k} {base64.b64encode(v.encode()).decode()}"
+        for k, v in (("bucketName", bucket), ("objectName", file_name), ("contentType", content_type))
+    )
+
+    with httpx.Client(timeout=60) as http:
+        res = http.post(endpoint, headers={**headers, "upload-length": str(size), "upload-metadata": metadata})
+        res.raise_for_status()
+        location = res.headers["location"]
+
+        offset = 0
+        retries = 0
+        while offset < size:
+            file.seek(offset)
+            chunk = file.read(TUS_CHUNK_SIZE)
+            try:
+                res = http.patch(location, content=chunk, headers={
+                    **headers, "upload-offset": str(offset), "content-type": "application/offset+octet-stream",
+                })
+                res.raise_for_status()
+                offset = int(res.headers["upload-offset"])
+                retries = 0
+            except httpx.HTTPError:
+                retries += 1
+                if retries > max_retries:
+                    raise
+                # Ask the server how much it actually has and continue from there
+                head = http.head(location, headers=headers)
+                head.raise_for_status()
+                offset = int(head.headers["upload-offset"])
@@ -0,0 +1,151 @@
+import argparse
+import csv
+import importlib.util
+import io
+from collections import Counter
+from datetime import date
+
+from config import connect, load_secrets
+from repository import LeaveRepository, PROCESSED_STATUSES, QueryCache, REJECTED_STATUSES
+
+# -----------------------------------------------------------------------------
+# Exports and Offline Reports
+# -----------------------------------------------------------------------------
+# Exports walk leave_requests in keyset pages (LeaveRepository.scan) and write
+# each page as it arrives; written to a file by the CLI, memory stays at one
+# page whatever the size of the history (the dashboard's download buttons
+# have to hold the finished file in memory). Reports aggregate the same page
+# stream into per-section / per-type / per-month totals. Run from cron or by
+# hand, outside Streamlit:
+#
+#   python export.py export --format parquet --out leave_requests.parquet
+#   python export.py report --from 2025-01-01 --to 2025-06-30 --out term_report.csv
+
+EXPORT_COLUMNS = ['id', 'date_requested', 'student_username', 'student_name', 'student_section', 'leave_type',
+                  'leave_dates', 'leave_start', 'leave_end', 'status', 'reason', 'staff_comment', 'hod_comment',
+                  'principal_comment']
+REPORT_COLUMNS = ['student_section', 'leave_type', 'status', 'date_requested']
+REPORT_GROUPS = {'section': 'student_section', 'type': 'leave_type', 'month': 'month'}
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def write_csv(pages, columns, out):
+    """Write pages of rows to a text file object as CSV. Returns the row count."""
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for page in pages:
+        writer.writerows(page)
+        count += len(page)
+    return count
+
+
+def write_parquet(pages, columns, out):
+    """Write pages of rows to a binary file object as Parquet, one row group per page."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(c, pa.int64() if c == 'id' else pa.string()) for c in columns])
+    count = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for page in pages:
+            table = pa.table({
+                c: [row.get(c) if c == 'id' or row.get(c) is None else str(row[c]) for row in page]
+                for c in columns
+            }, schema=schema)
+            writer.write_table(table)
+            count += len(page)
+    return count
+
+
+def export_file(repo, fmt, columns=EXPORT_COLUMNS, **filters):
+    """Export into an in-memory buffer for st.download_button.
+
+    Streamlit holds the whole download in memory; use the CLI below for
+    exports too large to serve from the app.
+    """
+    out = io.BytesIO()
+    pages = repo.scan(columns, **filters)
+    if fmt == 'parquet':
+        write_parquet(pages, columns, out)
+    else:
+        text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+        write_csv(pages, columns, text)
+        text.flush()
+        text.detach()
+    out.seek(0)
+    return out
+
+
+def aggregate(pages, groups=('section', 'type', 'month')):
+    """Count requests per group and status bucket (approved/rejected/pending)."""
+    totals = Counter()
+    for page in pages:
+        for row in page:
+            row['month'] = str(row.get('date_requested') or '')[:7]
+            key = tuple(row.get(REPORT_GROUPS[g]) for g in groups)
+            status = row.get('status') or ''
+            bucket = 'approved' if status == 'Approved' else 'rejected' if status in REJECTED_STATUSES else 'pending'
+            totals[key + (bucket,)] += 1
+
+    keys = sorted({key[:-1] for key in totals}, key=lambda k: tuple('' if v is None else str(v) for v in k))
+    for key in keys:
+        counts = {b: totals[key + (b,)] for b in ('approved', 'rejected', 'pending')}
+        yield dict(zip(groups, key), **counts, total=sum(counts.values()))
+
+
+def parse_date(raw):
+    return date.fromisoformat(raw) if raw else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export leave requests or build aggregate reports.")
+    parser.add_argument("--secrets", help="Path to secrets.toml (default: .streamlit/secrets.toml)")
+    parser.add_argument("--page-size", type=int, default=1000)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Stream requests to CSV or Parquet")
+    export.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    export.add_argument("--status", choices=["all", "processed", "approved", "rejected"], default="all")
+    report = commands.add_parser("report", help="Per-section/type/month totals as CSV")
+    report.add_argument("--group", default="section,type,month",
+                        help=f"Comma-separated grouping, any of: {', '.join(REPORT_GROUPS)}")
+    for sub in (export, report):
+        sub.add_argument("--out", required=True)
+        sub.add_argument("--section")
+        sub.add_argument("--from", dest="start_date", type=parse_date, help="YYYY-MM-DD")
+        sub.add_argument("--to", dest="end_date", type=parse_date, help="YYYY-MM-DD (inclusive)")
+    args = parser.parse_args()
+
+    # A private repository with a throwaway cache: scans never touch the cache
+    repo = LeaveRepository(connect(load_secrets(args.secrets)), QueryCache(maxsize=1))
+    filters = dict(section=args.section, start_date=args.start_date, end_date=args.end_date,
+                   page_size=args.page_size)
+
+    if args.command == "export":
+        statuses = {'all': None, 'processed': PROCESSED_STATUSES, 'approved': ['Approved'],
+                    'rejected': REJECTED_STATUSES}[args.status]
+        pages = repo.scan(EXPORT_COLUMNS, statuses=statuses, **filters)
+        if args.format == "parquet":
+            with open(args.out, "wb") as f:
+                count = write_parquet(pages, EXPORT_COLUMNS, f)
+        else:
+            with open(args.out, "w", encoding="utf-8", newline="") as f:
+                count = write_csv(pages, EXPORT_COLUMNS, f)
+        print(f"Exported {count} request(s) to {args.out}")
+    else:
+        groups = [g.strip() for g in args.group.split(",") if g.strip()]
+        unknown = set(groups) - set(REPORT_GROUPS)
+        if unknown:
+            parser.error(f"Unknown group(s): {', '.join(sorted(unknown))}")
+        rows = list(aggregate(repo.scan(REPORT_COLUMNS, **filters), groups))  # one row per group
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            count = write_csv([rows], groups + ['approved', 'rejected', 'pending', 'total'], f)
+        print(f"Wrote {count} report row(s) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------------------------------------------------------
+# Concurrent Reads
+# -----------------------------------------------------------------------------
+# Dashboards make a handful of independent reads per script run (pending
+# queue, first history page, who is on leave). gather() runs them on a shared
+# thread pool with the same blocking Supabase client, so a page waits for the
+# slowest query rather than the sum. With workers <= 1, or once the pool has
+# been shut down, calls simply run one after another on the caller's thread.
+
+
+class Fetcher:
+    def __init__(self, workers=4, context=None):
+        """context() is called on the caller's thread and returns wrap(call),
+        used to carry thread-local state (script run, trace) into the pool."""
+        self.workers = workers
+        self.context = context
+        self.fallbacks = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetch') if workers > 1 else None
+
+    def gather(self, *calls):
+        """Run calls concurrently; returns their results in order.
+
+        The first exception is re-raised after every call has finished.
+        """
+        if self._pool is None or len(calls) < 2:
+            return [call() for call in calls]
+        wrap = self.context() if self.context else (lambda call: call)
+        try:
+            futures = [self._pool.submit(wrap(call)) for call in calls]
+        except RuntimeError:  # shut down (interpreter exiting)
+            self.fallbacks += 1
+            return [call() for call in calls]
+        errors = [f.exception() for f in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [f.result() for f in futures]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
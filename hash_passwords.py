@@ -0,0 +1,43 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from auth import hash_password
+from config import connect, load_secrets
+
+# -----------------------------------------------------------------------------
+# Plaintext Password Conversion
+# -----------------------------------------------------------------------------
+# One-off companion to password_hashing.sql: hashes every account that still
+# has a plaintext password (the accounts seeded by setup.sql included) and
+# clears the plaintext. Safe to re-run; converted rows are skipped.
+#
+#   python hash_passwords.py
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash remaining plaintext passwords in users.")
+    parser.add_argument("--secrets", help="Path to secrets.toml (default: .streamlit/secrets.toml)")
+    parser.add_argument("--workers", type=int, default=None, help="Hashing processes (default: CPU count)")
+    args = parser.parse_args()
+
+    client = connect(load_secrets(args.secrets))
+    users = client.table('users').select('username, password').is_('password_hash', 'null').execute().data
+    users = [u for u in users if u['password'] is not None]
+    if not users:
+        print("Nothing to convert.")
+        return
+
+    # scrypt is CPU- and memory-bound; hash in parallel processes
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        hashes = pool.map(hash_password, [u['password'] for u in users], chunksize=8)
+        for user, password_hash in zip(users, hashes):
+            (client.table('users')
+                .update({'password_hash': password_hash, 'password': None})
+                .eq('username', user['username'])
+                .execute())
+
+    print(f"Converted {len(users)} account(s).")
+
+
+if __name__ == "__main__":
+    main()
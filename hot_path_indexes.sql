@@ -0,0 +1,31 @@
+-- Migration: Indexes for Dashboard Hot Paths
+-- One index per query shape the dashboards issue (see repository.py).
+-- Apply after leave_status_enum.sql.
+
+-- 1. Pending queues: status = 'Pending X' [and student_section = ?]
+create index if not exists leave_requests_status_section_idx
+  on leave_requests (status, student_section);
+
+-- Small partial index covering only open requests; stays tiny as history grows
+create index if not exists leave_requests_pending_idx
+  on leave_requests (student_section, id)
+  where status in ('Pending Staff', 'Pending HOD', 'Pending Principal');
+
+-- 2. Student history: student_username = ? order by date_requested desc, id desc
+create index if not exists leave_requests_student_history_idx
+  on leave_requests (student_username, date_requested desc, id desc);
+
+-- 3. Staff/admin history by section, keyset ordered
+create index if not exists leave_requests_section_history_idx
+  on leave_requests (student_section, date_requested desc, id desc);
+
+-- 4. HOD/admin history across sections: status in (...) keyset ordered
+create index if not exists leave_requests_status_history_idx
+  on leave_requests (status, date_requested desc, id desc);
+
+-- 5. Users by role (and section) for notification fan-out
+create index if not exists users_role_section_idx
+  on users (role, section);
+
+analyze leave_requests;
+analyze users;
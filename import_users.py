@@ -0,0 +1,169 @@
+import argparse
+import csv
+import re
+import secrets
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from auth import hash_password
+from config import connect, load_secrets
+
+# -----------------------------------------------------------------------------
+# Roster Import
+# -----------------------------------------------------------------------------
+# Onboards users from a roster CSV with the columns
+#
+#   username,name,role,section,email[,password]
+#
+# Every row is validated first (role, section against the sections table,
+# email, duplicates within the file); any error aborts the import unless
+# --skip-invalid. Valid rows are written in batches: one lookup and one
+# multi-row upsert per batch for new accounts and password resets, with the
+# passwords hashed in a process pool. Existing users only get their profile
+# columns updated, one update per row, unless --reset-passwords. Rows without a password get a generated one, written to
+# --credentials-out.
+#
+#   python import_users.py roster.csv --credentials-out credentials.csv
+#   python import_users.py roster.csv --create-sections --dry-run
+
+ROLES = ('student', 'staff', 'hod', 'principal', 'admin')
+SECTION_ROLES = ('student', 'staff')  # roles that must belong to a section
+PROFILE_COLUMNS = ['username', 'name', 'role', 'section', 'email']
+USERNAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{3,64}$')
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def read_roster(path, known_sections, create_sections=False):
+    """Stream and validate the roster. Returns (rows, errors, new_sections)."""
+    rows, errors, new_sections = [], [], set()
+    seen = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = set(PROFILE_COLUMNS) - set(reader.fieldnames or [])
+        if missing:
+            raise SystemExit(f"{path}: missing column(s): {', '.join(sorted(missing))}")
+        for line, raw in enumerate(reader, start=2):
+            row = {k: (raw.get(k) or '').strip() for k in PROFILE_COLUMNS + ['password']}
+            row['role'] = row['role'].lower()
+            row['email'] = row['email'].lower()
+            problems = []
+            if not USERNAME_PATTERN.match(row['username']):
+                problems.append(f"invalid username {row['username']!r}")
+            elif row['username'] in seen:
+                problems.append(f"duplicate of line {seen[row['username']]}")
+            if not row['name']:
+                problems.append("missing name")
+            if row['role'] not in ROLES:
+                problems.append(f"unknown role {row['role']!r}")
+            if row['section']:
+                if row['section'] not in known_sections:
+                    if create_sections:
+                        new_sections.add(row['section'])
+                    else:
+                        problems.append(f"unknown section {row['section']!r} (use --create-sections)")
+            elif row['role'] in SECTION_ROLES:
+                problems.append(f"{row['role']} needs a section")
+            if not EMAIL_PATTERN.match(row['email']):
+                problems.append(f"invalid email {row['email']!r}")
+
+            seen.setdefault(row['username'], line)
+            if problems:
+                errors.append(f"line {line}: {'; '.join(problems)}")
+            else:
+                row['section'] = row['section'] or None
+                rows.append(row)
+    return rows, errors, new_sections
+
+
+def batches(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def import_batch(client, pool, batch, reset_passwords=False, dry_run=False):
+    """Upsert one batch. Returns (created, updated, generated credentials)."""
+    usernames = [row['username'] for row in batch]
+    existing = {u['username'] for u in
+                client.table('users').select('username')
+                .in_('username', usernames).execute().data}
+
+    with_password = [row for row in batch if row['username'] not in existing or reset_passwords]
+    profile_only = [row for row in batch if row['username'] in existing and not reset_passwords]
+    generated = []
+    for row in with_password:
+        if not row['password']:
+            row['password'] = secrets.token_urlsafe(9)
+            generated.append((row['username'], row['password']))
+
+    if not dry_run:
+        hashes = pool.map(hash_password, [row['password'] for row in with_password], chunksize=16)
+        payload = [dict({c: row[c] for c in PROFILE_COLUMNS}, password_hash=h, password=None)
+                   for row, h in zip(with_password, hashes)]
+        if payload:
+            client.table('users').upsert(payload, on_conflict='username').execute()
+        # profile-only rows are plain updates so a login that rehashes or
+        # converts a password meanwhile is never overwritten with a stale copy
+        for row in profile_only:
+            profile = {c: row[c] for c in PROFILE_COLUMNS if c != 'username'}
+            client.table('users').update(profile).eq('username', row['username']).execute()
+    return len(batch) - len(existing), len(existing), generated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or update users from a roster CSV.")
+    parser.add_argument("roster", help="CSV with username,name,role,section,email[,password]")
+    parser.add_argument("--secrets", help="Path to secrets.toml (default: .streamlit/secrets.toml)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=None, help="Hashing processes (default: CPU count)")
+    parser.add_argument("--create-sections", action="store_true", help="Add sections missing from the sections table")
+    parser.add_argument("--reset-passwords", action="store_true", help="Also set passwords of existing users")
+    parser.add_argument("--skip-invalid", action="store_true", help="Import the valid rows even if some are invalid")
+    parser.add_argument("--credentials-out", help="CSV to write generated passwords to")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and count without writing")
+    args = parser.parse_args()
+
+    client = connect(load_secrets(args.secrets))
+    known_sections = {s['code'] for s in client.table('sections').select('code').execute().data}
+    rows, errors, new_sections = read_roster(args.roster, known_sections, args.create_sections)
+
+    for error in errors:
+        print(error, file=sys.stderr)
+    if errors and not args.skip_invalid:
+        raise SystemExit(f"{len(errors)} invalid row(s); nothing imported (use --skip-invalid to import the rest).")
+    if not args.dry_run and not args.credentials_out and any(not row['password'] for row in rows):
+        raise SystemExit("Some rows have no password; pass --credentials-out to receive the generated ones.")
+
+    started = time.perf_counter()
+    if new_sections:
+        print(f"New section(s): {', '.join(sorted(new_sections))}")
+        if not args.dry_run:
+            client.table('sections').upsert([{'code': code, 'name': f"Section {code}"} for code in sorted(new_sections)],
+                                            on_conflict='code').execute()
+
+    created = updated = 0
+    credentials = []
+    # scrypt is CPU- and memory-bound; hash in parallel processes
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for batch in batches(rows, args.batch_size):
+            batch_created, batch_updated, generated = import_batch(client, pool, batch, args.reset_passwords,
+                                                                   args.dry_run)
+            created += batch_created
+            updated += batch_updated
+            credentials.extend(generated)
+
+    if credentials and not args.dry_run:
+        with open(args.credentials_out, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(['username', 'password'])
+            writer.writerows(credentials)
+        print(f"Wrote {len(credentials)} generated password(s) to {args.credentials_out}")
+
+    summary = f"{created} new and {updated} existing user(s) in {time.perf_counter() - started:.1f}s"
+    if errors:
+        summary += f", {len(errors)} invalid row(s) skipped"
+    print(f"Dry run: {summary}." if args.dry_run else f"Imported {summary}.")
+
+
+if __name__ == "__main__":
+    main()
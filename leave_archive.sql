@@ -0,0 +1,125 @@
+-- Migration: Leave Request Archive
+-- Closed requests older than the retention age move out of leave_requests
+-- into leave_requests_archive, range-partitioned by year of date_requested,
+-- so the hot table and its indexes only hold recent and open requests.
+-- archive.py runs the move in batches and relocates the documents to a cold
+-- storage bucket; the admin dashboard searches the archive through its
+-- full-text column. Apply after leave_periods.sql and document_previews.sql.
+
+-- 1. Partitioned Archive Table
+create table if not exists leave_requests_archive (
+  id bigint not null,
+  student_username text,
+  student_name text not null,
+  student_section text not null,
+  leave_type text not null,
+  leave_dates text,
+  leave_start date,
+  leave_end date,
+  reason text,
+  file_url text,
+  preview_url text,
+  status text not null,
+  staff_comment text,
+  hod_comment text,
+  principal_comment text,
+  date_requested timestamp with time zone not null,
+  archived_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  search tsvector generated always as (
+    to_tsvector('simple', coalesce(student_name, '') || ' ' || coalesce(student_username, '') || ' ' ||
+                          leave_type || ' ' || status || ' ' || coalesce(reason, ''))
+  ) stored,
+  primary key (id, date_requested)
+) partition by range (date_requested);
+
+-- Created on every partition; partition pruning on date_requested does the rest
+create index if not exists leave_requests_archive_history_idx
+  on leave_requests_archive (date_requested desc, id desc);
+create index if not exists leave_requests_archive_section_idx
+  on leave_requests_archive (student_section, date_requested desc, id desc);
+create index if not exists leave_requests_archive_search_idx
+  on leave_requests_archive using gin (search);
+
+alter table leave_requests_archive enable row level security;
+drop policy if exists "Public Access Archive" on leave_requests_archive;
+create policy "Public Access Archive" on leave_requests_archive for all using (true) with check (true);
+
+-- Creating a partition needs ownership of the parent table, which the app's
+-- role (archive.py runs with the same key) doesn't have
+create or replace function create_leave_archive_partition(p_year int) returns void
+language plpgsql security definer set search_path = public as $$
+begin
+  execute format(
+    'create table if not exists %I partition of leave_requests_archive for values from (%L) to (%L)',
+    'leave_requests_archive_' || p_year, p_year || '-01-01 00:00:00+00', (p_year + 1) || '-01-01 00:00:00+00'
+  );
+end;
+$$;
+
+-- 2. Cold Storage Bucket
+insert into storage.buckets (id, name, public)
+values ('documents-archive', 'documents-archive', true)
+on conflict (id) do nothing;
+
+-- 3. Keep Overview Totals Across Archiving
+-- Archiving deletes from leave_requests; the daily counters keep counting
+-- archived requests, so the delete must not decrement them. The archive
+-- function sets portal.archiving for its own transaction only. (Leave
+-- balances do follow the move, like reconcile_leave_balances(), so keep the
+-- retention age longer than a term.)
+begin;
+drop trigger if exists leave_requests_counts on leave_requests;
+create trigger leave_requests_counts
+  after insert or delete or update of status, student_section, date_requested on leave_requests
+  for each row
+  when (current_setting('portal.archiving', true) is distinct from 'on')
+  execute function bump_leave_request_counts();
+commit;
+
+-- 4. Move One Batch
+-- Moves up to p_limit closed requests older than p_older_than and returns
+-- their ids and document URLs for archive.py to relocate.
+create or replace function archive_leave_requests(p_older_than interval, p_limit int default 500)
+returns table (id bigint, file_url text, preview_url text)
+language plpgsql as $$
+#variable_conflict use_column
+declare
+  v_cutoff timestamptz := now() - p_older_than;
+  v_year int;
+begin
+  for v_year in
+    select distinct extract(year from r.date_requested at time zone 'utc')::int
+      from leave_requests r
+     where r.status::text not like 'Pending%' and r.date_requested < v_cutoff
+  loop
+    perform create_leave_archive_partition(v_year);
+  end loop;
+
+  perform set_config('portal.archiving', 'on', true);
+
+  return query
+    with moved as (
+      delete from leave_requests r
+       where r.id in (
+         select c.id from leave_requests c
+          where c.status::text not like 'Pending%' and c.date_requested < v_cutoff
+          order by c.id
+          limit p_limit
+          for update skip locked
+       )
+      returning r.*
+    ), archived as (
+      insert into leave_requests_archive (id, student_username, student_name, student_section, leave_type,
+                                          leave_dates, leave_start, leave_end, reason, file_url, preview_url,
+                                          status, staff_comment, hod_comment, principal_comment, date_requested)
+      select m.id, m.student_username, m.student_name, m.student_section, m.leave_type,
+             m.leave_dates, m.leave_start, m.leave_end, m.reason, m.file_url, m.preview_url,
+             m.status::text, m.staff_comment, m.hod_comment, m.principal_comment, m.date_requested
+        from moved m
+      returning id, file_url, preview_url
+    )
+    select a.id, a.file_url, a.preview_url from archived a;
+
+  perform set_config('portal.archiving', 'off', true);
+end;
+$$;
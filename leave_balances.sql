@@ -0,0 +1,138 @@
+-- Migration: Leave Balances
+-- Per-student, per-type, per-term counters of approved leave days, kept in
+-- step with leave_requests by a trigger. The trigger fires inside the
+-- transition_leave_request(s) RPC's transaction, so an approval and its
+-- counter update commit together. Reviewers' cards read the remaining
+-- balance from one counter row per request instead of the student's history;
+-- reconcile_leave_balances() rebuilds the counters in bulk.
+
+-- 1. Terms and Quotas
+-- Leave is counted against the term containing its first day; dates outside
+-- every configured term fall back to the calendar year ('2025').
+create table if not exists leave_terms (
+  code text primary key,
+  period daterange not null,
+  exclude using gist (period with &&)
+);
+
+create table if not exists leave_quotas (
+  leave_type text primary key,
+  days_per_term int not null check (days_per_term >= 0)
+);
+
+-- Defaults; adjust to the college's leave policy
+insert into leave_quotas (leave_type, days_per_term) values
+('Medical', 10),
+('OD', 15),
+('Casual', 6)
+on conflict (leave_type) do nothing;
+
+alter table leave_terms enable row level security;
+alter table leave_quotas enable row level security;
+drop policy if exists "Public Access Leave Terms" on leave_terms;
+create policy "Public Access Leave Terms" on leave_terms for all using (true) with check (true);
+drop policy if exists "Public Access Leave Quotas" on leave_quotas;
+create policy "Public Access Leave Quotas" on leave_quotas for all using (true) with check (true);
+
+create or replace function leave_term_for(p_day date) returns text
+language sql stable as $$
+  select coalesce((select code from leave_terms where period @> p_day), to_char(p_day, 'YYYY'));
+$$;
+
+-- 2. Counter Table
+create table if not exists leave_balances (
+  student_username text not null,
+  leave_type text not null,
+  term text not null,
+  used_days int not null default 0,
+  primary key (student_username, leave_type, term)
+);
+
+alter table leave_balances enable row level security;
+drop policy if exists "Public Read Leave Balances" on leave_balances;
+create policy "Public Read Leave Balances" on leave_balances for select using (true);
+
+-- 3. Keep Counters Up To Date
+-- Clients may only read the counters (policy above); the trigger and the
+-- rebuild below write them with their owner's rights
+create or replace function bump_leave_balances() returns trigger
+language plpgsql security definer set search_path = public as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') and old.status = 'Approved' and old.leave_start is not null then
+    update leave_balances
+       set used_days = used_days - (coalesce(old.leave_end, old.leave_start) - old.leave_start + 1)
+     where student_username = old.student_username
+       and leave_type = old.leave_type
+       and term = leave_term_for(old.leave_start);
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') and new.status = 'Approved' and new.leave_start is not null then
+    insert into leave_balances (student_username, leave_type, term, used_days)
+    values (new.student_username, new.leave_type, leave_term_for(new.leave_start),
+            coalesce(new.leave_end, new.leave_start) - new.leave_start + 1)
+    on conflict (student_username, leave_type, term) do update
+      set used_days = leave_balances.used_days + excluded.used_days;
+  end if;
+
+  return null;
+end;
+$$;
+
+-- 4. Bulk Rebuild
+-- Returns the counters that had drifted (recorded vs. recomputed); with
+-- p_apply the table is then rebuilt from leave_requests. Locks out writes to
+-- leave_requests until the calling transaction ends.
+create or replace function reconcile_leave_balances(p_apply boolean default true)
+returns table (student_username text, leave_type text, term text, recorded int, expected int)
+language plpgsql security definer set search_path = public as $$
+#variable_conflict use_column
+begin
+  lock table leave_requests in share row exclusive mode;
+
+  create temporary table expected_leave_balances on commit drop as
+  select r.student_username, r.leave_type, leave_term_for(r.leave_start) as term,
+         sum(coalesce(r.leave_end, r.leave_start) - r.leave_start + 1)::int as used_days
+    from leave_requests r
+   where r.status = 'Approved' and r.leave_start is not null
+   group by 1, 2, 3;
+
+  return query
+    select coalesce(b.student_username, e.student_username), coalesce(b.leave_type, e.leave_type),
+           coalesce(b.term, e.term), b.used_days, e.used_days
+      from leave_balances b
+      full join expected_leave_balances e using (student_username, leave_type, term)
+     where coalesce(b.used_days, 0) <> coalesce(e.used_days, 0);
+
+  if p_apply then
+    delete from leave_balances;
+    insert into leave_balances (student_username, leave_type, term, used_days)
+    select student_username, leave_type, term, used_days from expected_leave_balances;
+  end if;
+
+  drop table expected_leave_balances;
+end;
+$$;
+
+-- 5. Install Trigger and Backfill Atomically
+begin;
+drop trigger if exists leave_requests_balances on leave_requests;
+create trigger leave_requests_balances
+  after insert or delete or update of status, leave_start, leave_end, leave_type, student_username on leave_requests
+  for each row execute function bump_leave_balances();
+
+select count(*) from reconcile_leave_balances(true);
+commit;
+
+-- 6. Balance RPC: one row per request for the reviewers' pending cards
+create or replace function leave_balances_for(p_ids bigint[])
+returns table (id bigint, leave_type text, term text, used_days int, quota int, requested_days int)
+language sql stable as $$
+  select r.id, r.leave_type, t.term, coalesce(b.used_days, 0), q.days_per_term,
+         coalesce(r.leave_end, r.leave_start) - r.leave_start + 1
+    from leave_requests r
+   cross join lateral (select leave_term_for(r.leave_start) as term) t
+    left join leave_balances b
+      on b.student_username = r.student_username and b.leave_type = r.leave_type and b.term = t.term
+    left join leave_quotas q on q.leave_type = r.leave_type
+   where r.id = any(p_ids) and r.leave_start is not null;
+$$;
@@ -0,0 +1,76 @@
+-- Migration: Structured Leave Date Ranges
+-- Adds leave_start/leave_end dates (plus a generated daterange with a GiST
+-- index) next to the display string in leave_dates, and backfills them by
+-- parsing the existing 'Mon DD, YYYY[ to Mon DD, YYYY]' strings.
+
+-- 1. Add Columns
+create extension if not exists btree_gist;
+
+alter table leave_requests add column if not exists leave_start date;
+alter table leave_requests add column if not exists leave_end date;
+alter table leave_requests add column if not exists leave_period daterange
+  generated always as (
+    case when leave_start is not null then daterange(leave_start, coalesce(leave_end, leave_start), '[]') end
+  ) stored;
+
+alter table leave_requests drop constraint if exists leave_requests_leave_range_check;
+alter table leave_requests add constraint leave_requests_leave_range_check
+  check (leave_end is null or leave_end >= leave_start);
+
+-- "Who is on leave in Section X on day D" and overlap checks per student
+create index if not exists leave_requests_section_period_idx
+  on leave_requests using gist (student_section, leave_period);
+create index if not exists leave_requests_student_period_idx
+  on leave_requests using gist (student_username, leave_period);
+
+-- 2. Backfill From leave_dates
+-- Batched so a large history isn't rewritten under one long lock.
+create or replace procedure backfill_leave_periods(p_batch int default 10000)
+language plpgsql as $$
+declare
+  v_pattern constant text := '^[A-Z][a-z]{2} \d{2}, \d{4}( to [A-Z][a-z]{2} \d{2}, \d{4})?$';
+  v_updated int;
+begin
+  loop
+    update leave_requests r
+       set leave_start = to_date(split_part(r.leave_dates, ' to ', 1), 'Mon DD, YYYY'),
+           leave_end = to_date(coalesce(nullif(split_part(r.leave_dates, ' to ', 2), ''),
+                                        split_part(r.leave_dates, ' to ', 1)), 'Mon DD, YYYY')
+     where r.id in (
+       select id from leave_requests
+        where leave_start is null and leave_dates ~ v_pattern
+        limit p_batch
+     );
+    get diagnostics v_updated = row_count;
+    commit;
+    exit when v_updated < p_batch;
+  end loop;
+end;
+$$;
+
+-- The procedure commits per batch, so run it outside an explicit transaction
+-- (psql -f does); re-running only touches rows still missing leave_start.
+call backfill_leave_periods();
+
+-- 3. Range Queries
+-- Requests in the given statuses covering a day, optionally for one section
+create or replace function leaves_on_day(p_day date, p_section text default null, p_statuses text[] default array['Approved'])
+returns setof leave_requests
+language sql stable as $$
+  select * from leave_requests
+   where leave_period @> p_day
+     and (p_section is null or student_section = p_section)
+     and status::text = any(p_statuses)
+   order by student_name;
+$$;
+
+-- A student's open or approved requests overlapping [p_start, p_end]
+create or replace function overlapping_leaves(p_username text, p_start date, p_end date)
+returns setof leave_requests
+language sql stable as $$
+  select * from leave_requests
+   where student_username = p_username
+     and leave_period && daterange(p_start, p_end, '[]')
+     and status::text not like 'Rejected%'
+   order by leave_start;
+$$;
@@ -0,0 +1,73 @@
+-- Migration: Incremental Leave Request Summary
+-- Per-day, per-section, per-status counters kept in step with leave_requests
+-- by a trigger, so the admin overview metrics read a handful of counter rows
+-- instead of the whole history.
+
+-- 1. Create Summary Table
+create table if not exists leave_request_daily_counts (
+  day date not null,
+  student_section text not null,
+  status text not null,
+  total bigint not null default 0,
+  primary key (day, student_section, status)
+);
+
+alter table leave_request_daily_counts enable row level security;
+drop policy if exists "Public Read Daily Counts" on leave_request_daily_counts;
+create policy "Public Read Daily Counts" on leave_request_daily_counts for select using (true);
+
+-- 2. Keep Counters Up To Date
+-- Clients may only read the counters (policy above), so the trigger writes
+-- them with its owner's rights
+create or replace function bump_leave_request_counts() returns trigger
+language plpgsql security definer set search_path = public as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    update leave_request_daily_counts
+       set total = total - 1
+     where day = (old.date_requested at time zone 'utc')::date
+       and student_section = old.student_section
+       and status = old.status::text;
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') then
+    insert into leave_request_daily_counts (day, student_section, status, total)
+    values ((new.date_requested at time zone 'utc')::date, new.student_section, new.status::text, 1)
+    on conflict (day, student_section, status) do update
+      set total = leave_request_daily_counts.total + 1;
+  end if;
+
+  return null;
+end;
+$$;
+
+-- 3. Install Trigger and Backfill Atomically
+begin;
+lock table leave_requests in share row exclusive mode; -- no writes slip between backfill and trigger
+
+drop trigger if exists leave_requests_counts on leave_requests;
+create trigger leave_requests_counts
+  after insert or delete or update of status, student_section, date_requested on leave_requests
+  for each row execute function bump_leave_request_counts();
+
+truncate leave_request_daily_counts;
+insert into leave_request_daily_counts (day, student_section, status, total)
+select (date_requested at time zone 'utc')::date, student_section, status::text, count(*)
+  from leave_requests
+ where status is not null
+ group by 1, 2, 3;
+commit;
+
+-- 4. Summary RPC: one row of totals for the admin overview
+create or replace function leave_request_summary(p_statuses text[], p_section text default null,
+                                                 p_start date default null, p_end date default null)
+returns table (approved bigint, rejected bigint)
+language sql stable as $$
+  select coalesce(sum(total) filter (where status = 'Approved'), 0)::bigint,
+         coalesce(sum(total) filter (where status like 'Rejected%'), 0)::bigint
+    from leave_request_daily_counts
+   where status = any(p_statuses)
+     and (p_section is null or student_section = p_section)
+     and (p_start is null or day >= p_start)
+     and (p_end is null or day <= p_end);
+$$;
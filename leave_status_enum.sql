@@ -0,0 +1,46 @@
+-- Migration: Constrained Leave Status
+-- Replaces the free-text leave_requests.status with an enum so typos can't
+-- create statuses no dashboard ever shows. Apply before hot_path_indexes.sql
+-- (its partial index is defined against the enum).
+
+-- 1. Create Enum Type
+do $$
+begin
+  create type leave_status as enum (
+    'Pending Staff', 'Pending HOD', 'Pending Principal',
+    'Approved', 'Rejected by Staff', 'Rejected by HOD', 'Rejected by Principal'
+  );
+exception when duplicate_object then null;
+end;
+$$;
+
+-- Lets functions that pass statuses around as text (transition_leave_request,
+-- backfills) assign text to the column. Assignment only: there is no
+-- text = leave_status operator, so comparisons against text columns or
+-- variables must cast the enum side (status::text).
+do $$
+begin
+  create cast (text as leave_status) with inout as assignment;
+exception when duplicate_object then null;
+end;
+$$;
+
+-- 2. Convert Column
+-- Postgres won't retype a column named in a trigger's UPDATE OF list, so the
+-- outbox and summary triggers are recreated around the change.
+begin;
+drop trigger if exists leave_requests_notify on leave_requests;
+drop trigger if exists leave_requests_counts on leave_requests;
+
+alter table leave_requests alter column status drop default;
+alter table leave_requests alter column status type leave_status using status::leave_status;
+alter table leave_requests alter column status set default 'Pending Staff';
+alter table leave_requests alter column status set not null;
+
+create trigger leave_requests_notify
+  after insert or update of status on leave_requests
+  for each row execute function enqueue_leave_notifications();
+create trigger leave_requests_counts
+  after insert or delete or update of status, student_section, date_requested on leave_requests
+  for each row execute function bump_leave_request_counts();
+commit;
@@ -0,0 +1,142 @@
+import atexit
+import smtplib
+import threading
+import time
+from collections import deque, namedtuple
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+# -----------------------------------------------------------------------------
+# Pooled SMTP Delivery
+# -----------------------------------------------------------------------------
+# One Mailer per process owns a single authenticated SMTP session. The outbox
+# drainer (outbox_drainer.py) hands it batches to deliver, and it reconnects
+# and backs off when the server drops the connection.
+
+# ref lets callers map undelivered messages back to their source (e.g. outbox rows)
+OutgoingEmail = namedtuple('OutgoingEmail', ['to_email', 'subject', 'body', 'enqueued_at', 'ref'],
+                           defaults=(None,))
+
+
+class Mailer:
+    def __init__(self, sender_email, password, smtp_server, smtp_port,
+                 starttls=True, batch_size=20, max_retries=5, backoff=1.0):
+        self.sender_email = sender_email
+        self.password = password
+        self.smtp_server = smtp_server
+        self.smtp_port = int(smtp_port)
+        self.starttls = starttls
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._server = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=200)
+        self._sent = 0
+        self._failed = 0
+        atexit.register(self.close)
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+    def deliver(self, messages):
+        """Send messages over the pooled connection, retrying with backoff.
+
+        Returns the messages that could not be delivered, refused recipients
+        included, so the caller can retry or give up on them.
+        """
+        pending = list(messages)
+        refused = []
+        attempt = 0
+        while pending:
+            try:
+                with self._lock:
+                    server = self._connect()
+                    while pending:
+                        message = pending[0]
+                        try:
+                            server.send_message(self._build(message))
+                        except smtplib.SMTPRecipientsRefused as e:
+                            print(f"Recipient refused for {message.to_email}: {e}")
+                            self._failed += 1
+                            refused.append(message)
+                        else:
+                            self._sent += 1
+                            self._latencies.append(time.monotonic() - message.enqueued_at)
+                        pending.pop(0)
+                return refused
+            except (smtplib.SMTPException, OSError) as e:
+                with self._lock:
+                    self._disconnect()
+                attempt += 1
+                if attempt > self.max_retries:
+                    print(f"Giving up on {len(pending)} email(s) after {attempt} attempts: {e}")
+                    self._failed += len(pending)
+                    return refused + pending
+                delay = self.backoff * (2 ** (attempt - 1))
+                print(f"SMTP error ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+        return refused
+
+    def stats(self):
+        """Delivery counts and latency (seconds from rendering to sent)."""
+        latencies = sorted(self._latencies)
+        return {
+            'sent': self._sent,
+            'failed': self._failed,
+            'avg_latency': sum(latencies) / len(latencies) if latencies else None,
+            'max_latency': latencies[-1] if latencies else None,
+        }
+
+    def close(self):
+        """Close the SMTP session."""
+        with self._lock:
+            self._disconnect()
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+    def _build(self, message):
+        msg = MIMEMultipart()
+        msg['From'] = self.sender_email
+        msg['To'] = message.to_email
+        msg['Subject'] = message.subject
+        msg.attach(MIMEText(message.body, 'plain'))
+        return msg
+
+    def _connect(self):
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._disconnect()
+
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        if self.starttls:
+            server.starttls()
+        if self.password:
+            server.login(self.sender_email, self.password)
+        self._server = server
+        return server
+
+    def _disconnect(self):
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+
+def create_mailer(cfg):
+    """Build a Mailer from the [email] secrets section."""
+    return Mailer(
+        cfg["sender_email"], cfg["password"], cfg["smtp_server"], cfg["smtp_port"],
+        starttls=cfg.get("starttls", True),
+        batch_size=cfg.get("batch_size", 20),
+        max_retries=cfg.get("max_retries", 5),
+    )
@@ -1,12 +1,21 @@
 import streamlit as st
 from supabase import create_client, Client
-import pandas as pd
-from datetime import datetime
-import mimetypes
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from datetime import date, datetime, timezone
 import base64
+import hmac
+import secrets
+import threading
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from auth import PasswordVerifier, RateLimiter, SessionTokens, needs_rehash
+from directory import UserDirectory
+from documents import UploadTooLarge, store_document
+from export import export_file, parquet_available
+from fetcher import Fetcher
+from mailer import create_mailer
+from outbox_drainer import OutboxDrainer
+from pending_feed import PendingFeed, PendingQueueView
+from repository import LeaveRepository, PENDING_STATUS, QueryCache, REJECTED_STATUSES, PROCESSED_STATUSES
+from tracing import Tracer
 
 # -----------------------------------------------------------------------------
 # Supabase Configuration
@@ -18,49 +27,131 @@ except Exception:
     st.error("Missing Supabase credentials in .streamlit/secrets.toml")
     st.stop()
 
+@st.cache_resource
+def init_tracer():
+    """Per-run tracing of Supabase and SMTP calls (see tracing.py)."""
+    cfg = st.secrets.get("tracing", {})
+    if not cfg.get("enabled", True):
+        return None
+    return Tracer(max_runs=cfg.get("max_runs", 200), log_path=cfg.get("log_path"), otel=cfg.get("otel", False))
+
+tracer = init_tracer()
+
 @st.cache_resource
 def init_supabase():
     """Initialize Supabase client."""
     try:
-        return create_client(url, key)
+        client = create_client(url, key)
+        return tracer.wrap_client(client) if tracer else client
     except Exception as e:
         st.error(f"Failed to connect to Supabase: {e}")
         return None
 
 supabase = init_supabase()
 
+@st.cache_resource
+def init_repository():
+    """Shared, cached data access for all sessions in this process."""
+    cfg = st.secrets.get("cache", {})
+    return LeaveRepository(supabase, QueryCache(maxsize=cfg.get("max_entries", 256), ttl=cfg.get("ttl_seconds", 30)))
+
+repo = init_repository()
+
+@st.cache_resource
+def init_directory():
+    """In-memory copy of the users table, shared by all sessions in this process."""
+    return UserDirectory(supabase, ttl=st.secrets.get("cache", {}).get("directory_ttl_seconds", 300))
+
+directory = init_directory()
+
+@st.cache_resource
+def init_pending_view():
+    """In-process view of pending queues, kept current over Supabase Realtime."""
+    view = PendingQueueView()
+    if st.secrets.get("realtime", {}).get("enabled", True):
+        (PendingFeed(url, key, view)
+            .watch('user_directory_version', lambda payload: directory.invalidate())
+            .start())
+    return view
+
+pending_view = init_pending_view()
+
+def fetch_context():
+    """Carry this script run's context and trace run into fetcher threads."""
+    ctx = get_script_run_ctx()
+    run = tracer.current_run() if tracer else None
+
+    def wrap(call):
+        def in_context():
+            add_script_run_ctx(threading.current_thread(), ctx)
+            if tracer:
+                tracer.adopt(run)
+            try:
+                return call()
+            finally:
+                add_script_run_ctx(threading.current_thread(), None)
+                if tracer:
+                    tracer.adopt(None)
+        return in_context
+    return wrap
+
+@st.cache_resource
+def init_fetcher():
+    """Thread pool for each page's independent reads (see fetcher.py)."""
+    workers = st.secrets.get("fetch", {}).get("workers", 4)
+    if repo.cache.ttl <= 0:
+        # Prefetched results are handed over through the repository cache
+        workers = 1
+    return Fetcher(workers=workers, context=fetch_context)
+
+fetcher = init_fetcher()
+
 # -----------------------------------------------------------------------------
 # Email Configuration
 # -----------------------------------------------------------------------------
-def send_email_notification(to_email, subject, body):
-    """Send email using SMTP."""
+@st.cache_resource
+def init_mailer():
+    """Start the background email dispatcher (one SMTP session per process)."""
     # Only try to send if email secrets are configured
     if "email" not in st.secrets:
-        print(f"Skipping email to {to_email}: No email secrets configured.")
-        return
+        print("Email disabled: No email secrets configured.")
+        return None
+    mailer = create_mailer(st.secrets["email"])
+    return tracer.wrap_mailer(mailer) if tracer else mailer
 
-    sender_email = st.secrets["email"]["sender_email"]
-    password = st.secrets["email"]["password"]
-    smtp_server = st.secrets["email"]["smtp_server"]
-    smtp_port = st.secrets["email"]["smtp_port"]
+mailer = init_mailer()
 
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, password)
-        if "@" in to_email: 
-             server.send_message(msg)
-        server.quit()
-    except Exception as e:
-        print(f"Failed to send email: {e}") 
-        # We don't want to crash the UI if email fails
-        pass
+@st.cache_resource
+def init_outbox_drainer():
+    """Drain notifications_outbox from this process unless a standalone drainer is used."""
+    if mailer is None or supabase is None:
+        return None
+    cfg = st.secrets.get("outbox", {})
+    if not cfg.get("embedded_drainer", True):
+        return None
+    return OutboxDrainer(supabase, mailer, digest_window=cfg.get("digest_window_seconds")).start()
+
+init_outbox_drainer()
+
+# -----------------------------------------------------------------------------
+# Auth Configuration
+# -----------------------------------------------------------------------------
+@st.cache_resource
+def init_auth():
+    """Password verifier, session tokens and login rate limiter (one per process)."""
+    cfg = st.secrets.get("auth", {})
+    secret = cfg.get("session_secret")
+    if not secret:
+        # Sessions then only survive until the process restarts
+        print("auth.session_secret not set: using a random per-process secret.")
+        secret = secrets.token_hex(32)
+    return (
+        PasswordVerifier(workers=cfg.get("hash_workers", 4)),
+        SessionTokens(secret, ttl=cfg.get("session_hours", 2) * 3600),
+        RateLimiter(capacity=cfg.get("login_burst", 5), refill_per_second=1 / cfg.get("login_refill_seconds", 30)),
+    )
+
+password_verifier, session_tokens, login_limiter = init_auth()
 
 # -----------------------------------------------------------------------------
 # Session State Management
@@ -76,7 +167,7 @@ if 'name' not in st.session_state:
 if 'section' not in st.session_state:
     st.session_state['section'] = None
 
-# Custom CSS
+# Custom CSS and static assets
 def load_custom_css():
     st.markdown("""
         <style>
@@ -91,19 +182,124 @@ def load_custom_css():
         </style>
     """, unsafe_allow_html=True)
 
+@st.cache_resource
+def logo_html():
+    """The login page logo as inline HTML, read and encoded once per process (None if missing)."""
+    try:
+        with open("sugu_logo-removebg-preview.png", "rb") as f:
+            logo_b64 = base64.b64encode(f.read()).decode()
+    except OSError:
+        return None # Fall back to no logo if file is missing
+    return f"""
+        <div style="display: flex; justify-content: center; width: 100%; margin-bottom: 20px;">
+            <img src="data:image/png;base64,{logo_b64}" style="width: 140px; max-width: 80vw; object-fit: contain;">
+        </div>
+    """
+
 # -----------------------------------------------------------------------------
 # Authentication
 # -----------------------------------------------------------------------------
+SESSION_USER_COLUMNS = 'username, role, name, section'
+SESSION_COOKIE = 'portal_session'
+
+def client_ip():
+    """The client address as seen by the outermost trusted proxy.
+
+    Clients can send any X-Forwarded-For they like; each proxy appends the
+    address it received the request from, so only the last
+    auth.trusted_proxies entries are trustworthy (0: not behind a proxy).
+    """
+    trusted = st.secrets.get("auth", {}).get("trusted_proxies", 1)
+    forwarded = st.context.headers.get("X-Forwarded-For")
+    hops = [hop.strip() for hop in forwarded.split(",")] if forwarded else []
+    if trusted <= 0 or len(hops) < trusted:
+        return st.context.ip_address
+    return hops[-trusted]
+
+def start_session(user, token=None):
+    st.session_state['logged_in'] = True
+    st.session_state['user_role'] = user['role']
+    st.session_state['username'] = user['username']
+    st.session_state['name'] = user['name']
+    st.session_state['section'] = user.get('section')
+    if token is None:
+        token = session_tokens.issue(user)
+        queue_session_cookie(token, session_tokens.ttl)
+    st.session_state['session_token'] = token
+
+def queue_session_cookie(token, max_age):
+    """Set the session cookie (max_age 0 clears it) when this run's page is drawn."""
+    st.session_state['session_cookie'] = (token, max_age)
+
+def write_session_cookie():
+    """Emit the queued cookie change, if any.
+
+    Streamlit can only read cookies (st.context.cookies, from the request that
+    opened the session), so the browser sets it from a one-line script. The
+    token stays out of the URL, history and Referer headers.
+    """
+    pending = st.session_state.pop('session_cookie', None)
+    if pending is None:
+        return
+    token, max_age = pending
+    st.html(f"<script>document.cookie = '{SESSION_COOKIE}={token}; Max-Age={int(max_age)}; Path=/; SameSite=Strict'"
+            " + (location.protocol === 'https:' ? '; Secure' : '');</script>", unsafe_allow_javascript=True)
+
+def load_session_user(username):
+    user = directory.get(username)
+    return {k: user[k] for k in ('username', 'role', 'name', 'section')} if user else None
+
+def session_revoked(token_id):
+    """Whether any process has logged this session out (revoked_sessions.sql)."""
+    return bool(supabase.table('revoked_sessions').select('token_id').eq('token_id', token_id).execute().data)
+
+def restore_session():
+    """Log back in from the session cookie after a page reload."""
+    if 'session' in st.query_params:
+        del st.query_params['session']  # links from when the token was kept in the URL
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if not token:
+        return
+    try:
+        user = session_tokens.verify(token, load_session_user, session_revoked)
+    except Exception as e:
+        print(f"Session restore failed: {e}")
+        return
+    if user:
+        start_session(user, token)
+    else:
+        queue_session_cookie('', 0)  # expired, revoked or logged out
+
+def check_password(user, password):
+    if user.get('password_hash'):
+        if not password_verifier.verify(password, user['password_hash']):
+            return False
+        if needs_rehash(user['password_hash']):
+            set_password_hash(user['username'], password)
+        return True
+    # Account not converted by hash_passwords.py yet: compare, then convert it
+    if user.get('password') is not None and hmac.compare_digest(user['password'].encode(), password.encode()):
+        set_password_hash(user['username'], password)
+        return True
+    return False
+
+def set_password_hash(username, password):
+    supabase.table('users').update({
+        'password_hash': password_verifier.hash(password), 'password': None,
+    }).eq('username', username).execute()
+
 def login_user(username, password):
+    # Per (user, IP) rather than per user, so wrong passwords sent from
+    # elsewhere can't lock the account's owner out
+    ip = client_ip()
+    if not (login_limiter.allow(f"user:{username}:{ip}") and login_limiter.allow(f"ip:{ip}")):
+        st.error("Too many login attempts. Please wait a minute and try again.")
+        return
     try:
-        response = supabase.table('users').select('*').eq('username', username).eq('password', password).execute()
-        if len(response.data) > 0:
-            user = response.data[0]
-            st.session_state['logged_in'] = True
-            st.session_state['user_role'] = user['role']
-            st.session_state['username'] = user['username']
-            st.session_state['name'] = user['name']
-            st.session_state['section'] = user.get('section')
+        response = supabase.table('users').select(f'{SESSION_USER_COLUMNS}, password, password_hash').eq('username', username).execute()
+        user = response.data[0] if response.data else None
+        if user and check_password(user, password):
+            start_session({k: user[k] for k in ('username', 'role', 'name', 'section')})
             st.success(f"Welcome, {user['name']}!")
             st.rerun()
         else:
@@ -112,58 +308,41 @@ def login_user(username, password):
         st.error(f"Login failed: {e}")
 
 def logout_user():
+    revoked = session_tokens.revoke(st.session_state.get('session_token'))
+    if revoked:
+        # Recorded so other processes (and this one after a restart) refuse
+        # the token too; rows past their expiry are of no further use
+        token_id, expires_at = revoked
+        try:
+            supabase.table('revoked_sessions').insert({
+                'token_id': token_id, 'expires_at': datetime.fromtimestamp(expires_at, timezone.utc).isoformat(),
+            }).execute()
+            supabase.table('revoked_sessions').delete().lt('expires_at', datetime.now(timezone.utc).isoformat()).execute()
+        except Exception as e:
+            print(f"Could not record logout: {e}")
     st.session_state.clear()
+    queue_session_cookie('', 0)
     st.rerun()
 
 # -----------------------------------------------------------------------------
 # Database Actions
 # -----------------------------------------------------------------------------
-def upload_file_to_storage(file, username):
-    """Upload file to Supabase storage."""
-    try:
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        file_ext = mimetypes.guess_extension(file.type) or ".pdf"
-        file_name = f"{username}_{timestamp}{file_ext}"
-        file_bytes = file.getvalue()
-        supabase.storage.from_('documents').upload(file_name, file_bytes, {"content-type": file.type})
-        return supabase.storage.from_('documents').get_public_url(file_name)
-    except Exception as e:
-        st.error(f"File upload failed: {e}")
-        return None
-
-# -----------------------------------------------------------------------------
-# Helper Functions
-# -----------------------------------------------------------------------------
-def get_staff_emails(section):
-    """Fetch emails of all staff members for a specific section."""
-    try:
-        response = supabase.table('users').select('email').eq('role', 'staff').eq('section', section).execute()
-        return [row['email'] for row in response.data if row.get('email')]
-    except Exception as e:
-        print(f"Error fetching staff emails: {e}")
-        return []
+def upload_file_to_storage(file):
+    """Upload file to Supabase storage (content-addressed, size-capped).
 
-def get_user_email(username):
-    """Fetch email of a specific user."""
+    Returns (file_url, preview_url), or None if the upload failed.
+    """
+    max_mb = st.secrets.get("storage", {}).get("max_upload_mb", 10)
     try:
-        response = supabase.table('users').select('email').eq('username', username).execute()
-        if response.data and response.data[0].get('email'):
-            return response.data[0]['email']
+        return store_document(supabase, file, file.type, max_mb * 1024 * 1024)
+    except UploadTooLarge as e:
+        st.error(str(e))
         return None
-    except Exception:
-        return None
-
-def get_role_email(role):
-    """Fetch email of a specific role."""
-    try:
-        response = supabase.table('users').select('email').eq('role', role).execute()
-        if response.data and response.data[0].get('email'):
-            return response.data[0]['email']
-        return None
-    except Exception:
+    except Exception as e:
+        st.error(f"File upload failed: {e}")
         return None
 
-def submit_leave_request(username, name, section, leave_type, leave_dates, reason, file_url):
+def submit_leave_request(username, name, section, leave_type, leave_dates, reason, file_url, leave_start, leave_end, preview_url=None):
     try:
         data = {
             'student_username': username,
@@ -171,119 +350,187 @@ def submit_leave_request(username, name, section, leave_type, leave_dates, reaso
             'student_section': section,
             'leave_type': leave_type,
             'leave_dates': leave_dates,
+            'leave_start': leave_start.isoformat(),
+            'leave_end': leave_end.isoformat(),
             'reason': reason,
             'file_url': file_url,
+            'preview_url': preview_url,
             'status': 'Pending Staff'
         }
-        supabase.table('leave_requests').insert(data).execute()
-        st.success("Prioritizing Staff Notification...")
-        
-        # Email Logic: Find Staff for this section
-        staff_emails = get_staff_emails(section)
-        now = datetime.now()
-        timestamp = now.strftime("%H:%M:%S")
-        date_str = now.strftime("%b %d, %Y")
-        for email in staff_emails:
-            send_email_notification(
-                email, 
-                f"New Leave Request from {name} - [Ref: {timestamp}]", 
-                f"Hi there,\n\n"
-                f"Just a quick heads-up — {name} from Section {section} has submitted a new {leave_type} leave request for {leave_dates} on {date_str}.\n\n"
-                f"Reason: {reason}\n\n"
-                f"Please log in to the portal to review and take action.\n\n"
-                f"Thanks,\nDepartment Portal"
-            )
-            
+        # Staff notifications are queued by the database in the same transaction
+        repo.submit(data)
         st.success("Leave request submitted successfully!")
     except Exception as e:
         st.error(f"Error submitting request: {e}")
 
 def update_request_status(req_id, new_status, comment="", role_action=""):
     try:
-        update_data = {'status': new_status}
-        if role_action == "staff":
-            update_data['staff_comment'] = comment
-        elif role_action == "hod":
-            update_data['hod_comment'] = comment
-        elif role_action == "principal":
-            update_data['principal_comment'] = comment
-            
-        # Get the request details to find the student and format the email
-        req_res = supabase.table('leave_requests').select('student_username, student_name, date_requested').eq('id', req_id).execute()
-        if req_res.data:
-            student_username = req_res.data[0]['student_username']
-            student_name = req_res.data[0]['student_name']
-            
-            # Format the date nicely if it exists
-            raw_date = req_res.data[0].get('date_requested')
-            if raw_date:
-                # Assuming raw_date is a string from postgres timestamp like '2023-10-27T10:00:00+00:00'
-                try:
-                    dt = datetime.fromisoformat(raw_date.replace('Z', '+00:00'))
-                    date_str = dt.strftime("%b %d, %Y")
-                except ValueError:
-                    date_str = str(raw_date)[:10] # Fallback to just the date part yyyy-mm-dd
-            else:
-                date_str = "Unknown Date"
-        else:
-            student_username = None
-            student_name = "Unknown Student"
-            date_str = "Unknown Date"
-            
-        supabase.table('leave_requests').update(update_data).eq('id', req_id).execute()
-        
-        # Trigger Email
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        if student_username:
-            student_email = get_user_email(student_username)
-            if student_email:
-                subject = f"Leave Update: {new_status} - [Ref: {timestamp}]"
-                comment_line = f"\nYour reviewer noted: \"{comment}\"\n" if comment else "\n"
-                body = (
-                    f"Hi {student_name},\n\n"
-                    f"We wanted to let you know that your leave request (submitted on {date_str}) "
-                    f"has been reviewed and the status is now: {new_status}.\n"
-                    f"{comment_line}\n"
-                    f"If you have any questions, feel free to reach out to your section coordinator.\n\n"
-                    f"Best regards,\nDepartment Portal"
-                )
-                send_email_notification(student_email, subject, body)
-        
-        # Notify HOD if forwarded by Staff
-        if new_status == "Pending HOD":
-            hod_email = get_role_email('hod')
-            if hod_email:
-                comment_line = f"Staff's note: \"{comment}\"\n" if comment else ""
-                send_email_notification(
-                    hod_email,
-                    f"Action Needed: Leave forwarded by Staff - [Ref: {timestamp}]",
-                    f"Hello HOD,\n\n"
-                    f"A staff member has forwarded a leave request from {student_name} (submitted on {date_str}) for your review.\n"
-                    f"{comment_line}\n"
-                    f"Please log in to the portal to approve, reject, or forward to the Principal.\n\n"
-                    f"Regards,\nDepartment Portal"
-                )
-
-        # Notify Principal if forwarded by HOD
-        if new_status == "Pending Principal":
-            principal_email = get_role_email('principal')
-            if principal_email:
-                comment_line = f"HOD's note: \"{comment}\"\n" if comment else ""
-                send_email_notification(
-                    principal_email,
-                    f"Action Needed: Leave forwarded by HOD - [Ref: {timestamp}]",
-                    f"Hello Principal,\n\n"
-                    f"The HOD has forwarded a leave request from {student_name} (submitted on {date_str}) for your review.\n"
-                    f"{comment_line}\n"
-                    f"Please log in to the portal to approve or reject.\n\n"
-                    f"Regards,\nDepartment Portal"
-                )
-        
-        st.success(f"Status updated to {new_status}")
+        # One RPC: validates the transition, updates the row and (via the
+        # leave_requests_notify trigger) queues the emails atomically
+        result = repo.transition(req_id, new_status, comment, role_action)
+        # Don't wait for the realtime echo to drop the row from this queue
+        pending_view.apply('UPDATE', {k: v for k, v in result.items() if k not in ('old_status', 'recipients')})
+        notified = len(result.get('recipients') or [])
+        st.success(f"Status updated to {new_status}" + (f" ({notified} notified)" if notified else ""))
         st.rerun()
     except Exception as e:
         st.error(f"Error updating status: {e}")
 
+def update_request_statuses(req_ids, new_status, comment="", role_action=""):
+    """Batch version of update_request_status: one RPC and one rerun."""
+    try:
+        moved = repo.transition_many(req_ids, new_status, comment, role_action)
+        for row in moved:
+            pending_view.apply('UPDATE', {k: v for k, v in row.items() if k != 'old_status'})
+        skipped = len(req_ids) - len(moved)
+        st.success(f"{len(moved)} request(s) updated to {new_status}" + (f", {skipped} skipped" if skipped else ""))
+        st.rerun()
+    except Exception as e:
+        st.error(f"Error updating status: {e}")
+
+def bulk_actions(pending, role_action, actions, label):
+    """Multi-select batch approve/reject above a pending queue."""
+    by_id = {req['id']: req for req in pending}
+    with st.container(border=True):
+        selected = st.multiselect(
+            "Select requests for a batch action",
+            list(by_id),
+            # Labels must be unique: the widget tracks selections by label
+            format_func=lambda req_id: f"#{req_id} · {label(by_id[req_id])}",
+            key=f"bulk_{role_action}",
+        )
+        comment = st.text_input("Comment for selected", key=f"bulk_c_{role_action}")
+        cols = st.columns(len(actions))
+        for col, (button_label, new_status) in zip(cols, actions):
+            if col.button(f"{button_label} ({len(selected)})", key=f"bulk_{role_action}_{new_status}",
+                          disabled=not selected):
+                update_request_statuses(selected, new_status, comment, role_action)
+
+def request_balances(pending):
+    """Leave balance rows for the pending cards, keyed by request id ({} if unavailable)."""
+    try:
+        return repo.balances([req['id'] for req in pending])
+    except Exception as e:
+        print(f"Leave balances unavailable: {e}")
+        return {}
+
+def show_balance(balance):
+    """The student's remaining days of this leave type for the request's term."""
+    if not balance:
+        return
+    used, quota, requested = balance['used_days'], balance['quota'], balance['requested_days']
+    if quota is None:
+        st.caption(f"🧮 {balance['leave_type']} ({balance['term']}): {used} day(s) used · this request: {requested}")
+        return
+    remaining = quota - used
+    text = (f"🧮 {balance['leave_type']} ({balance['term']}): {remaining} of {quota} day(s) left"
+            f" · this request: {requested}")
+    if requested > remaining:
+        st.warning(f"{text} (over quota by {requested - remaining})")
+    else:
+        st.caption(text)
+
+def show_document(req):
+    """Preview (when available) and link to a request's supporting document."""
+    if req.get('preview_url'): st.image(req['preview_url'], width=240)
+    if req['file_url']: st.markdown(f"[View Doc]({req['file_url']})")
+
+# -----------------------------------------------------------------------------
+# Pending Queues
+# -----------------------------------------------------------------------------
+QUEUE_REFRESH_SECONDS = 10
+
+def pending_requests(role, section=None):
+    """Pending queue from the realtime view when it is live, else the repository."""
+    st.session_state[f"queue_seq_{role}"] = pending_view.seq
+    if pending_view.live:
+        return pending_view.pending(PENDING_STATUS[role], section)
+    return repo.pending(role, section)
+
+@st.fragment(run_every=QUEUE_REFRESH_SECONDS)
+def watch_pending_queue(role, section=None):
+    """Rerun the page when new requests reach this reviewer's queue.
+
+    Only checks the in-memory view, so idle reviewer sessions cost no queries.
+    """
+    seq_key = f"queue_seq_{role}"
+    if not pending_view.live or seq_key not in st.session_state:
+        return
+    arrivals = pending_view.arrivals_since(st.session_state[seq_key], PENDING_STATUS[role], section)
+    st.session_state[seq_key] = pending_view.seq
+    if arrivals:
+        st.session_state['queue_arrivals'] = len(arrivals)
+        st.rerun()
+
+def pending_fetch(role, section=None):
+    """The pending-queue read for prefetch(), or None when the realtime view serves it."""
+    return None if pending_view.live else (lambda: repo.pending(role, section))
+
+def announce_arrivals():
+    arrivals = st.session_state.pop('queue_arrivals', 0)
+    if arrivals:
+        st.toast(f"🔔 {arrivals} new request(s) in your queue")
+
+# -----------------------------------------------------------------------------
+# Concurrent Prefetch
+# -----------------------------------------------------------------------------
+def prefetch(*calls):
+    """Issue a page's independent repository reads concurrently.
+
+    Results land in the repository cache, so the rendering code that follows
+    reads them back without another round trip. Failures are left for that
+    code to hit again and report.
+    """
+    try:
+        fetcher.gather(*[call for call in calls if call is not None])
+    except Exception as e:
+        print(f"Prefetch failed: {e}")
+
+def first_page(view_key, fetch_page):
+    """The first page paged_table() will ask for, as a prefetch() call."""
+    page_size = st.session_state.get(f"{view_key}_size", PAGE_SIZES[0])
+    return lambda: fetch_page(page_size, None)
+
+# -----------------------------------------------------------------------------
+# Paginated Tables
+# -----------------------------------------------------------------------------
+PAGE_SIZES = [25, 50, 100]
+
+def paged_table(view_key, columns, fetch_page, **dataframe_kwargs):
+    """Render a keyset-paginated table with a page-size control and "Load more".
+
+    fetch_page(page_size, cursor) -> (rows, next_cursor). Only the number of
+    loaded pages is kept in session state; pages themselves come from the
+    repository cache. Returns False if there is nothing to show.
+    """
+    page_size = st.selectbox("Rows per page", PAGE_SIZES, key=f"{view_key}_size")
+    pages_key = f"{view_key}_pages"
+    if st.session_state.get(f"{view_key}_loaded_size") != page_size:
+        st.session_state[pages_key] = 1
+        st.session_state[f"{view_key}_loaded_size"] = page_size
+
+    rows, cursor = [], None
+    for _ in range(st.session_state[pages_key]):
+        page, cursor = fetch_page(page_size, cursor)
+        rows.extend(page)
+        if cursor is None:
+            break
+    if not rows:
+        return False
+
+    import pandas as pd  # deferred: the login page and principal view never need it
+
+    if tracer:
+        df = tracer.timed('render', 'dataframe', view_key, lambda: pd.DataFrame(rows)[columns],
+                          lambda df: (len(df), None))
+    else:
+        df = pd.DataFrame(rows)[columns]
+    st.dataframe(df, **dataframe_kwargs)
+    if cursor is not None and st.button("Load more", key=f"{view_key}_more"):
+        st.session_state[pages_key] += 1
+        st.rerun()
+    return True
+
 # -----------------------------------------------------------------------------
 # Dashboards
 # -----------------------------------------------------------------------------
@@ -306,36 +553,52 @@ def student_dashboard():
                     st.error("Please select the leave dates.")
                 else:
                     if isinstance(leave_dates_input, (tuple, list)):
-                        if len(leave_dates_input) == 2:
-                            dates_str = f"{leave_dates_input[0].strftime('%b %d, %Y')} to {leave_dates_input[1].strftime('%b %d, %Y')}"
-                        else:
-                            dates_str = leave_dates_input[0].strftime('%b %d, %Y')
+                        leave_start = leave_dates_input[0]
+                        leave_end = leave_dates_input[1] if len(leave_dates_input) == 2 else leave_start
                     else:
-                        dates_str = leave_dates_input.strftime('%b %d, %Y')
-                        
-                    url = upload_file_to_storage(doc, st.session_state['username']) if doc else None
-                    submit_leave_request(st.session_state['username'], st.session_state['name'], 
-                                       st.session_state['section'], l_type, dates_str, reason, url)
+                        leave_start = leave_end = leave_dates_input
+                    if leave_end != leave_start:
+                        dates_str = f"{leave_start.strftime('%b %d, %Y')} to {leave_end.strftime('%b %d, %Y')}"
+                    else:
+                        dates_str = leave_start.strftime('%b %d, %Y')
+
+                    clashes = repo.overlapping(st.session_state['username'], leave_start, leave_end)
+                    if clashes:
+                        st.error(f"You already have a {clashes[0]['status']} request for {clashes[0]['leave_dates']} overlapping these dates.")
+                    else:
+                        uploaded = upload_file_to_storage(doc) if doc else (None, None)
+                        if uploaded:
+                            url, preview_url = uploaded
+                            submit_leave_request(st.session_state['username'], st.session_state['name'], 
+                                               st.session_state['section'], l_type, dates_str, reason, url,
+                                               leave_start, leave_end, preview_url)
 
     with tab2:
         st.header("My Requests")
-        res = supabase.table('leave_requests').select('*').eq('student_username', st.session_state['username']).order('date_requested', desc=True).execute()
-        if res.data:
-            st.dataframe(pd.DataFrame(res.data)[['date_requested', 'leave_dates', 'leave_type', 'status', 'staff_comment', 'hod_comment', 'principal_comment']])
-        else:
+        username = st.session_state['username']
+        cols = ['date_requested', 'leave_dates', 'leave_type', 'status', 'staff_comment', 'hod_comment', 'principal_comment']
+        if not paged_table("student_history", cols,
+                           lambda size, cursor: repo.student_requests(username, cols, size, cursor)):
             st.info("No requests found")
 
 def staff_dashboard():
     st.sidebar.title("👨‍🏫 Staff Portal")
     st.sidebar.info(f"👤 {st.session_state['name']}")
     
-    # Identify Section based on Username (Hardcoded logic for demo)
-    # staff_a -> A, staff_b -> B
-    username = st.session_state['username']
-    my_section = 'A' if 'a' in username else 'B'
-    if st.session_state.get('section'): my_section = st.session_state['section']
+    my_section = st.session_state.get('section') or directory.section_of(st.session_state['username'])
+    if not my_section:
+        st.error("No section is assigned to your account. Please contact the administrator.")
+        if st.sidebar.button("Logout"): logout_user()
+        return
     
     st.sidebar.write(f"Managing: **Section {my_section}**")
+    history_cols = ['date_requested', 'leave_dates', 'student_name', 'leave_type', 'status', 'staff_comment']
+    history_page = lambda size, cursor: repo.staff_history(my_section, history_cols, size, cursor)
+    prefetch(lambda: repo.on_leave(date.today(), my_section), pending_fetch('staff', my_section),
+             first_page("staff_history", history_page))
+    on_leave = repo.on_leave(date.today(), my_section)
+    if on_leave:
+        st.sidebar.caption("🏖️ On leave today: " + ", ".join(r['student_name'] for r in on_leave))
     if st.sidebar.button("Logout"): logout_user()
 
     tab1, tab2 = st.tabs(["⏳ Pending Approvals", "📜 History"])
@@ -343,18 +606,22 @@ def staff_dashboard():
     with tab1:
         st.header(f"Section {my_section} - Pending Requests")
         
-        res = supabase.table('leave_requests').select('*')\
-            .eq('status', 'Pending Staff')\
-            .eq('student_section', my_section)\
-            .execute()
+        announce_arrivals()
+        pending = pending_requests('staff', my_section)
+        watch_pending_queue('staff', my_section)
             
-        if not res.data:
+        if not pending:
             st.info("No pending requests")
+        elif len(pending) > 1:
+            bulk_actions(pending, "staff", [("✅ Forward to HOD", "Pending HOD"), ("❌ Reject", "Rejected by Staff")],
+                         lambda req: f"{req['student_name']} ({req['leave_type']} - {req.get('leave_dates', 'N/A')})")
             
-        for req in res.data:
+        balances = request_balances(pending)
+        for req in pending:
             with st.expander(f"{req['student_name']} ({req['leave_type']} - {req.get('leave_dates', 'N/A')})"):
                 st.write(f"Reason: {req['reason']}")
-                if req['file_url']: st.markdown(f"[View Doc]({req['file_url']})")
+                show_balance(balances.get(req['id']))
+                show_document(req)
                 
                 comment = st.text_input("Comment", key=f"c_{req['id']}")
                 c1, c2 = st.columns(2)
@@ -365,16 +632,8 @@ def staff_dashboard():
                     
     with tab2:
         st.header("Request History")
-        res_hist = supabase.table('leave_requests').select('*')\
-            .eq('student_section', my_section)\
-            .neq('status', 'Pending Staff')\
-            .order('date_requested', desc=True)\
-            .execute()
-            
-        if res_hist.data:
-            df = pd.DataFrame(res_hist.data)[['date_requested', 'leave_dates', 'student_name', 'leave_type', 'status', 'staff_comment']]
-            st.dataframe(df, column_config={"leave_dates": st.column_config.TextColumn("Leave Dates", width="large")})
-        else:
+        if not paged_table("staff_history", history_cols, history_page,
+                           column_config={"leave_dates": st.column_config.TextColumn("Leave Dates", width="large")}):
             st.info("No history found")
 
 def hod_dashboard():
@@ -382,21 +641,33 @@ def hod_dashboard():
     st.sidebar.info(f"👤 {st.session_state['name']}")
     if st.sidebar.button("Logout"): logout_user()
 
+    history_cols = ['date_requested', 'leave_dates', 'student_name', 'student_section', 'leave_type', 'status', 'staff_comment', 'hod_comment']
+    history_page = lambda size, cursor: repo.hod_history(history_cols, size, cursor)
+    prefetch(pending_fetch('hod'), first_page("hod_history", history_page))
+
     tab1, tab2 = st.tabs(["✅ Pending Approvals", "📜 History"])
     
     with tab1:
         st.header("Leave Approvals")
         # HOD sees requests pending HOD from ALL sections
-        res = supabase.table('leave_requests').select('*').eq('status', 'Pending HOD').execute()
+        announce_arrivals()
+        pending = pending_requests('hod')
+        watch_pending_queue('hod')
         
-        if not res.data:
+        if not pending:
             st.info("No pending requests")
+        elif len(pending) > 1:
+            bulk_actions(pending, "hod",
+                         [("✅ Approve", "Approved"), ("⏩ Fwd to Principal", "Pending Principal"), ("❌ Reject", "Rejected by HOD")],
+                         lambda req: f"{req['student_name']} (Sec {req['student_section']} | {req['leave_type']} - {req.get('leave_dates', 'N/A')})")
         
-        for req in res.data:
+        balances = request_balances(pending)
+        for req in pending:
             with st.expander(f"{req['student_name']} (Sec {req['student_section']} | {req['leave_type']} - {req.get('leave_dates', 'N/A')})"):
                 st.write(f"Reason: {req['reason']}")
                 st.write(f"Staff Comment: {req.get('staff_comment')}")
-                if req['file_url']: st.markdown(f"[View Doc]({req['file_url']})")
+                show_balance(balances.get(req['id']))
+                show_document(req)
 
                 comment = st.text_input("Comment", key=f"hc_{req['id']}")
                 c1, c2, c3 = st.columns(3)
@@ -410,15 +681,8 @@ def hod_dashboard():
                     
     with tab2:
         st.header("Approval History")
-        res_hist = supabase.table('leave_requests').select('*')\
-            .in_('status', ['Pending Principal', 'Approved', 'Rejected by HOD', 'Rejected by Principal'])\
-            .order('date_requested', desc=True)\
-            .execute()
-        
-        if res_hist.data:
-            df = pd.DataFrame(res_hist.data)[['date_requested', 'leave_dates', 'student_name', 'student_section', 'leave_type', 'status', 'staff_comment', 'hod_comment']]
-            st.dataframe(df, column_config={"leave_dates": st.column_config.TextColumn("Leave Dates", width="large")})
-        else:
+        if not paged_table("hod_history", history_cols, history_page,
+                           column_config={"leave_dates": st.column_config.TextColumn("Leave Dates", width="large")}):
             st.info("No history found")
 
 def principal_dashboard():
@@ -427,16 +691,20 @@ def principal_dashboard():
     if st.sidebar.button("Logout"): logout_user()
 
     st.header("Principal Actions")
-    res = supabase.table('leave_requests').select('*').eq('status', 'Pending Principal').execute()
+    announce_arrivals()
+    pending = pending_requests('principal')
+    watch_pending_queue('principal')
     
-    if not res.data:
+    if not pending:
         st.info("No requests pending your approval.")
         
-    for req in res.data:
+    balances = request_balances(pending)
+    for req in pending:
         with st.expander(f"{req['student_name']} (Sec {req['student_section']} | {req['leave_type']} - {req.get('leave_dates', 'N/A')})"):
             st.warning(f"Forwarded by HOD. Comment: {req.get('hod_comment')}")
             st.write(f"Reason: {req['reason']}")
-            if req['file_url']: st.markdown(f"[View Doc]({req['file_url']})")
+            show_balance(balances.get(req['id']))
+            show_document(req)
 
             comment = st.text_input("Comment", key=f"pc_{req['id']}")
             c1, c2 = st.columns(2)
@@ -448,14 +716,29 @@ def principal_dashboard():
 def admin_dashboard():
     st.sidebar.title("🔐 Admin Portal")
     st.sidebar.info(f"👤 {st.session_state['name']}")
+    try:
+        backlog = repo.outbox_backlog()
+        st.sidebar.caption(f"📬 Email outbox: {backlog['waiting']} waiting · {backlog['failed']} failed")
+    except Exception as e:
+        print(f"Outbox backlog unavailable: {e}")
+    if mailer is not None:
+        stats = mailer.stats()
+        latency = f"{stats['avg_latency']:.1f}s avg" if stats['avg_latency'] is not None else "no sends yet"
+        st.sidebar.caption(f"✉️ Sent by this process: {stats['sent']} · {stats['failed']} failed · {latency}")
+    cache_stats = repo.cache.stats()
+    st.sidebar.caption(f"🗄️ Query cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · {cache_stats['size']} entries")
     if st.sidebar.button("Logout"): logout_user()
 
+    if tracer:
+        performance_panel()
+    archive_search()
+
     st.header("📊 Leave Request Overview")
     
     # Filters
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        section_filter = st.selectbox("Section", ["All", "A", "B"])
+        section_filter = st.selectbox("Section", ["All"] + directory.sections())
     with col2:
         status_filter = st.selectbox("Status", ["All", "Approved", "Rejected"])
     with col3:
@@ -467,56 +750,110 @@ def admin_dashboard():
     if status_filter == "Approved":
         status_list = ['Approved']
     elif status_filter == "Rejected":
-        status_list = ['Rejected by Staff', 'Rejected by HOD', 'Rejected by Principal']
+        status_list = REJECTED_STATUSES
     else:
-        status_list = ['Approved', 'Rejected by Staff', 'Rejected by HOD', 'Rejected by Principal']
+        status_list = PROCESSED_STATUSES
     
-    # Query all processed requests
-    query = supabase.table('leave_requests').select('*')\
-        .in_('status', status_list)\
-        .order('date_requested', desc=True)
+    section = None if section_filter == "All" else section_filter
+    display_cols = ['date_requested', 'leave_dates', 'student_name', 'student_section', 'leave_type', 'status', 'reason', 'staff_comment', 'hod_comment', 'principal_comment']
+    view_key = f"admin_{section_filter}_{status_filter}_{start_date}_{end_date}"
+    processed_page = lambda size, cursor: repo.processed(status_list, display_cols, section, start_date, end_date, size, cursor)
+    prefetch(lambda: repo.processed_counts(status_list, section, start_date, end_date),
+             first_page(view_key, processed_page))
+    counts = repo.processed_counts(status_list, section, start_date, end_date)
+    total = counts['Approved'] + counts['Rejected']
     
-    if section_filter != "All":
-        query = query.eq('student_section', section_filter)
+    if total == 0:
+        st.info("No records found for the selected filters.")
+        return
+
+    # Summary metrics
+    m1, m2, m3 = st.columns(3)
+    m1.metric("✅ Total Approved", counts['Approved'])
+    m2.metric("❌ Total Rejected", counts['Rejected'])
+    m3.metric("📄 Total Records", total)
+    # The counters survive archiving (leave_archive.sql); the table doesn't
+    st.caption("Totals include archived requests. The table lists requests not yet archived; "
+               "use Archive search above for older ones.")
     
-    res = query.execute()
+    st.divider()
     
-    if res.data:
-        df = pd.DataFrame(res.data)
-        
-        # Apply date filters on the DataFrame
-        if start_date:
-            df['date_requested'] = pd.to_datetime(df['date_requested'])
-            df = df[df['date_requested'].dt.date >= start_date]
-        if end_date:
-            df['date_requested'] = pd.to_datetime(df['date_requested'])
-            df = df[df['date_requested'].dt.date <= end_date]
-        
-        if df.empty:
-            st.info("No records found for the selected filters.")
-        else:
-            # Summary metrics
-            m1, m2, m3 = st.columns(3)
-            approved_count = len(df[df['status'] == 'Approved'])
-            rejected_count = len(df[df['status'].str.startswith('Rejected')])
-            m1.metric("✅ Total Approved", approved_count)
-            m2.metric("❌ Total Rejected", rejected_count)
-            m3.metric("📄 Total Records", len(df))
-            
-            st.divider()
-            
-            display_cols = ['date_requested', 'leave_dates', 'student_name', 'student_section', 'leave_type', 'status', 'reason', 'staff_comment', 'hod_comment', 'principal_comment']
-            existing_cols = [c for c in display_cols if c in df.columns]
-            st.dataframe(
-                df[existing_cols],
-                column_config={
-                    "leave_dates": st.column_config.TextColumn("Leave Dates", width="large"),
-                    "reason": st.column_config.TextColumn("Reason", width="large"),
-                },
+    paged_table(
+        view_key, display_cols, processed_page,
+        column_config={
+            "leave_dates": st.column_config.TextColumn("Leave Dates", width="large"),
+            "reason": st.column_config.TextColumn("Reason", width="large"),
+        },
+        use_container_width=True
+    )
+
+    # Full exports page through every matching row (see export.py; use its CLI
+    # for histories too large to download from here)
+    filters = dict(statuses=status_list, section=section, start_date=start_date, end_date=end_date)
+    file_stem = f"leave_requests_{section_filter}_{status_filter}".lower()
+    formats = [("⬇️ Export CSV", 'csv', 'text/csv')]
+    if parquet_available():
+        formats.append(("⬇️ Export Parquet", 'parquet', 'application/vnd.apache.parquet'))
+    for col, (label, fmt, mime) in zip(st.columns(len(formats)), formats):
+        col.download_button(label, data=lambda fmt=fmt: export_file(repo, fmt, **filters),
+                            file_name=f"{file_stem}.{fmt}", mime=mime, on_click="ignore")
+
+def archive_search():
+    """Search closed requests that archive.py moved out of leave_requests."""
+    with st.expander("🗄️ Archive search"):
+        with st.form("archive_search"):
+            c1, c2, c3, c4 = st.columns(4)
+            text = c1.text_input("Student, type, status or reason")
+            section_filter = c2.selectbox("Section", ["All"] + directory.sections(), key="archive_section")
+            start_date = c3.date_input("From Date", value=None, key="archive_from")
+            end_date = c4.date_input("To Date", value=None, key="archive_to")
+            if st.form_submit_button("Search"):
+                section = None if section_filter == "All" else section_filter
+                st.session_state['archive_query'] = (text.strip() or None, section, start_date, end_date)
+
+        # Nothing is queried until a search is submitted
+        if 'archive_query' not in st.session_state:
+            return
+        text, section, start_date, end_date = st.session_state['archive_query']
+        cols = ['date_requested', 'leave_dates', 'student_name', 'student_section', 'leave_type', 'status', 'reason', 'file_url']
+        try:
+            found = paged_table(
+                f"archive_{text}_{section}_{start_date}_{end_date}", cols,
+                lambda size, cursor: repo.archived(cols, text, section, start_date, end_date, size, cursor),
+                column_config={"file_url": st.column_config.LinkColumn("Document")},
                 use_container_width=True
             )
-    else:
-        st.info("No processed leave requests found.")
+        except Exception as e:
+            st.error(f"Archive search failed: {e}")
+            return
+        if not found:
+            st.info("No archived requests match.")
+
+def performance_panel():
+    """Slowest recent calls and calls-per-rerun, from the tracer."""
+    with st.expander("⚡ Performance"):
+        durations = sorted(tracer.run_durations())
+        if not durations:
+            st.info("No script runs traced yet.")
+            return
+        import pandas as pd
+
+        histogram = tracer.calls_per_run()
+        total_runs = sum(histogram.values())
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Runs traced", len(durations))
+        m2.metric("Median / p95 run", f"{durations[len(durations) // 2] * 1000:.0f} / "
+                                       f"{durations[int(len(durations) * 0.95)] * 1000:.0f} ms")
+        m3.metric("Calls per run", f"{sum(n * c for n, c in histogram.items()) / total_runs:.1f}")
+
+        st.caption("Slowest calls")
+        st.dataframe(pd.DataFrame([{
+            'kind': s.kind, 'name': s.name, 'detail': s.detail, 'rows': s.rows, 'bytes': s.bytes,
+            'ms': round(s.duration * 1000, 1), 'run': s.run_id, 'error': s.error,
+        } for s in tracer.slowest(10)]), use_container_width=True)
+
+        st.caption("Calls per script run")
+        st.bar_chart(pd.Series(histogram, name="runs").sort_index())
 
 # -----------------------------------------------------------------------------
 # Main
@@ -524,22 +861,16 @@ def admin_dashboard():
 def main():
     st.set_page_config(page_title="Leave Request Portal", page_icon="🏫", layout="wide")
     load_custom_css()
-    
+
     if not st.session_state['logged_in']:
-        try:
-            with open("sugu_logo-removebg-preview.png", "rb") as f:
-                logo_b64 = base64.b64encode(f.read()).decode()
-            st.markdown(
-                f"""
-                <div style="display: flex; justify-content: center; width: 100%; margin-bottom: 20px;">
-                    <img src="data:image/png;base64,{logo_b64}" style="width: 140px; max-width: 80vw; object-fit: contain;">
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-        except Exception:
-            pass # Fall back to no logo if file is missing
-            
+        restore_session()
+    write_session_cookie()
+
+    if not st.session_state['logged_in']:
+        logo = logo_html()
+        if logo:
+            st.markdown(logo, unsafe_allow_html=True)
+
         st.markdown("<h1 style='text-align: center; font-size: 2.2rem; margin-bottom: 30px;'>Suguna College of Engineering : AI&DS</h1>", unsafe_allow_html=True)
         with st.form("login"):
             u = st.text_input("Username")
@@ -555,4 +886,11 @@ def main():
         else: st.error("Invalid Role")
 
 if __name__ == "__main__":
-    main()
+    if tracer:
+        tracer.start_run(st.session_state.get('user_role') or 'login')
+        try:
+            main()
+        finally:
+            tracer.end_run()
+    else:
+        main()
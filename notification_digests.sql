@@ -0,0 +1,37 @@
+-- Migration: Notification Digests
+-- Lets outbox_drainer.py --digest-window claim notifications per recipient:
+-- a recipient's rows are held until the oldest is p_window old, then all of
+-- them are claimed together and sent as one digest email.
+
+-- 1. Index For Per-Recipient Claims
+create index if not exists notifications_outbox_recipient_idx
+  on notifications_outbox (recipient, created_at) where state in ('pending', 'sending');
+
+-- 2. Claim Due Recipients
+-- p_limit caps recipients, not rows.
+create or replace function claim_notification_digests(
+  p_worker text, p_window interval, p_limit int default 50, p_lease interval default interval '5 minutes'
+)
+returns setof notifications_outbox
+language sql as $$
+  with claimable as (
+    select id, recipient, created_at from notifications_outbox
+     where (state = 'pending' or (state = 'sending' and claimed_at < now() - p_lease))
+       and (next_attempt_at is null or next_attempt_at <= now())
+  ), due as (
+    select recipient from claimable
+     group by recipient
+    having min(created_at) <= now() - p_window
+     order by min(created_at)
+     limit p_limit
+  )
+  update notifications_outbox o
+     set state = 'sending', claimed_by = p_worker, claimed_at = now(), attempts = o.attempts + 1
+   where o.id in (
+     select n.id from notifications_outbox n
+      where n.id in (select c.id from claimable c join due d using (recipient))
+      order by n.id
+      for update skip locked
+   )
+  returning o.*;
+$$;
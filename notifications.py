@@ -0,0 +1,165 @@
+from datetime import datetime
+from string import Template
+
+# -----------------------------------------------------------------------------
+# Notification Rendering
+# -----------------------------------------------------------------------------
+# Outbox rows carry a template name and the request context captured when the
+# row was enqueued. Templates are compiled once at import; rendering a batch
+# only builds each row's fields and substitutes them. In digest mode all rows
+# for one recipient are folded into a single email of one-line summaries.
+
+def parse_timestamp(raw):
+    """Parse a Postgres timestamp string like '2023-10-27T10:00:00+00:00'."""
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(str(raw).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def format_date(raw):
+    dt = parse_timestamp(raw)
+    if dt:
+        return dt.strftime("%b %d, %Y")
+    return str(raw)[:10] if raw else "Unknown Date"  # Fallback to just the date part yyyy-mm-dd
+
+
+# name -> (subject, body, digest summary line)
+TEMPLATES = {
+    'new_request': (
+        "New Leave Request from $name - [Ref: $ref]",
+        "Hi there,\n\n"
+        "Just a quick heads-up — $name from Section $section has submitted a new $leave_type leave request for $leave_dates on $created_on.\n\n"
+        "Reason: $reason\n\n"
+        "Please log in to the portal to review and take action.\n\n"
+        "Thanks,\nDepartment Portal",
+        "$name (Section $section) requested $leave_type leave for $leave_dates. Reason: $reason",
+    ),
+    'status_update': (
+        "Leave Update: $status - [Ref: $ref]",
+        "Hi $name,\n\n"
+        "We wanted to let you know that your leave request (submitted on $requested_on) "
+        "has been reviewed and the status is now: $status.\n"
+        "$comment_line\n"
+        "If you have any questions, feel free to reach out to your section coordinator.\n\n"
+        "Best regards,\nDepartment Portal",
+        "Your leave request submitted on $requested_on is now: $status.$note",
+    ),
+    'forwarded_hod': (
+        "Action Needed: Leave forwarded by Staff - [Ref: $ref]",
+        "Hello HOD,\n\n"
+        "A staff member has forwarded a leave request from $name (submitted on $requested_on) for your review.\n"
+        "$comment_line\n"
+        "Please log in to the portal to approve, reject, or forward to the Principal.\n\n"
+        "Regards,\nDepartment Portal",
+        "Staff forwarded $name's leave request (submitted on $requested_on) for your review.$note",
+    ),
+    'forwarded_principal': (
+        "Action Needed: Leave forwarded by HOD - [Ref: $ref]",
+        "Hello Principal,\n\n"
+        "The HOD has forwarded a leave request from $name (submitted on $requested_on) for your review.\n"
+        "$comment_line\n"
+        "Please log in to the portal to approve or reject.\n\n"
+        "Regards,\nDepartment Portal",
+        "The HOD forwarded $name's leave request (submitted on $requested_on) for your review.$note",
+    ),
+}
+
+# name -> (line when there is a comment, line when there isn't)
+COMMENT_LINES = {
+    'status_update': ('\nYour reviewer noted: "$comment"\n', '\n'),
+    'forwarded_hod': ('Staff\'s note: "$comment"\n', ''),
+    'forwarded_principal': ('HOD\'s note: "$comment"\n', ''),
+}
+
+DIGEST_SUBJECT = "Department Portal: $count updates since $since"
+DIGEST_BODY = (
+    "Hello,\n\n"
+    "Here is what happened on the Department Portal since $since:\n\n"
+    "$items\n\n"
+    "Please log in to the portal for details or to take action.\n\n"
+    "Regards,\nDepartment Portal"
+)
+
+
+def _compile(text):
+    template = Template(text)
+    if not template.is_valid():
+        raise ValueError(f"Invalid notification template: {text!r}")
+    return template
+
+
+COMPILED = {name: tuple(_compile(t) for t in parts) for name, parts in TEMPLATES.items()}
+COMPILED_COMMENTS = {name: (_compile(with_comment), without) for name, (with_comment, without) in COMMENT_LINES.items()}
+COMPILED_DIGEST = (_compile(DIGEST_SUBJECT), _compile(DIGEST_BODY))
+
+
+def _fields(row):
+    ctx = row.get('context') or {}
+    # Local time, as the emails showed when they were stamped with datetime.now()
+    created_at = (parse_timestamp(row.get('created_at')) or datetime.now()).astimezone()
+    comment = ctx.get('comment')
+    with_comment, without = COMPILED_COMMENTS.get(row['template'], (None, ''))
+    return {
+        'name': ctx.get('student_name') or 'Unknown Student',
+        'section': ctx.get('student_section'),
+        'leave_type': ctx.get('leave_type'),
+        'leave_dates': ctx.get('leave_dates'),
+        'reason': ctx.get('reason'),
+        'status': ctx.get('status'),
+        'requested_on': format_date(ctx.get('date_requested')),
+        'created_on': created_at.strftime('%b %d, %Y'),
+        'created_at': created_at,
+        'ref': created_at.strftime('%H:%M:%S'),
+        'comment_line': with_comment.substitute(comment=comment) if comment and with_comment else without,
+        'note': f' Note: "{comment}"' if comment else '',
+    }
+
+
+def render(row):
+    """Render an outbox row into (subject, body)."""
+    subject, body, _ = COMPILED[row['template']]
+    fields = _fields(row)
+    return subject.substitute(fields), body.substitute(fields)
+
+
+def render_digest(rows):
+    """Render several rows for the same recipient into one (subject, body)."""
+    rows = sorted(rows, key=lambda row: row['id'])
+    fields = [(_fields(row), COMPILED[row['template']][2]) for row in rows]
+    since = fields[0][0]['created_at'].strftime('%b %d, %H:%M')
+    items = "\n".join(f"• {f['created_at'].strftime('%H:%M')} — {summary.substitute(f)}" for f, summary in fields)
+    subject, body = COMPILED_DIGEST
+    return (subject.substitute(count=len(rows), since=since),
+            body.substitute(items=items, since=since))
+
+
+def render_batch(rows, digest=False):
+    """Render claimed outbox rows into messages.
+
+    Returns ([(ids, recipient, subject, body)], unrenderable_ids). With
+    digest, each recipient's rows become one message (a single row still
+    gets its full email).
+    """
+    groups = {}
+    unrenderable = []
+    for row in rows:
+        if row.get('template') not in COMPILED:
+            print(f"Cannot render notification {row['id']}: unknown template {row.get('template')!r}")
+            unrenderable.append(row['id'])
+            continue
+        groups.setdefault(row['recipient'] if digest else row['id'], []).append(row)
+
+    messages = []
+    for group in groups.values():
+        ids = tuple(row['id'] for row in group)
+        try:
+            subject, body = render(group[0]) if len(group) == 1 else render_digest(group)
+        except Exception as e:
+            print(f"Cannot render notification(s) {list(ids)}: {e}")
+            unrenderable.extend(ids)
+            continue
+        messages.append((ids, group[0]['recipient'], subject, body))
+    return messages, unrenderable
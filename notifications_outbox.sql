@@ -0,0 +1,136 @@
+-- Migration: Durable Notification Outbox
+-- Notification rows are written by a trigger in the same transaction as the
+-- leave_requests insert/status change, then sent by outbox_drainer.py.
+
+-- 1. Create Outbox Table
+create table if not exists notifications_outbox (
+  id bigint generated by default as identity primary key,
+  request_id bigint not null,
+  status text not null,
+  template text not null, -- new_request, status_update, forwarded_hod, forwarded_principal
+  recipient text not null,
+  context jsonb not null default '{}'::jsonb,
+  state text not null default 'pending' check (state in ('pending', 'sending', 'sent', 'failed')),
+  attempts int not null default 0,
+  last_error text,
+  claimed_by text,
+  claimed_at timestamp with time zone,
+  next_attempt_at timestamp with time zone,
+  sent_at timestamp with time zone,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  -- One message per recipient per transition: a repeated click cannot enqueue twice
+  unique (request_id, status, template, recipient)
+);
+
+create index if not exists notifications_outbox_claimable_idx
+  on notifications_outbox (id) where state in ('pending', 'sending');
+
+alter table notifications_outbox enable row level security;
+drop policy if exists "Public Access Outbox" on notifications_outbox;
+create policy "Public Access Outbox" on notifications_outbox for all using (true) with check (true);
+
+-- 2. Enqueue Notifications with the Status Change
+create or replace function enqueue_leave_notifications() returns trigger
+language plpgsql as $$
+declare
+  v_comment text;
+  v_context jsonb;
+begin
+  if tg_op = 'UPDATE' then
+    if new.status is not distinct from old.status then
+      return new; -- comment edits and double-clicks don't notify
+    end if;
+    v_comment := case old.status
+      when 'Pending Staff' then new.staff_comment
+      when 'Pending HOD' then new.hod_comment
+      when 'Pending Principal' then new.principal_comment
+    end;
+  end if;
+
+  v_context := jsonb_build_object(
+    'student_name', new.student_name,
+    'student_section', new.student_section,
+    'leave_type', new.leave_type,
+    'leave_dates', new.leave_dates,
+    'reason', new.reason,
+    'status', new.status,
+    'comment', v_comment,
+    'date_requested', new.date_requested
+  );
+
+  if tg_op = 'INSERT' then
+    -- Staff of the student's section
+    insert into notifications_outbox (request_id, status, template, recipient, context)
+    select new.id, new.status::text, 'new_request', u.email, v_context
+      from users u
+     where u.role = 'staff' and u.section = new.student_section and u.email like '%@%'
+    on conflict do nothing;
+    return new;
+  end if;
+
+  -- The student
+  insert into notifications_outbox (request_id, status, template, recipient, context)
+  select new.id, new.status::text, 'status_update', u.email, v_context
+    from users u
+   where u.username = new.student_username and u.email like '%@%'
+  on conflict do nothing;
+
+  -- The next reviewer up the chain
+  if new.status in ('Pending HOD', 'Pending Principal') then
+    insert into notifications_outbox (request_id, status, template, recipient, context)
+    select new.id, new.status::text,
+           case new.status when 'Pending HOD' then 'forwarded_hod' else 'forwarded_principal' end,
+           u.email, v_context
+      from users u
+     where u.role = case new.status when 'Pending HOD' then 'hod' else 'principal' end
+       and u.email like '%@%'
+    on conflict do nothing;
+  end if;
+
+  return new;
+end;
+$$;
+
+drop trigger if exists leave_requests_notify on leave_requests;
+create trigger leave_requests_notify
+  after insert or update of status on leave_requests
+  for each row execute function enqueue_leave_notifications();
+
+-- 3. Drainer Functions
+-- Claim a batch; concurrent drainers skip each other's locked rows. Rows left
+-- in 'sending' by a crashed drainer become claimable again after the lease.
+create or replace function claim_notifications(p_worker text, p_limit int default 50, p_lease interval default interval '5 minutes')
+returns setof notifications_outbox
+language sql as $$
+  update notifications_outbox o
+     set state = 'sending', claimed_by = p_worker, claimed_at = now(), attempts = o.attempts + 1
+   where o.id in (
+     select id from notifications_outbox
+      where (state = 'pending' or (state = 'sending' and claimed_at < now() - p_lease))
+        and (next_attempt_at is null or next_attempt_at <= now())
+      order by id
+      limit p_limit
+      for update skip locked
+   )
+  returning o.*;
+$$;
+
+create or replace function complete_notifications(p_worker text, p_ids bigint[])
+returns void
+language sql as $$
+  update notifications_outbox
+     set state = 'sent', sent_at = now(), last_error = null
+   where id = any(p_ids) and claimed_by = p_worker and state = 'sending';
+$$;
+
+-- Return undelivered rows to the queue with exponential backoff, or park
+-- them as 'failed' once they run out of attempts.
+create or replace function release_notifications(p_worker text, p_ids bigint[], p_error text, p_max_attempts int default 5)
+returns void
+language sql as $$
+  update notifications_outbox
+     set state = case when attempts >= p_max_attempts then 'failed' else 'pending' end,
+         last_error = p_error,
+         next_attempt_at = now() + interval '30 seconds' * power(2, attempts - 1)
+   where id = any(p_ids) and claimed_by = p_worker and state = 'sending';
+$$;
@@ -0,0 +1,123 @@
+import argparse
+import os
+import socket
+import threading
+import time
+
+from config import connect, load_secrets
+from mailer import OutgoingEmail, create_mailer
+from notifications import render_batch
+
+# -----------------------------------------------------------------------------
+# Notification Outbox Drainer
+# -----------------------------------------------------------------------------
+# Claims pending rows from notifications_outbox (see notifications_outbox.sql),
+# sends them over the Mailer's pooled SMTP session and marks them sent. Any
+# number of drainers can run side by side: claims use FOR UPDATE SKIP LOCKED.
+#
+#   python outbox_drainer.py            # run until interrupted
+#   python outbox_drainer.py --once     # drain what is pending and exit
+#
+# With a digest window (--digest-window / outbox.digest_window_seconds) a
+# recipient's notifications are held until the oldest is that many seconds old
+# and then sent together as one email (see notification_digests.sql).
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def drain_once(client, mailer, worker, batch_size=50, digest_window=None):
+    """Claim, send and settle one batch. Returns the number of rows (or, with
+    a digest window, recipients) claimed."""
+    if digest_window:
+        rows = client.rpc('claim_notification_digests', {
+            'p_worker': worker, 'p_window': f"{digest_window} seconds", 'p_limit': batch_size,
+        }).execute().data or []
+        claimed = len({row['recipient'] for row in rows})
+    else:
+        rows = client.rpc('claim_notifications', {'p_worker': worker, 'p_limit': batch_size}).execute().data or []
+        claimed = len(rows)
+    if not rows:
+        return 0
+
+    rendered, unrenderable = render_batch(rows, digest=bool(digest_window))
+    now = time.monotonic()
+    messages = [OutgoingEmail(recipient, subject, body, now, ids) for ids, recipient, subject, body in rendered]
+
+    failed_ids = {i for m in mailer.deliver(messages) for i in m.ref}
+    sent_ids = [i for m in messages for i in m.ref if i not in failed_ids]
+
+    if sent_ids:
+        client.rpc('complete_notifications', {'p_worker': worker, 'p_ids': sent_ids}).execute()
+    if failed_ids:
+        client.rpc('release_notifications', {
+            'p_worker': worker, 'p_ids': sorted(failed_ids), 'p_error': "SMTP delivery failed",
+        }).execute()
+    if unrenderable:
+        # Retrying won't help a broken template; park the rows for inspection
+        client.rpc('release_notifications', {
+            'p_worker': worker, 'p_ids': unrenderable, 'p_error': "Render failed", 'p_max_attempts': 0,
+        }).execute()
+    return claimed
+
+
+class OutboxDrainer:
+    """Drains the outbox on a background thread (used inside the Streamlit process)."""
+
+    def __init__(self, client, mailer, worker=None, batch_size=50, interval=5, digest_window=None):
+        self.client = client
+        self.mailer = mailer
+        self.worker = worker or default_worker_name()
+        self.batch_size = batch_size
+        self.interval = interval
+        self.digest_window = digest_window
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self.run, name="outbox-drainer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                claimed = drain_once(self.client, self.mailer, self.worker, self.batch_size, self.digest_window)
+            except Exception as e:
+                print(f"Outbox drain failed: {e}")
+                claimed = 0
+            # A full batch means there is probably more waiting
+            if claimed < self.batch_size:
+                self._stopping.wait(self.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send pending notifications from notifications_outbox.")
+    parser.add_argument("--secrets", help="Path to secrets.toml (default: .streamlit/secrets.toml)")
+    parser.add_argument("--worker", default=default_worker_name(), help="Name recorded on claimed rows")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=5, help="Seconds to wait when the outbox is empty")
+    parser.add_argument("--once", action="store_true", help="Drain until empty, then exit")
+    parser.add_argument("--digest-window", type=float, default=None,
+                        help="Combine each recipient's notifications from this many seconds into one email")
+    args = parser.parse_args()
+
+    secrets = load_secrets(args.secrets)
+    client = connect(secrets)
+    mailer = create_mailer(secrets["email"])
+    try:
+        if args.once:
+            while drain_once(client, mailer, args.worker, args.batch_size, args.digest_window) == args.batch_size:
+                pass
+        else:
+            OutboxDrainer(client, mailer, args.worker, args.batch_size, args.interval, args.digest_window).run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mailer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+-- Migration: Hashed Passwords
+-- Passwords move from plaintext `password` to a scrypt hash in `password_hash`
+-- (format scrypt$n$r$p$salt$hash, see auth.py). Hashing is done in Python, so
+-- after applying this run `python hash_passwords.py` to convert the existing
+-- (seeded) accounts in one pass. Any account it misses is converted the next
+-- time that user logs in.
+
+-- 1. Add Hash Column
+alter table users add column if not exists password_hash text;
+alter table users alter column password drop not null;
+
+-- 2. Every account needs some credential until the plaintext column is retired
+alter table users drop constraint if exists users_credential_check;
+alter table users add constraint users_credential_check
+  check (password_hash is not null or password is not null);
+
+-- 3. Once every row has a hash (select count(*) from users where password is not null = 0):
+-- alter table users drop column password;
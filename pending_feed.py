@@ -0,0 +1,164 @@
+import asyncio
+import threading
+from collections import deque
+
+from realtime import RealtimePostgresChangesListenEvent, RealtimeSubscribeStates
+from supabase import acreate_client
+
+from repository import PENDING_STATUS
+
+# -----------------------------------------------------------------------------
+# Realtime Pending Queues
+# -----------------------------------------------------------------------------
+# One subscriber per process listens to leave_requests changes over Supabase
+# Realtime and keeps an in-memory view of every pending request. Reviewer
+# sessions read their queue from the view and ask it for deltas since their
+# last run, so open dashboards don't each re-query the table. Requires
+# realtime_pending.sql.
+
+PENDING_STATUSES = tuple(PENDING_STATUS.values())
+
+
+class PendingQueueView:
+    def __init__(self, history=1000):
+        self.live = False
+        self.seq = 0
+        self._rows = {}                    # id -> row, pending requests only
+        self._log = deque(maxlen=history)  # (seq, id, old_status, new_status, section)
+        self._touched = None               # ids changed while a snapshot is in flight
+        self._lock = threading.Lock()
+
+    def begin_snapshot(self):
+        """Call before fetching a snapshot for reset()."""
+        with self._lock:
+            self._touched = set()
+
+    def reset(self, rows):
+        """Replace the view with a fresh snapshot of pending requests.
+
+        Rows that received a change after begin_snapshot() keep their current
+        state: the snapshot may have been read before that change.
+        """
+        with self._lock:
+            fresh = {row['id']: row for row in rows if row.get('status') in PENDING_STATUSES}
+            for req_id in self._touched or ():
+                fresh.pop(req_id, None)
+                if req_id in self._rows:
+                    fresh[req_id] = self._rows[req_id]
+            self._rows = fresh
+            self._touched = None
+            self.seq += 1
+
+    def apply(self, op, record, old_record=None):
+        """Apply one INSERT/UPDATE/DELETE; partial records merge into known rows."""
+        record = record or {}
+        req_id = record.get('id') or (old_record or {}).get('id')
+        if req_id is None:
+            return
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(req_id)
+            previous = self._rows.get(req_id)
+            old_status = previous['status'] if previous else (old_record or {}).get('status')
+            if op == 'DELETE':
+                row = previous or old_record or {}
+                new_status = None
+                self._rows.pop(req_id, None)
+            else:
+                row = {**previous, **record} if previous else record
+                new_status = row.get('status')
+                if new_status in PENDING_STATUSES:
+                    self._rows[req_id] = row
+                else:
+                    self._rows.pop(req_id, None)
+            if new_status != old_status:
+                self.seq += 1
+                self._log.append((self.seq, req_id, old_status, new_status, row.get('student_section')))
+
+    def pending(self, status, section=None):
+        with self._lock:
+            rows = [row for row in self._rows.values()
+                    if row['status'] == status and (section is None or row.get('student_section') == section)]
+        return sorted(rows, key=lambda row: row['id'])
+
+    def arrivals_since(self, seq, status, section=None):
+        """Ids that entered the given queue after `seq`."""
+        with self._lock:
+            return [req_id for s, req_id, _, new_status, row_section in self._log
+                    if s > seq and new_status == status and (section is None or row_section == section)]
+
+
+class PendingFeed:
+    """Keeps a PendingQueueView current from Supabase Realtime on a background thread."""
+
+    def __init__(self, url, key, view, resync_interval=300, retry_delay=5):
+        self.url = url
+        self.key = key
+        self.view = view
+        self.resync_interval = resync_interval
+        self.retry_delay = retry_delay
+        self._watchers = []  # (table, callback)
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), name="pending-feed", daemon=True)
+
+    def watch(self, table, callback):
+        """Also call callback(payload) for changes to `table` (call before start())."""
+        self._watchers.append((table, callback))
+        return self
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _on_change(self, payload):
+        data = payload['data']
+        op = getattr(data['type'], 'value', data['type'])
+        self.view.apply(op, data.get('record'), data.get('old_record'))
+
+    async def _snapshot(self, client):
+        self.view.begin_snapshot()
+        res = await client.table('leave_requests').select('*').in_('status', list(PENDING_STATUSES)).execute()
+        self.view.reset(res.data)
+
+    async def _run(self):
+        while True:
+            client = None
+            try:
+                client = await acreate_client(self.url, self.key)
+                subscribed = asyncio.Event()
+                failed = asyncio.Event()
+
+                def on_status(state, error):
+                    if state == RealtimeSubscribeStates.SUBSCRIBED:
+                        subscribed.set()
+                    elif state in (RealtimeSubscribeStates.CHANNEL_ERROR, RealtimeSubscribeStates.TIMED_OUT,
+                                   RealtimeSubscribeStates.CLOSED):
+                        failed.set()
+
+                channel = client.channel('pending-queues')
+                channel.on_postgres_changes(RealtimePostgresChangesListenEvent.All, self._on_change,
+                                            table='leave_requests', schema='public')
+                for table, callback in self._watchers:
+                    channel.on_postgres_changes(RealtimePostgresChangesListenEvent.All, callback,
+                                                table=table, schema='public')
+                await channel.subscribe(on_status)
+                await asyncio.wait_for(subscribed.wait(), 30)
+
+                # Snapshot after subscribing so nothing committed in between is
+                # missed; periodic resyncs bound drift from any dropped event
+                # (changes arriving mid-snapshot win over it, see reset())
+                while not failed.is_set():
+                    await self._snapshot(client)
+                    self.view.live = True
+                    try:
+                        await asyncio.wait_for(failed.wait(), self.resync_interval)
+                    except asyncio.TimeoutError:
+                        pass
+            except Exception as e:
+                print(f"Pending feed disconnected: {e}")
+            self.view.live = False
+            if client is not None:
+                try:
+                    await client.realtime.close()
+                except Exception:
+                    pass
+            await asyncio.sleep(self.retry_delay)
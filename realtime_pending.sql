@@ -0,0 +1,15 @@
+-- Migration: Realtime Pending Queues
+-- Publishes leave_requests changes over Supabase Realtime for the in-process
+-- pending queue view (pending_feed.py).
+
+-- 1. Send full old rows on UPDATE/DELETE so a request leaving a queue can be
+-- removed without a lookup
+alter table leave_requests replica identity full;
+
+-- 2. Add table to the realtime publication
+do $$
+begin
+  alter publication supabase_realtime add table leave_requests;
+exception when duplicate_object then null;
+end;
+$$;
@@ -0,0 +1,45 @@
+import argparse
+import sys
+
+from config import connect, load_secrets
+
+# -----------------------------------------------------------------------------
+# Leave Balance Reconciliation
+# -----------------------------------------------------------------------------
+# leave_balances is maintained incrementally by a trigger (see
+# leave_balances.sql). This job recomputes every counter from leave_requests
+# in one set-based pass, reports the counters that had drifted and rewrites
+# the table. Run it after bulk edits made with the trigger disabled, after
+# changing leave_terms, or nightly from cron as a check:
+#
+#   python reconcile_balances.py            # rebuild and report drift
+#   python reconcile_balances.py --check    # report only; exit 1 on drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild leave_balances from leave_requests.")
+    parser.add_argument("--secrets", help="Path to secrets.toml (default: .streamlit/secrets.toml)")
+    parser.add_argument("--check", action="store_true", help="Report drift without rewriting the counters")
+    parser.add_argument("--show", type=int, default=20, help="Drifted counters to list")
+    args = parser.parse_args()
+
+    client = connect(load_secrets(args.secrets))
+    drift = client.rpc('reconcile_leave_balances', {'p_apply': not args.check}).execute().data or []
+
+    for row in drift[:args.show]:
+        print(f"{row['student_username']} {row['leave_type']} {row['term']}: "
+              f"recorded {row['recorded'] or 0}, expected {row['expected'] or 0}")
+    if len(drift) > args.show:
+        print(f"... and {len(drift) - args.show} more")
+
+    if not drift:
+        print("Leave balances are consistent.")
+    elif args.check:
+        print(f"{len(drift)} counter(s) drifted; run without --check to rebuild.")
+        sys.exit(1)
+    else:
+        print(f"Rebuilt leave balances; {len(drift)} counter(s) corrected.")
+
+
+if __name__ == "__main__":
+    main()
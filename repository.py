@@ -0,0 +1,324 @@
+import threading
+import time
+from datetime import timedelta
+from collections import OrderedDict, namedtuple
+
+# -----------------------------------------------------------------------------
+# Leave Request Repository
+# -----------------------------------------------------------------------------
+# Dashboard reads go through a process-wide TTL + LRU cache keyed on
+# (role, section, filters). Writes made through the repository invalidate only
+# the entries whose scope could contain the changed row; other processes see
+# the change once their entries expire (ttl).
+
+# Which rows a cached result can contain. None means "any".
+Scope = namedtuple('Scope', ['section', 'student', 'statuses', 'excluded'], defaults=(None, None, None, None))
+
+PENDING_STATUS = {'staff': 'Pending Staff', 'hod': 'Pending HOD', 'principal': 'Pending Principal'}
+REJECTED_STATUSES = ['Rejected by Staff', 'Rejected by HOD', 'Rejected by Principal']
+PROCESSED_STATUSES = ['Approved'] + REJECTED_STATUSES
+
+
+class QueryCache:
+    def __init__(self, maxsize=256, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, scope, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, scope, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, scope, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, section, student, statuses):
+        """Drop entries that could contain a row with these attributes."""
+        statuses = set(statuses)
+        with self._lock:
+            stale = [key for key, (_, scope, _) in self._entries.items()
+                     if _affects(scope, section, student, statuses)]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {'hits': self.hits, 'misses': self.misses, 'size': size}
+
+
+def _affects(scope, section, student, statuses):
+    if scope.section is not None and scope.section != section:
+        return False
+    if scope.student is not None and scope.student != student:
+        return False
+    if scope.statuses is not None and not (set(scope.statuses) & statuses):
+        return False
+    if scope.excluded is not None and statuses <= set(scope.excluded):
+        return False
+    return True
+
+
+def _after(query, cursor):
+    """Keyset filter: rows after `cursor` in (date_requested, id) desc order."""
+    if not cursor:
+        return query
+    last_date, last_id = cursor
+    return query.or_(f'date_requested.lt."{last_date}",'
+                     f'and(date_requested.eq."{last_date}",id.lt.{last_id})')
+
+
+def _processed_filters(query, statuses, section, start_date, end_date):
+    if statuses:
+        query = query.in_('status', list(statuses))
+    if section:
+        query = query.eq('student_section', section)
+    if start_date:
+        query = query.gte('date_requested', start_date.isoformat())
+    if end_date:
+        # Whole end day, inclusive
+        query = query.lt('date_requested', (end_date + timedelta(days=1)).isoformat())
+    return query
+
+
+class LeaveRepository:
+    def __init__(self, client, cache):
+        self.client = client
+        self.cache = cache
+
+    def _cached(self, key, scope, fetch):
+        value = self.cache.get(key)
+        if value is None:
+            value = fetch()
+            self.cache.put(key, scope, value)
+        return value
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+    def _page(self, key, scope, filters, columns, page_size, cursor, table='leave_requests'):
+        """One keyset page ordered by (date_requested, id) desc.
+
+        Only `columns` (plus the key columns) are fetched. Returns the rows
+        and the cursor for the next page, or None on the last page.
+        """
+        def fetch():
+            select = list(dict.fromkeys(list(columns) + ['date_requested', 'id']))
+            query = _after(filters(self.client.table(table).select(', '.join(select))), cursor)
+            # One extra row tells us whether another page exists
+            return query.order('date_requested', desc=True).order('id', desc=True)\
+                .limit(page_size + 1).execute().data
+
+        rows = self._cached(key + (tuple(columns), page_size, cursor), scope, fetch)
+        page = rows[:page_size]
+        next_cursor = (page[-1]['date_requested'], page[-1]['id']) if len(rows) > page_size else None
+        return page, next_cursor
+
+    def student_requests(self, username, columns, page_size=25, cursor=None):
+        """Requests submitted by one student, newest first."""
+        return self._page(
+            ('student', None, ('username', username)),
+            Scope(student=username),
+            lambda q: q.eq('student_username', username),
+            columns, page_size, cursor,
+        )
+
+    def pending(self, role, section=None):
+        """Requests waiting on the given reviewer role (optionally one section)."""
+        status = PENDING_STATUS[role]
+
+        def fetch():
+            query = self.client.table('leave_requests').select('*').eq('status', status)
+            if section:
+                query = query.eq('student_section', section)
+            return query.execute().data
+
+        return self._cached((role, section, ('pending',)), Scope(section=section, statuses=(status,)), fetch)
+
+    def staff_history(self, section, columns, page_size=25, cursor=None):
+        """Everything in a section that has left the staff queue."""
+        return self._page(
+            ('staff', section, ('history',)),
+            Scope(section=section, excluded=('Pending Staff',)),
+            lambda q: q.eq('student_section', section).neq('status', 'Pending Staff'),
+            columns, page_size, cursor,
+        )
+
+    def hod_history(self, columns, page_size=25, cursor=None):
+        statuses = ('Pending Principal', 'Approved', 'Rejected by HOD', 'Rejected by Principal')
+        return self._page(
+            ('hod', None, ('history',)),
+            Scope(statuses=statuses),
+            lambda q: q.in_('status', list(statuses)),
+            columns, page_size, cursor,
+        )
+
+    def processed(self, statuses, columns, section=None, start_date=None, end_date=None,
+                  page_size=50, cursor=None):
+        """Approved/rejected requests for the admin overview."""
+        statuses = tuple(statuses)
+        return self._page(
+            ('admin', section, ('processed', statuses, start_date, end_date)),
+            Scope(section=section, statuses=statuses),
+            lambda q: _processed_filters(q, statuses, section, start_date, end_date),
+            columns, page_size, cursor,
+        )
+
+    def archived(self, columns, text=None, section=None, start_date=None, end_date=None,
+                 page_size=50, cursor=None):
+        """Archived requests (see leave_archive.sql), optionally matching `text`.
+
+        `text` is a web-search style query over student, type, status and
+        reason. Nothing the app writes changes the archive, so entries only
+        expire with the TTL.
+        """
+        def filters(query):
+            query = _processed_filters(query, None, section, start_date, end_date)
+            return query.filter('search', 'wfts(simple)', text) if text else query
+
+        return self._page(
+            ('admin', section, ('archived', text, start_date, end_date)),
+            Scope(section=section, statuses=()),  # no status change reaches these rows
+            filters, columns, page_size, cursor, table='leave_requests_archive',
+        )
+
+    def scan(self, columns, statuses=None, section=None, start_date=None, end_date=None, page_size=1000):
+        """Yield pages of requests, newest first, for exports and reports.
+
+        Walks keyset pages straight from the database (bypassing the cache),
+        so memory stays at one page however large the history is.
+        """
+        select = ', '.join(dict.fromkeys(list(columns) + ['date_requested', 'id']))
+        cursor = None
+        while True:
+            query = _processed_filters(self.client.table('leave_requests').select(select),
+                                       statuses, section, start_date, end_date)
+            rows = _after(query, cursor).order('date_requested', desc=True).order('id', desc=True)\
+                .limit(page_size).execute().data
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            cursor = (rows[-1]['date_requested'], rows[-1]['id'])
+
+    def processed_counts(self, statuses, section=None, start_date=None, end_date=None):
+        """Approved and rejected totals for the admin overview.
+
+        Read from the trigger-maintained leave_request_daily_counts, so the
+        cost doesn't grow with the size of the history.
+        """
+        statuses = tuple(statuses)
+
+        def fetch():
+            rows = self.client.rpc('leave_request_summary', {
+                'p_statuses': list(statuses),
+                'p_section': section,
+                'p_start': start_date.isoformat() if start_date else None,
+                'p_end': end_date.isoformat() if end_date else None,
+            }).execute().data
+            totals = rows[0] if rows else {}
+            return {'Approved': totals.get('approved', 0), 'Rejected': totals.get('rejected', 0)}
+
+        return self._cached(
+            ('admin', section, ('counts', statuses, start_date, end_date)),
+            Scope(section=section, statuses=statuses),
+            fetch,
+        )
+
+    def on_leave(self, day, section=None):
+        """Approved requests whose leave period covers `day` (GiST-indexed)."""
+        return self._cached(
+            ('staff', section, ('on_leave', day)),
+            Scope(section=section, statuses=('Approved',)),
+            lambda: self.client.rpc('leaves_on_day', {
+                'p_day': day.isoformat(), 'p_section': section,
+            }).execute().data,
+        )
+
+    def balances(self, req_ids):
+        """Leave used this term, the quota and the requested days for each
+        request, keyed by id.
+
+        One counter row per request from the trigger-maintained
+        leave_balances (see leave_balances.sql), whatever the history size.
+        """
+        ids = tuple(sorted(req_ids))
+        if not ids:
+            return {}
+        return self._cached(
+            ('reviewer', None, ('balances', ids)),
+            Scope(statuses=('Approved',)),
+            lambda: {row['id']: row for row in
+                     self.client.rpc('leave_balances_for', {'p_ids': list(ids)}).execute().data},
+        )
+
+    def outbox_backlog(self):
+        """Notifications still to send and ones given up on, from notifications_outbox.
+
+        Request writes don't change these counts (the drainer does), so they
+        are only refreshed when the entry expires.
+        """
+        def fetch():
+            return {
+                label: self.client.table('notifications_outbox').select('id', count='exact')
+                    .in_('state', states).limit(1).execute().count or 0
+                for label, states in (('waiting', ['pending', 'sending']), ('failed', ['failed']))
+            }
+
+        return self._cached(('admin', None, ('outbox',)), Scope(statuses=()), fetch)
+
+    def overlapping(self, username, leave_start, leave_end):
+        """A student's pending or approved requests overlapping the given dates."""
+        return self.client.rpc('overlapping_leaves', {
+            'p_username': username, 'p_start': leave_start.isoformat(), 'p_end': leave_end.isoformat(),
+        }).execute().data
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+    def submit(self, data):
+        self.client.table('leave_requests').insert(data).execute()
+        self.cache.invalidate(data['student_section'], data['student_username'], [data['status']])
+
+    def transition(self, req_id, new_status, comment, role):
+        """Validate and apply a reviewer decision in one round trip.
+
+        Returns the updated request with 'old_status' and the notified
+        'recipients'; raises if the transition isn't allowed for the role.
+        """
+        row = self.client.rpc('transition_leave_request', {
+            'p_id': req_id, 'p_new_status': new_status, 'p_comment': comment, 'p_role': role,
+        }).execute().data
+        self.cache.invalidate(row['student_section'], row['student_username'], [row['old_status'], row['status']])
+        return row
+
+    def transition_many(self, req_ids, new_status, comment, role):
+        """Apply one decision to many requests in a single set-based RPC.
+
+        Returns the rows that moved; requests no longer eligible are skipped.
+        """
+        rows = self.client.rpc('transition_leave_requests', {
+            'p_ids': list(req_ids), 'p_new_status': new_status, 'p_comment': comment, 'p_role': role,
+        }).execute().data or []
+        for section, student, old_status in {(r['student_section'], r['student_username'], r['old_status']) for r in rows}:
+            self.cache.invalidate(section, student, [old_status, new_status])
+        return rows
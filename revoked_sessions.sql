@@ -0,0 +1,18 @@
+-- Migration: Revoked Sessions
+-- Session tokens (auth.py) are signed, not stored, so logging out in one app
+-- process used to leave the token valid in every other process and after a
+-- restart. Logout now records the token's id here; restoring a session from
+-- the session cookie checks it. Rows are only needed until the token would
+-- have expired anyway, and logout deletes the expired ones.
+
+-- 1. Revocation Table
+create table if not exists revoked_sessions (
+  token_id text primary key,
+  expires_at timestamp with time zone not null
+);
+
+create index if not exists revoked_sessions_expires_idx on revoked_sessions (expires_at);
+
+alter table revoked_sessions enable row level security;
+drop policy if exists "Public Access Revoked Sessions" on revoked_sessions;
+create policy "Public Access Revoked Sessions" on revoked_sessions for all using (true) with check (true);
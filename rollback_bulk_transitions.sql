@@ -0,0 +1,3 @@
+-- Rollback: Remove Bulk Status Transitions
+
+DROP FUNCTION IF EXISTS transition_leave_requests(bigint[], text, text, text);
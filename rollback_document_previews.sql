@@ -0,0 +1,7 @@
+-- Rollback: Remove Document Previews
+
+-- 1. Drop preview column
+ALTER TABLE leave_requests DROP COLUMN IF EXISTS preview_url;
+
+-- 2. Delete stored previews (optional - originals are unaffected)
+-- DELETE FROM storage.objects WHERE bucket_id = 'documents' AND name LIKE 'previews/%';
@@ -0,0 +1,8 @@
+-- Rollback: Remove Dashboard Hot Path Indexes
+
+DROP INDEX IF EXISTS leave_requests_status_section_idx;
+DROP INDEX IF EXISTS leave_requests_pending_idx;
+DROP INDEX IF EXISTS leave_requests_student_history_idx;
+DROP INDEX IF EXISTS leave_requests_section_history_idx;
+DROP INDEX IF EXISTS leave_requests_status_history_idx;
+DROP INDEX IF EXISTS users_role_section_idx;
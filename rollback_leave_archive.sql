@@ -0,0 +1,31 @@
+-- Rollback: Remove Leave Request Archive
+
+-- 1. Move archived requests back (their counters were never decremented,
+-- and re-inserting them must not email staff about "new" requests).
+-- Documents stay in the documents-archive bucket; restored rows keep
+-- pointing there.
+BEGIN;
+SELECT set_config('portal.archiving', 'on', true);
+ALTER TABLE leave_requests DISABLE TRIGGER leave_requests_notify;
+INSERT INTO leave_requests (id, student_username, student_name, student_section, leave_type, leave_dates,
+                            leave_start, leave_end, reason, file_url, preview_url, status,
+                            staff_comment, hod_comment, principal_comment, date_requested)
+SELECT id, student_username, student_name, student_section, leave_type, leave_dates,
+       leave_start, leave_end, reason, file_url, preview_url, status,
+       staff_comment, hod_comment, principal_comment, date_requested
+  FROM leave_requests_archive;
+ALTER TABLE leave_requests ENABLE TRIGGER leave_requests_notify;
+COMMIT;
+
+-- 2. Drop archive functions
+DROP FUNCTION IF EXISTS archive_leave_requests(interval, int);
+DROP FUNCTION IF EXISTS create_leave_archive_partition(int);
+
+-- 3. Restore the unconditional counter trigger
+DROP TRIGGER IF EXISTS leave_requests_counts ON leave_requests;
+CREATE TRIGGER leave_requests_counts
+  AFTER INSERT OR DELETE OR UPDATE OF status, student_section, date_requested ON leave_requests
+  FOR EACH ROW EXECUTE FUNCTION bump_leave_request_counts();
+
+-- 4. Drop archive table (and its partitions)
+DROP TABLE IF EXISTS leave_requests_archive CASCADE;
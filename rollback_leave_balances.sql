@@ -0,0 +1,15 @@
+-- Rollback: Remove Leave Balances
+
+-- 1. Drop RPCs
+DROP FUNCTION IF EXISTS leave_balances_for(bigint[]);
+DROP FUNCTION IF EXISTS reconcile_leave_balances(boolean);
+
+-- 2. Drop counter trigger
+DROP TRIGGER IF EXISTS leave_requests_balances ON leave_requests;
+DROP FUNCTION IF EXISTS bump_leave_balances();
+
+-- 3. Drop tables
+DROP TABLE IF EXISTS leave_balances CASCADE;
+DROP FUNCTION IF EXISTS leave_term_for(date);
+DROP TABLE IF EXISTS leave_quotas CASCADE;
+DROP TABLE IF EXISTS leave_terms CASCADE;
@@ -0,0 +1,17 @@
+-- Rollback: Remove Structured Leave Date Ranges
+
+-- 1. Drop range query functions and backfill procedure
+DROP FUNCTION IF EXISTS leaves_on_day(date, text, text[]);
+DROP FUNCTION IF EXISTS overlapping_leaves(text, date, date);
+DROP PROCEDURE IF EXISTS backfill_leave_periods(int);
+
+-- 2. Drop indexes, constraint and columns (leave_dates is untouched)
+DROP INDEX IF EXISTS leave_requests_section_period_idx;
+DROP INDEX IF EXISTS leave_requests_student_period_idx;
+ALTER TABLE leave_requests DROP CONSTRAINT IF EXISTS leave_requests_leave_range_check;
+ALTER TABLE leave_requests DROP COLUMN IF EXISTS leave_period;
+ALTER TABLE leave_requests DROP COLUMN IF EXISTS leave_end;
+ALTER TABLE leave_requests DROP COLUMN IF EXISTS leave_start;
+
+-- Note: btree_gist is left installed; drop it manually if nothing else uses it.
+-- DROP EXTENSION IF EXISTS btree_gist;
@@ -0,0 +1,11 @@
+-- Rollback: Remove Incremental Leave Request Summary
+
+-- 1. Drop summary RPC
+DROP FUNCTION IF EXISTS leave_request_summary(text[], text, date, date);
+
+-- 2. Drop counter trigger
+DROP TRIGGER IF EXISTS leave_requests_counts ON leave_requests;
+DROP FUNCTION IF EXISTS bump_leave_request_counts();
+
+-- 3. Drop summary table
+DROP TABLE IF EXISTS leave_request_daily_counts CASCADE;
@@ -0,0 +1,24 @@
+-- Rollback: Restore Free-Text Leave Status
+-- Run rollback_hot_path_indexes.sql first (its partial index uses the enum).
+
+-- 1. Convert column back to text (triggers recreated around the change)
+BEGIN;
+DROP TRIGGER IF EXISTS leave_requests_notify ON leave_requests;
+DROP TRIGGER IF EXISTS leave_requests_counts ON leave_requests;
+
+ALTER TABLE leave_requests ALTER COLUMN status DROP DEFAULT;
+ALTER TABLE leave_requests ALTER COLUMN status DROP NOT NULL;
+ALTER TABLE leave_requests ALTER COLUMN status TYPE text USING status::text;
+ALTER TABLE leave_requests ALTER COLUMN status SET DEFAULT 'Pending Staff';
+
+CREATE TRIGGER leave_requests_notify
+  AFTER INSERT OR UPDATE OF status ON leave_requests
+  FOR EACH ROW EXECUTE FUNCTION enqueue_leave_notifications();
+CREATE TRIGGER leave_requests_counts
+  AFTER INSERT OR DELETE OR UPDATE OF status, student_section, date_requested ON leave_requests
+  FOR EACH ROW EXECUTE FUNCTION bump_leave_request_counts();
+COMMIT;
+
+-- 2. Drop cast and enum type
+DROP CAST IF EXISTS (text AS leave_status);
+DROP TYPE IF EXISTS leave_status;
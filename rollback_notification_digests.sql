@@ -0,0 +1,10 @@
+-- Rollback: Remove Notification Digests
+
+-- 1. Drop digest claim function
+DROP FUNCTION IF EXISTS claim_notification_digests(text, interval, int, interval);
+
+-- 2. Drop per-recipient index
+DROP INDEX IF EXISTS notifications_outbox_recipient_idx;
+
+-- Note: Run drainers without --digest-window (and unset
+-- outbox.digest_window_seconds) before rolling back.
@@ -0,0 +1,16 @@
+-- Rollback: Remove Durable Notification Outbox
+
+-- 1. Drop trigger so status changes stop enqueueing notifications
+DROP TRIGGER IF EXISTS leave_requests_notify ON leave_requests;
+DROP FUNCTION IF EXISTS enqueue_leave_notifications();
+
+-- 2. Drop drainer functions
+DROP FUNCTION IF EXISTS claim_notifications(text, int, interval);
+DROP FUNCTION IF EXISTS complete_notifications(text, bigint[]);
+DROP FUNCTION IF EXISTS release_notifications(text, bigint[], text, int);
+
+-- 3. Drop outbox table (any unsent notifications are lost)
+DROP TABLE IF EXISTS notifications_outbox CASCADE;
+
+-- Note: The app only enqueues through the trigger, so after this rollback no
+-- emails are sent until the migration is re-applied.
@@ -0,0 +1,13 @@
+-- Rollback: Remove Hashed Passwords
+
+-- 1. Drop credential check
+ALTER TABLE users DROP CONSTRAINT IF EXISTS users_credential_check;
+
+-- 2. Drop hash column
+-- WARNING: hashes cannot be turned back into plaintext. Accounts already
+-- converted (password IS NULL) will be unable to log in until an admin sets
+-- a new password for them.
+ALTER TABLE users DROP COLUMN IF EXISTS password_hash;
+
+-- 3. Restore NOT NULL (only succeeds once every account has a plaintext password again)
+-- ALTER TABLE users ALTER COLUMN password SET NOT NULL;
@@ -0,0 +1,10 @@
+-- Rollback: Remove Realtime Pending Queues
+
+-- 1. Stop publishing leave_requests changes
+ALTER PUBLICATION supabase_realtime DROP TABLE leave_requests;
+
+-- 2. Restore default replica identity (primary key only)
+ALTER TABLE leave_requests REPLICA IDENTITY DEFAULT;
+
+-- Note: Dashboards fall back to querying the pending queues directly once the
+-- feed stops receiving changes.
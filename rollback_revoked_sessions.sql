@@ -0,0 +1,7 @@
+-- Rollback: Remove Revoked Sessions
+
+-- 1. Drop revocation table
+DROP TABLE IF EXISTS revoked_sessions;
+
+-- Note: logouts then only revoke the token in the app process that handled
+-- them; tokens stay valid elsewhere until they expire.
@@ -0,0 +1,12 @@
+-- Rollback: Remove Sections Table
+
+-- 1. Drop foreign key
+ALTER TABLE users DROP CONSTRAINT IF EXISTS users_section_fkey;
+DROP INDEX IF EXISTS users_section_idx;
+
+-- 2. Restore the hardcoded check (fails if users outside A/B were imported)
+ALTER TABLE users ADD CONSTRAINT users_section_check CHECK (section IN ('A', 'B'));
+
+-- 3. Drop sections table (and its directory trigger)
+DROP TRIGGER IF EXISTS sections_directory_changed ON sections;
+DROP TABLE IF EXISTS sections;
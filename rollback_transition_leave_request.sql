@@ -0,0 +1,10 @@
+-- Rollback: Remove Atomic Status Transitions
+
+-- 1. Drop transition function
+DROP FUNCTION IF EXISTS transition_leave_request(bigint, text, text, text);
+
+-- 2. Drop allowed-transitions table
+DROP TABLE IF EXISTS leave_status_transitions CASCADE;
+
+-- Note: main.py calls transition_leave_request for every reviewer action, so
+-- roll back the app as well before running this.
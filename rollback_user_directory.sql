@@ -0,0 +1,10 @@
+-- Rollback: Remove User Directory Change Notifications
+
+-- 1. Drop trigger and function
+DROP TRIGGER IF EXISTS users_directory_changed ON users;
+DROP FUNCTION IF EXISTS bump_user_directory_version();
+
+-- 2. Drop version table (also removes it from the realtime publication)
+DROP TABLE IF EXISTS user_directory_version;
+
+-- Note: App processes then refresh their user directory on its TTL only.
@@ -0,0 +1,34 @@
+-- Migration: Sections Table
+-- Replaces the hardcoded section check on users (A/B) with a sections table,
+-- so new sections are added as data (see import_users.py --create-sections).
+
+-- 1. Create Sections Table
+create table if not exists sections (
+  code text primary key,
+  name text,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+alter table sections enable row level security;
+drop policy if exists "Public Access Sections" on sections;
+create policy "Public Access Sections" on sections for all using (true) with check (true);
+
+-- 2. Seed From Existing Users
+insert into sections (code, name)
+select distinct section, 'Section ' || section from users where section is not null
+on conflict (code) do nothing;
+
+-- 3. Swap the Check Constraint for a Foreign Key
+alter table users drop constraint if exists users_section_check;
+alter table users drop constraint if exists users_section_fkey;
+alter table users add constraint users_section_fkey
+  foreign key (section) references sections (code) on update cascade;
+
+create index if not exists users_section_idx on users (section);
+
+-- 4. Refresh Directory Caches On Section Changes
+-- App processes cache the section list with the users (directory.py).
+drop trigger if exists sections_directory_changed on sections;
+create trigger sections_directory_changed
+  after insert or delete or update on sections
+  for each statement execute function bump_user_directory_version();
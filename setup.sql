@@ -1,15 +1,24 @@
 -- 1. Reset Tables (Clean Slate)
 drop table if exists leave_requests;
 drop table if exists users;
+drop table if exists sections;
+
+-- 2. Create Sections and Users Tables
+create table sections (
+  code text primary key,
+  name text,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
 
--- 2. Create Users Table
 create table users (
   username text primary key,
-  password text not null,
+  password text, -- Plaintext seed; hashed into password_hash by hash_passwords.py or on first login
+  password_hash text,
   role text not null check (role in ('student', 'staff', 'hod', 'principal', 'admin')),
   name text not null,
-  section text check (section in ('A', 'B')), -- Only relevant for students
-  email text -- Added email column
+  section text references sections(code) on update cascade, -- Only relevant for students and staff
+  email text, -- Added email column
+  constraint users_credential_check check (password_hash is not null or password is not null)
 );
 
 -- 3. Create Leave Requests Table
@@ -30,15 +39,21 @@ create table leave_requests (
 );
 
 -- 4. Enable RLS
+alter table sections enable row level security;
 alter table users enable row level security;
 alter table leave_requests enable row level security;
 
 -- 5. Create Permissive Policies (Relies on App Logic)
+create policy "Public Access Sections" on sections for all using (true) with check (true);
 create policy "Public Access Users" on users for all using (true) with check (true);
 create policy "Public Access Requests" on leave_requests for all using (true) with check (true);
 
 -- 6. Seeding Data
 
+insert into sections (code, name) values
+('A', 'Section A'),
+('B', 'Section B');
+
 -- Seed Staff, HOD, Principal, Admin
 insert into users (username, password, role, name, section, email) values
 ('staff_a', 'staff123', 'staff', 'Staff Member (Section A)', 'A', 'staff_a@college.edu'),
@@ -47,33 +62,18 @@ insert into users (username, password, role, name, section, email) values
 ('principal', 'principal123', 'principal', 'Principal', null, 'principal@college.edu'),
 ('admin', 'admin123', 'admin', 'Administrator', null, 'admin@college.edu');
 
--- Seed Students using a loop (Postgres specific)
-do $$
-begin
-  -- Section A Students (1 to 46)
-  for i in 1..46 loop
-    insert into users (username, password, role, name, section, email)
-    values (
-      'student_a_' || i, 
-      'pass123', 
-      'student', 
-      'Student A-' || i, 
-      'A',
-      'student_a_' || i || '@student.college.edu'
-    );
-  end loop;
+-- Seed Students: 46 per section in one set-based insert
+-- (real rosters: python import_users.py roster.csv)
+insert into users (username, password, role, name, section, email)
+select 'student_' || lower(s.code) || '_' || i,
+       'pass123',
+       'student',
+       'Student ' || s.code || '-' || i,
+       s.code,
+       'student_' || lower(s.code) || '_' || i || '@student.college.edu'
+  from sections s
+ cross join generate_series(1, 46) as i;
 
-  -- Section B Students (1 to 46)
-  for i in 1..46 loop
-    insert into users (username, password, role, name, section, email)
-    values (
-      'student_b_' || i, 
-      'pass123', 
-      'student', 
-      'Student B-' || i, 
-      'B',
-      'student_b_' || i || '@student.college.edu'
-    );
-  end loop;
-end;
-$$;
+-- 7. Hash Seeded Passwords
+-- The seeds above are plaintext. Run `python hash_passwords.py` once after
+-- this script to convert them (see password_hashing.sql).
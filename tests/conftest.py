@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    return FakeSupabase().seed(students_per_section=50)
+
+
+def add_request(db, student, section='A', status='Pending Staff', **fields):
+    """Insert a request directly (not counted as a call); returns its row."""
+    return db._insert('leave_requests', dict({
+        'student_username': student, 'student_name': student, 'student_section': section,
+        'leave_type': 'Medical', 'leave_dates': 'Mar 01, 2025', 'leave_start': '2025-03-01',
+        'leave_end': '2025-03-01', 'reason': 'unwell', 'status': status,
+    }, **fields))
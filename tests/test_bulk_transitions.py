@@ -0,0 +1,40 @@
+import pytest
+
+from conftest import add_request
+from repository import LeaveRepository, QueryCache
+
+
+@pytest.mark.parametrize('batch_size', [1, 10, 50])
+def test_batch_is_one_round_trip(db, batch_size):
+    repo = LeaveRepository(db, QueryCache())
+    ids = [add_request(db, f'student_a_{i}')['id'] for i in range(1, batch_size + 1)]
+    db.calls.clear()
+
+    moved = repo.transition_many(ids, 'Pending HOD', 'ok', 'staff')
+
+    assert db.calls == {'rpc.transition_leave_requests': 1}
+    assert sorted(row['id'] for row in moved) == ids
+    assert {db.tables['leave_requests'][i]['status'] for i in ids} == {'Pending HOD'}
+
+
+def test_ineligible_requests_are_skipped(db):
+    repo = LeaveRepository(db, QueryCache())
+    pending = add_request(db, 'student_a_1')['id']
+    handled = add_request(db, 'student_a_2', status='Pending HOD')['id']
+
+    moved = repo.transition_many([pending, handled], 'Rejected by Staff', 'no', 'staff')
+
+    assert [row['id'] for row in moved] == [pending]
+    assert db.tables['leave_requests'][handled]['status'] == 'Pending HOD'
+
+
+def test_batch_notifies_every_student(db):
+    repo = LeaveRepository(db, QueryCache())
+    ids = [add_request(db, f'student_a_{i}')['id'] for i in range(1, 11)]
+    db.tables['notifications_outbox'].clear()
+
+    repo.transition_many(ids, 'Rejected by Staff', 'no', 'staff')
+
+    notified = {row['request_id'] for row in db.tables['notifications_outbox'].values()
+                if row['template'] == 'status_update'}
+    assert notified == set(ids)
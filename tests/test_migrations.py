@@ -0,0 +1,20 @@
+import glob
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = {'setup.sql', 'rollback_circulars.sql'}
+
+
+def manifest():
+    with open(os.path.join(ROOT, 'migrations.txt')) as f:
+        return [line.split() for line in f if line.strip() and not line.startswith('#')]
+
+
+def test_manifest_lists_every_migration_once_with_its_rollback():
+    entries = manifest()
+    listed = [name for entry in entries for name in entry]
+    on_disk = {os.path.basename(p) for p in glob.glob(os.path.join(ROOT, '*.sql'))} - BASELINE
+
+    assert all(len(entry) == 2 and entry[1] == f'rollback_{entry[0]}' for entry in entries)
+    assert len(listed) == len(set(listed))
+    assert set(listed) == on_disk
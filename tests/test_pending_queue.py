@@ -0,0 +1,106 @@
+from pending_feed import PendingQueueView
+
+
+def request(req_id, status='Pending Staff', section='A', **fields):
+    return dict({'id': req_id, 'status': status, 'student_section': section, 'reason': 'unwell'}, **fields)
+
+
+def test_insert_adds_to_queue_and_log():
+    view = PendingQueueView()
+    view.apply('INSERT', request(1))
+    view.apply('INSERT', request(2, section='B'))
+
+    assert [row['id'] for row in view.pending('Pending Staff')] == [1, 2]
+    assert [row['id'] for row in view.pending('Pending Staff', 'A')] == [1]
+    assert view.arrivals_since(0, 'Pending Staff', 'B') == [2]
+
+
+def test_partial_update_merges_into_known_row():
+    view = PendingQueueView()
+    view.reset([request(1)])
+
+    view.apply('UPDATE', {'id': 1, 'reason': 'fever'})
+
+    row, = view.pending('Pending Staff')
+    assert row == request(1, reason='fever')
+
+
+def test_update_to_closed_status_leaves_queue():
+    view = PendingQueueView()
+    view.reset([request(1), request(2)])
+    seq = view.seq
+
+    view.apply('UPDATE', {'id': 1, 'status': 'Rejected by Staff'})
+
+    assert [row['id'] for row in view.pending('Pending Staff')] == [2]
+    assert view.seq == seq + 1
+    assert view.arrivals_since(seq, 'Pending Staff') == []
+
+
+def test_update_moves_between_queues():
+    view = PendingQueueView()
+    view.reset([request(1)])
+    seq = view.seq
+
+    view.apply('UPDATE', {'id': 1, 'status': 'Pending HOD'})
+
+    assert view.pending('Pending Staff') == []
+    assert [row['id'] for row in view.pending('Pending HOD', 'A')] == [1]
+    assert view.arrivals_since(seq, 'Pending HOD') == [1]
+    assert view.arrivals_since(view.seq, 'Pending HOD') == []
+
+
+def test_delete_removes_row_using_old_record():
+    view = PendingQueueView()
+    view.reset([request(1), request(2)])
+    seq = view.seq
+
+    view.apply('DELETE', {}, old_record={'id': 1})
+
+    assert [row['id'] for row in view.pending('Pending Staff')] == [2]
+    assert view.seq == seq + 1
+
+
+def test_unchanged_status_is_not_logged():
+    view = PendingQueueView()
+    view.reset([request(1)])
+    seq = view.seq
+
+    view.apply('UPDATE', {'id': 1, 'reason': 'fever'})
+    view.apply('UPDATE', {'id': 1, 'status': 'Pending Staff'})
+
+    assert view.seq == seq
+
+
+def test_log_keeps_only_recent_history():
+    view = PendingQueueView(history=3)
+    for req_id in range(1, 6):
+        view.apply('INSERT', request(req_id))
+
+    assert view.arrivals_since(0, 'Pending Staff') == [3, 4, 5]
+    assert len(view.pending('Pending Staff')) == 5
+
+
+def test_reset_keeps_changes_that_race_the_snapshot():
+    view = PendingQueueView()
+    view.reset([request(1), request(2), request(3)])
+
+    view.begin_snapshot()
+    snapshot = [request(1), request(2), request(3)]  # read before the changes below
+    view.apply('UPDATE', {'id': 1, 'status': 'Pending HOD'})
+    view.apply('DELETE', {}, old_record={'id': 2})
+    view.apply('INSERT', request(4))
+    view.reset(snapshot)
+
+    assert [row['id'] for row in view.pending('Pending Staff')] == [3, 4]
+    assert [row['id'] for row in view.pending('Pending HOD')] == [1]
+
+
+def test_reset_without_snapshot_in_flight_replaces_view():
+    view = PendingQueueView()
+    view.reset([request(1)])
+    view.apply('UPDATE', {'id': 1, 'status': 'Pending HOD'})
+
+    view.reset([request(1)])
+
+    assert [row['id'] for row in view.pending('Pending Staff')] == [1]
@@ -0,0 +1,285 @@
+import json
+import threading
+import time
+from collections import Counter, deque, namedtuple
+
+# -----------------------------------------------------------------------------
+# Hot-Path Tracing
+# -----------------------------------------------------------------------------
+# Wraps the Supabase client and the mailer so every round trip is recorded as
+# a span (what was called, rows, approximate bytes, duration) and grouped by
+# the Streamlit script run that made it. Calls from background threads (the
+# outbox drainer and its SMTP deliveries) are kept as run-less spans. Finished
+# runs can be appended to a JSON-lines log and/or exported as OpenTelemetry
+# spans when opentelemetry is installed.
+
+Span = namedtuple('Span', ['run_id', 'kind', 'name', 'detail', 'rows', 'bytes', 'duration', 'error', 'started_at'])
+Run = namedtuple('Run', ['run_id', 'label', 'started_at', 'duration', 'spans'])
+WRITE_METHODS = ('insert', 'update', 'upsert')
+
+
+def _size(data):
+    try:
+        return len(json.dumps(data, default=str))
+    except (TypeError, ValueError):
+        return None
+
+
+def _describe(method, args):
+    """Span detail for one builder call. Write payloads (password hashes,
+    request bodies) are reduced to their row count and column names."""
+    if method in WRITE_METHODS and args:
+        rows = args[0] if isinstance(args[0], list) else [args[0]]
+        columns = sorted({column for row in rows for column in row})
+        return f"{method}({len(rows)} row(s): {', '.join(columns)})"
+    return f"{method}({', '.join(str(a) for a in args)})"
+
+
+class Tracer:
+    def __init__(self, max_runs=200, max_spans=2000, log_path=None, otel=False):
+        self.log_path = log_path
+        self.runs = deque(maxlen=max_runs)
+        self.spans = deque(maxlen=max_spans)
+        self._next_id = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._otel = _otel_tracer() if otel else None
+
+    # -------------------------------------------------------------------------
+    # Recording
+    # -------------------------------------------------------------------------
+    def start_run(self, label):
+        with self._lock:
+            self._next_id += 1
+            run_id = self._next_id
+        self._local.run = (run_id, label, time.time(), time.perf_counter(), [])
+        return run_id
+
+    def end_run(self):
+        current = getattr(self._local, 'run', None)
+        if current is None:
+            return None
+        self._local.run = None
+        run_id, label, started_at, start, spans = current
+        run = Run(run_id, label, started_at, time.perf_counter() - start, tuple(spans))
+        with self._lock:
+            self.runs.append(run)
+        self._export(run)
+        return run
+
+    def current_run(self):
+        return getattr(self._local, 'run', None)
+
+    def adopt(self, run):
+        """Record this thread's spans into `run` (current_run() of another
+        thread, e.g. a script run fanning reads out to a pool); None detaches."""
+        self._local.run = run
+
+    def record(self, kind, name, detail, started_at, duration, rows=None, size=None, error=None):
+        current = getattr(self._local, 'run', None)
+        span = Span(current[0] if current else None, kind, name, detail, rows, size, duration, error, started_at)
+        with self._lock:
+            self.spans.append(span)
+        if current:
+            current[4].append(span)  # list.append is atomic; adopted threads share the list
+        else:
+            self._export(Run(None, 'background', started_at, duration, (span,)))
+        return span
+
+    def timed(self, kind, name, detail, call, measure=None):
+        """Run call() as a span; measure(result) -> (rows, bytes)."""
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            result = call()
+        except Exception as e:
+            # APIError.message, not str(e): the error details can echo the failing row
+            message = getattr(e, 'message', None) or str(e)
+            self.record(kind, name, detail, started_at, time.perf_counter() - start, error=str(message)[:200])
+            raise
+        rows, size = measure(result) if measure else (None, None)
+        self.record(kind, name, detail, started_at, time.perf_counter() - start, rows, size)
+        return result
+
+    # -------------------------------------------------------------------------
+    # Wrappers
+    # -------------------------------------------------------------------------
+    def wrap_client(self, client):
+        return TracedClient(client, self)
+
+    def wrap_mailer(self, mailer):
+        return TracedMailer(mailer, self)
+
+    # -------------------------------------------------------------------------
+    # Reporting
+    # -------------------------------------------------------------------------
+    def slowest(self, n=10):
+        with self._lock:
+            spans = list(self.spans)
+        return sorted(spans, key=lambda s: s.duration, reverse=True)[:n]
+
+    def calls_per_run(self):
+        """Counter of {number of calls in a run: how many runs}."""
+        with self._lock:
+            return Counter(len(run.spans) for run in self.runs)
+
+    def run_durations(self):
+        with self._lock:
+            return [run.duration for run in self.runs]
+
+    # -------------------------------------------------------------------------
+    # Export
+    # -------------------------------------------------------------------------
+    def _export(self, run):
+        if self.log_path:
+            line = json.dumps({
+                'run_id': run.run_id, 'label': run.label, 'started_at': run.started_at,
+                'duration_ms': round(run.duration * 1000, 2),
+                'spans': [{**s._asdict(), 'duration_ms': round(s.duration * 1000, 2)} for s in run.spans],
+            }, default=str)
+            try:
+                with self._lock, open(self.log_path, 'a') as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                print(f"Trace log write failed: {e}")
+        if self._otel is not None:
+            _export_otel(self._otel, run)
+
+
+class TracedQuery:
+    """Records the builder chain and times execute()."""
+
+    def __init__(self, builder, tracer, name, kind='db', detail=()):
+        self._builder = builder
+        self._tracer = tracer
+        self._name = name
+        self._kind = kind
+        self._detail = detail
+
+    def __getattr__(self, attr):
+        target = getattr(self._builder, attr)
+        if not callable(target):
+            return target
+
+        def chained(*args, **kwargs):
+            result = target(*args, **kwargs)
+            if result is self._builder or hasattr(result, 'execute'):
+                return TracedQuery(result, self._tracer, self._name, self._kind,
+                                   self._detail + (_describe(attr, args),))
+            return result
+        return chained
+
+    def execute(self):
+        return self._tracer.timed(
+            self._kind, self._name, " ".join(self._detail), self._builder.execute,
+            lambda res: (len(res.data) if isinstance(res.data, list) else int(res.data is not None), _size(res.data)),
+        )
+
+
+class TracedBucket:
+    def __init__(self, bucket, tracer, name):
+        self._bucket = bucket
+        self._tracer = tracer
+        self._name = name
+
+    def __getattr__(self, attr):
+        target = getattr(self._bucket, attr)
+        if not callable(target) or attr == 'get_public_url':  # URL building is local
+            return target
+
+        def traced(*args, **kwargs):
+            size = next((len(a) for a in args if isinstance(a, (bytes, bytearray))), None)
+            return self._tracer.timed('storage', self._name, _describe(attr, args[:1]),
+                                      lambda: target(*args, **kwargs), lambda res: (None, size))
+        return traced
+
+
+class TracedStorage:
+    def __init__(self, storage, tracer):
+        self._storage = storage
+        self._tracer = tracer
+
+    def from_(self, bucket):
+        return TracedBucket(self._storage.from_(bucket), self._tracer, bucket)
+
+    def __getattr__(self, attr):
+        return getattr(self._storage, attr)
+
+
+class TracedClient:
+    """Drop-in proxy for a supabase Client that traces table, rpc and storage calls."""
+
+    def __init__(self, client, tracer):
+        self._client = client
+        self._tracer = tracer
+
+    def table(self, name):
+        return TracedQuery(self._client.table(name), self._tracer, name)
+
+    def rpc(self, name, params=None):
+        return TracedQuery(self._client.rpc(name, params or {}), self._tracer, name, kind='rpc',
+                           detail=(", ".join(sorted(params or {})),))  # names only: values can be comments
+
+    @property
+    def storage(self):
+        return TracedStorage(self._client.storage, self._tracer)
+
+    def __getattr__(self, attr):
+        return getattr(self._client, attr)
+
+
+class TracedMailer:
+    """Proxy for mailer.Mailer that traces SMTP delivery batches."""
+
+    def __init__(self, mailer, tracer):
+        self._mailer = mailer
+        self._tracer = tracer
+
+    def deliver(self, messages):
+        messages = list(messages)
+        return self._tracer.timed(
+            'smtp', 'deliver', f"{len(messages)} message(s)", lambda: self._mailer.deliver(messages),
+            lambda failed: (len(messages) - len(failed), sum(len(m.body) for m in messages)),
+        )
+
+    def __getattr__(self, attr):
+        return getattr(self._mailer, attr)
+
+
+# -----------------------------------------------------------------------------
+# OpenTelemetry (optional)
+# -----------------------------------------------------------------------------
+def _otel_tracer():
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("tracing.otel is set but opentelemetry is not installed; keeping spans local.")
+        return None
+    return trace.get_tracer("department-portal")
+
+
+def _export_otel(otel, run):
+    from opentelemetry import trace
+
+    def ns(seconds):
+        return int(seconds * 1e9)
+
+    parent_ctx = None
+    parent = None
+    if run.run_id is not None:
+        parent = otel.start_span(f"script_run {run.label}", start_time=ns(run.started_at),
+                                 attributes={'portal.run_id': run.run_id, 'portal.calls': len(run.spans)})
+        parent_ctx = trace.set_span_in_context(parent)
+    for s in run.spans:
+        attributes = {'portal.kind': s.kind, 'portal.detail': s.detail}
+        if s.rows is not None:
+            attributes['portal.rows'] = s.rows
+        if s.bytes is not None:
+            attributes['portal.bytes'] = s.bytes
+        span = otel.start_span(f"{s.kind} {s.name}", context=parent_ctx, start_time=ns(s.started_at),
+                               attributes=attributes)
+        if s.error:
+            span.set_status(trace.Status(trace.StatusCode.ERROR, s.error))
+        span.end(end_time=ns(s.started_at + s.duration))
+    if parent is not None:
+        parent.end(end_time=ns(run.started_at + run.duration))
@@ -0,0 +1,68 @@
+-- Migration: Atomic Status Transitions
+-- One RPC validates and applies a reviewer's decision and returns the student
+-- row plus everyone notified, replacing select + update + user lookups.
+-- Requires notifications_outbox.sql (recipients come from the outbox rows the
+-- trigger writes in this same transaction).
+
+-- 1. Allowed Transitions
+create table if not exists leave_status_transitions (
+  role text not null,
+  from_status text not null,
+  to_status text not null,
+  primary key (role, from_status, to_status)
+);
+
+insert into leave_status_transitions (role, from_status, to_status) values
+('staff', 'Pending Staff', 'Pending HOD'),
+('staff', 'Pending Staff', 'Rejected by Staff'),
+('hod', 'Pending HOD', 'Approved'),
+('hod', 'Pending HOD', 'Pending Principal'),
+('hod', 'Pending HOD', 'Rejected by HOD'),
+('principal', 'Pending Principal', 'Approved'),
+('principal', 'Pending Principal', 'Rejected by Principal')
+on conflict do nothing;
+
+alter table leave_status_transitions enable row level security;
+drop policy if exists "Public Read Transitions" on leave_status_transitions;
+create policy "Public Read Transitions" on leave_status_transitions for select using (true);
+
+-- 2. Transition Function
+create or replace function transition_leave_request(p_id bigint, p_new_status text, p_comment text, p_role text)
+returns jsonb
+language plpgsql as $$
+declare
+  v_old_status text;
+  v_row leave_requests;
+begin
+  -- Lock the row so two reviewers can't act on it at once
+  select status::text into v_old_status from leave_requests where id = p_id for update;
+  if not found then
+    raise exception 'Leave request % not found', p_id using errcode = 'P0002';
+  end if;
+
+  if not exists (
+    select 1 from leave_status_transitions
+     where role = p_role and from_status = v_old_status and to_status = p_new_status
+  ) then
+    raise exception 'Cannot move request % from "%" to "%" as %', p_id, v_old_status, p_new_status, p_role
+      using errcode = 'P0001';
+  end if;
+
+  update leave_requests
+     set status = p_new_status,
+         staff_comment = case when p_role = 'staff' then p_comment else staff_comment end,
+         hod_comment = case when p_role = 'hod' then p_comment else hod_comment end,
+         principal_comment = case when p_role = 'principal' then p_comment else principal_comment end
+   where id = p_id
+  returning * into v_row;
+
+  return to_jsonb(v_row) || jsonb_build_object(
+    'old_status', v_old_status,
+    'recipients', coalesce((
+      select jsonb_agg(recipient order by id)
+        from notifications_outbox
+       where request_id = p_id and status = p_new_status
+    ), '[]'::jsonb)
+  );
+end;
+$$;
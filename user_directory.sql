@@ -0,0 +1,47 @@
+-- Migration: User Directory Change Notifications
+-- App processes keep an in-memory copy of users (directory.py). Instead of
+-- publishing users itself (and its password hashes) over Supabase Realtime,
+-- a statement trigger bumps a one-row version table that is published.
+
+-- 1. Version Table
+create table if not exists user_directory_version (
+  id int primary key default 1 check (id = 1),
+  version bigint not null default 0,
+  changed_at timestamptz not null default now()
+);
+
+insert into user_directory_version (id) values (1) on conflict (id) do nothing;
+
+alter table user_directory_version enable row level security;
+drop policy if exists "Public Access Directory Version" on user_directory_version;
+drop policy if exists "Public Read Directory Version" on user_directory_version;
+create policy "Public Read Directory Version" on user_directory_version for select using (true);
+
+-- 2. Bump On Directory Changes
+-- Password changes don't touch the directory columns and don't bump it.
+-- Clients may only read the version, so the trigger updates it with its
+-- owner's rights (under the caller's, RLS would match no row, silently).
+create or replace function bump_user_directory_version()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  update user_directory_version set version = version + 1, changed_at = now() where id = 1;
+  return null;
+end;
+$$;
+
+drop trigger if exists users_directory_changed on users;
+create trigger users_directory_changed
+  after insert or delete or update of username, role, name, section, email on users
+  for each statement execute function bump_user_directory_version();
+
+-- 3. Add table to the realtime publication
+do $$
+begin
+  alter publication supabase_realtime add table user_directory_version;
+exception when duplicate_object then null;
+end;
+$$;